@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import Row, insert, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.modules.core.models import EmailOutbox, EmailVerification, Profile, User
+
+# Unique indexes of cre_user, a violation means the account already exists
+USER_UNIQUE_INDEXES = ("cre_user_username_idx", "cre_user_email_idx")
+
+
+async def create_user_account(
+    db: AsyncSession,
+    data_in: dict,
+    verification_token: str,
+    expires_at: datetime,
+    email: dict,
+) -> Row:
+    """
+    Create a user with its profile, email verification and verification email (outbox)
+    in a single statement (data-modifying CTEs) and a single transaction.
+
+    Signup checks the username/email beforehand, an account created meanwhile is
+    rejected by the unique indexes of cre_user and turned into the usual 400 response.
+    example:
+    create_user_account(db, {"username": ..., "email": ..., "password": ..., "is_active": False},
+                        token, expires_at, {"subject": ..., "recipients": [...], "body": ...})
+    """
+    # Python-side column defaults can't be rendered inside CTEs, timestamps are explicit
+    now = datetime.utcnow()
+
+    new_user = (
+        insert(User)
+        .values(**data_in, created_at=now, updated_at=now)
+        .returning(User.id, User.username, User.email, User.created_at, User.updated_at)
+        .cte("new_user")
+    )
+    new_verification = (
+        insert(EmailVerification)
+        .from_select(
+            ["token", "user_id", "expires_at"],
+            select(literal(verification_token), new_user.c.id, literal(expires_at)),
+            include_defaults=False,
+        )
+        .cte("new_verification")
+    )
+    new_profile = (
+        insert(Profile)
+        .from_select(["user_id"], select(new_user.c.id), include_defaults=False)
+        .cte("new_profile")
+    )
+    new_email = (
+        insert(EmailOutbox)
+        .values(
+            subject=email["subject"],
+            recipients=email["recipients"],
+            body=email["body"],
+            status="pending",
+            attempts=0,
+            next_attempt_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        .cte("new_email")
+    )
+
+    stmt = select(new_user).add_cte(new_verification, new_profile, new_email)
+
+    try:
+        execute = await db.execute(stmt)
+        user = execute.one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if any(index in str(e.orig) for index in USER_UNIQUE_INDEXES):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{User.__name__} already exists",
+            )
+        raise
+
+    return user
@@ -1,25 +1,30 @@
+import uuid
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.crud import create_user_account
 from app.auth.schema import Message, RefreshToken, Token
 from app.core.config import settings
-from app.core.mail import render_template, send_email
-from app.core.query_factory import check_if_exists, create_entry, get_specific
+from app.core.mail import enqueue_email, render_template
+from app.core.query_factory import check_if_exists, get_specific
 from app.core.security import (
     add_token_to_blacklist,
     check_user_auth,
     generate_access_refresh_token,
     generate_email_token,
-    get_password_hash,
+    get_password_hash_async,
     validate_refresh_token,
 )
-from app.db.deps import get_db
-from app.modules.core.models import EmailVerification, Profile, User
+from app.db.deps import get_db, get_primary_db
+from app.modules.core.models import EmailVerification, User
 from app.modules.users.schema import UserCreate, UserSchema
 from app.services import strings
+from app.services.outbox import outbox_dispatcher
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth")
 
@@ -38,35 +43,34 @@ async def signup(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=strings.CLOSED_REGISTRATION,
         )
-    await check_if_exists(db, User, [User.username == user.username])
-    await check_if_exists(db, User, [User.email == user.email])
+    # Cheap lookup before bcrypt, taken usernames/emails don't cost a hash
+    await check_if_exists(
+        db, User, [or_(User.username == user.username, User.email == user.email)]
+    )
 
     data_in = {
         "username": user.username,
         "email": user.email,
-        "password": get_password_hash(user.password),
+        "password": await get_password_hash_async(user.password),
         "is_active": False,
     }
     expires_at = datetime.utcnow() + timedelta(hours=settings.EMAIL_TOKEN_EXPIRE_HOURS)
 
-    verification_token = await generate_email_token(db)
-
-    user = await create_entry(db, User, data_in)
-    await create_entry(
-        db,
-        EmailVerification,
-        {"token": verification_token, "user_id": user.id, "expires_at": expires_at},
-    )
-    await create_entry(db, Profile, {"user_id": user.id})
+    # A (very unlikely) duplicate token is rejected by the unique index
+    verification_token = str(uuid.uuid4())
 
     verification_url = request.url_for("verify_email", token=verification_token)
     context = {"username": user.username, "verification_url": verification_url}
-    html_content = render_template("mail/verify_email.jinja", context)
-    send_email(
-        "Verify your email",
-        [{"email": user.email, "name": user.username}],
-        html_content,
-    )
+    email = {
+        "subject": "Verify your email",
+        "recipients": [{"email": user.email, "name": user.username}],
+        "body": render_template("verify_email.jinja", context),
+    }
+
+    # User, profile, email verification and outbox email in one statement
+    user = await create_user_account(db, data_in, verification_token, expires_at, email)
+
+    outbox_dispatcher.wake()
 
     return user
 
@@ -97,14 +101,12 @@ async def refresh_access_token(
 
     tokens = await generate_access_refresh_token(db, user)
 
-    add_token_to_blacklist(token.refresh_token)
+    await add_token_to_blacklist(token.refresh_token)
 
     return tokens
 
 
-@router.post(
-    "/logout", status_code=status.HTTP_200_OK, response_model=Message
-)
+@router.post("/logout", status_code=status.HTTP_200_OK, response_model=Message)
 async def logout() -> dict:
     # Remove access_token/refresh_token from the frontend
     return {"msg": strings.LOGGED_OUT}
@@ -116,7 +118,7 @@ async def logout() -> dict:
     response_model=Message,
     description="Verify an email",
 )
-async def verify_email(token: str, db: AsyncSession = Depends(get_db)) -> dict:
+async def verify_email(token: str, db: AsyncSession = Depends(get_primary_db)) -> dict:
     email_verification = await get_specific(
         db, EmailVerification, [EmailVerification.token == token]  # noqa
     )
@@ -132,6 +134,8 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)) -> dict:
     await db.delete(email_verification)
     await db.commit()
 
+    principal_cache.invalidate(user.id)
+
     return {"msg": strings.EMAIL_VERIFIED}
 
 
@@ -142,7 +146,7 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)) -> dict:
     description="Resend a verification email",
 )
 async def resend_verification_email(
-    email: str, request: Request, db: AsyncSession = Depends(get_db)
+    email: str, request: Request, db: AsyncSession = Depends(get_primary_db)
 ) -> dict:
     user = await get_specific(db, User, [User.email == email])
 
@@ -163,15 +167,18 @@ async def resend_verification_email(
     email_verification.token = verification_token
     email_verification.expires_at = expires_at
 
-    await db.commit()
-
     verification_url = request.url_for("verify_email", token=verification_token)
     context = {"username": user.username, "verification_url": verification_url}
-    html_content = render_template("mail/verify_email.jinja", context)
-    send_email(
+    html_content = render_template("verify_email.jinja", context)
+    enqueue_email(
+        db,
         "Verify your email",
         [{"email": user.email, "name": user.username}],
         html_content,
     )
 
+    await db.commit()
+
+    outbox_dispatcher.wake()
+
     return {"msg": strings.EMAIL_SENT}
@@ -23,6 +23,8 @@ class Config(BaseSettings):
 
     UVICORN_HOST: str = "0.0.0.0"
     UVICORN_PORT: int = 8000
+    # Workers forked by app.launcher, defaults to the CPU quota of the container
+    UVICORN_WORKERS: int | None = None
 
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
     PROJECT_NAME: str | None = "FastAPI app template"
@@ -34,11 +36,58 @@ class Config(BaseSettings):
     DATABASE_PORT: int = 5432
     DATABASE_POOL_SIZE: int = 5
     DATABASE_MAX_OVERFLOW: int = 10
+    # Connections (pool + overflow) of all the workers of app.launcher together, divided between
+    # the engines (primary and each replica) of the workers, DATABASE_POOL_SIZE/MAX_OVERFLOW are
+    # per engine and per process otherwise
+    DATABASE_CONNECTION_BUDGET: int | None = None
+    # "direct" (PostgreSQL, prepared statements cached per connection) or
+    # "pooler" (PgBouncer in transaction mode, unnamed statements)
+    DATABASE_POOL_MODE: str = "direct"
+    # Prepared statements cached per connection in direct mode
+    DATABASE_STATEMENT_CACHE_SIZE: int = 500
+    # SQL statements compiled by SQLAlchemy kept in cache (both modes)
+    DATABASE_QUERY_CACHE_SIZE: int = 1200
+    # Read replicas, comma separated "host[:port]" (primary credentials) or full URIs.
+    # GET requests read from a replica lagging less than DATABASE_REPLICA_MAX_LAG_SECONDS,
+    # a client reads from the primary for DATABASE_REPLICA_STICKY_SECONDS after a write (cookie, and
+    # per worker by authenticated user for the clients without cookies)
+    DATABASE_REPLICA_URLS: str | None = None
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 5
+    DATABASE_REPLICA_CHECK_SECONDS: float = 2
+    DATABASE_REPLICA_STICKY_SECONDS: int = 10
 
     REDIS_CONNECTION: bool = False
     REDIS_URL: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_SOCKET_TIMEOUT: int = 5
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Batch blacklist writes in a pipeline flushed every REDIS_PIPELINE_FLUSH_MS
+    REDIS_PIPELINE: bool = False
+    REDIS_PIPELINE_BATCH_SIZE: int = 100
+    REDIS_PIPELINE_FLUSH_MS: int = 5
+
+    # Dependencies probed in the background, /health/ready is served from the last probe
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 5
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2
+    # The mail provider doesn't affect readiness, its last probe result is reported until the next one
+    HEALTH_PROBE_MAIL_INTERVAL_SECONDS: float = 300
+
+    # Statements/rows/DB time of each request in the Server-Timing header and the logs
+    QUERY_STATS_ENABLED: bool = True
+    # Requests executing more statements are logged as warnings
+    QUERY_STATS_WARN_STATEMENTS: int = 20
+    # A request over the query budget of its route (app.db.query_stats) raises an error when
+    # enforced (tests), otherwise it is logged as a warning
+    QUERY_BUDGETS_ENFORCED: bool = False
+
+    # Prometheus metrics served by /metrics, see app/services/metrics.py for multiple workers
+    METRICS_ENABLED: bool = True
+    # /metrics has no authentication, it is only served to the clients of these networks (comma
+    # separated CIDRs, "*" for any client) and is a 404 for the others.
+    # Behind a reverse proxy, run uvicorn with --proxy-headers so that the client is not the proxy
+    METRICS_ALLOWED_NETWORKS: str = (
+        "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+    )
 
     SENTRY_ENABLED: bool | None = False
     SENTRY_DSN: str | None = None
@@ -48,20 +97,68 @@ class Config(BaseSettings):
     SQL_VERBOSE_LOGGING: bool = False
 
     ALGORITHM: str = "HS384"
+    # "jose" (python-jose) or "pyjwt" (PyJWT + cryptography)
+    JWT_BACKEND: str = "pyjwt"
+    # Access tokens carry the scopes as a bitset (scp/scv claims) instead of a list, the
+    # scopes claim is then left out: only enable it when no client reads that claim
+    JWT_SCOPES_BITSET: bool = False
+    # Scopes of bitset tokens issued before a scopes change, resolved again from the database
+    SCOPE_MASK_CACHE_SIZE: int = 10_000
+    SCOPE_MASK_CACHE_TTL_SECONDS: int = 60
+    # Verified tokens payloads cached until they expire (0 disables the cache)
+    TOKEN_CACHE_SIZE: int = 10_000
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 10_080
 
     EMAIL_TOKEN_EXPIRE_HOURS: int = 24
     EMAIL_SENDER: str = "fastapi@example.com"
     EMAIL_SENDER_NAME: str = "FastAPI app template"
+    MAIL_TEMPLATES_DIR: str = "mail"
+    # Recompile templates when their file changes, defaults to True in development
+    MAIL_TEMPLATES_AUTO_RELOAD: bool | None = None
 
     MAILJET_API_KEY: str | None = None
     MAILJET_API_SECRET: str | None = None
 
+    # "mailjet" or "log", defaults to mailjet in production and log otherwise
+    EMAIL_TRANSPORT: str | None = None
+    EMAIL_OUTBOX_DISPATCHER_ENABLED: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 2.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS: float = 30.0
+    # Claimed emails are claimed again after this delay if their dispatcher died while sending
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300.0
+
     USERS_OPEN_REGISTRATION: bool = True
 
+    # Authenticated users snapshots cached in-process (0 disables the cache). Invalidations
+    # reach the other workers through Redis pub/sub with REDIS_CONNECTION, without it a
+    # deactivated user or a changed profile stays cached in them for up to the TTL
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+
+    # bcrypt runs on a bounded pool ("thread" or "process"), requests above the queue size get a 503
+    PASSWORD_HASHING_EXECUTOR: str = "thread"
+    PASSWORD_HASHING_WORKERS: int = 4
+    PASSWORD_HASHING_QUEUE_SIZE: int = 32
+
+    # Maximum number of items accepted by the bulk endpoints
+    BULK_MAX_ITEMS: int = 1000
+    # Rows fetched from the server-side cursor per batch by the export endpoints
+    EXPORT_BATCH_SIZE: int = 1000
+    # Bulk user import: rows per batch (COPY + transaction), processes hashing the
+    # passwords in scripts/import_users.py (defaults to the CPUs, the endpoint uses the
+    # password hashing pool) and rejected rows listed in the report
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_HASHING_WORKERS: int | None = None
+    IMPORT_MAX_REPORTED_REJECTS: int = 1000
+
     JWT_ACCESS_TOKEN_KEY: str
     JWT_REFRESH_TOKEN_KEY: str
+    # Verification keys (PEM) when ALGORITHM is asymmetric, the keys above are then private keys
+    JWT_ACCESS_TOKEN_PUBLIC_KEY: str | None = None
+    JWT_REFRESH_TOKEN_PUBLIC_KEY: str | None = None
 
     def is_dev(self) -> bool:
         return self.FASTAPI_ENV == AppEnvironment.DEV
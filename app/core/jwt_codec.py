@@ -0,0 +1,147 @@
+"""
+JWT encoding/decoding backends, selected by JWT_BACKEND ("jose" or "pyjwt").
+
+Both codecs take the python-jose style options of app.core.security.JWT_OPTIONS and
+enforce them the same way, every decoding failure is raised as JWTDecodeError.
+A backend library is only imported when its codec is created.
+"""
+
+from abc import ABC, abstractmethod
+
+from app.core.config import settings
+
+# Claims checked to be strings when present (verify_sub/verify_jti of python-jose)
+STRING_CLAIMS = ("sub", "jti")
+
+
+class JWTDecodeError(Exception):
+    pass
+
+
+class JWTCodec(ABC):
+    name: str
+
+    @abstractmethod
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        pass
+
+    @abstractmethod
+    def decode(
+        self, token: str, key: str, algorithms: list[str], options: dict
+    ) -> dict:
+        pass
+
+
+class JoseCodec(JWTCodec):
+    """
+    python-jose (pure Python HMAC/JSON handling).
+    """
+
+    name = "jose"
+
+    def __init__(self) -> None:
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(
+        self, token: str, key: str, algorithms: list[str], options: dict
+    ) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms, options=options)
+        except self._error as e:
+            raise JWTDecodeError(str(e)) from e
+
+
+class PyJWTCodec(JWTCodec):
+    """
+    PyJWT, asymmetric algorithms use the cryptography backend.
+    Keys are parsed once per (algorithm, key) instead of on every call
+    (loading a PEM RSA private key costs far more than signing).
+    """
+
+    name = "pyjwt"
+
+    def __init__(self) -> None:
+        import jwt
+        from jwt.algorithms import get_default_algorithms
+
+        self._jwt = jwt
+        self._algorithms = get_default_algorithms()
+        self._keys: dict[tuple[str, str], object] = {}
+
+    def _prepare_key(self, key: str, algorithm: str):
+        prepared = self._keys.get((algorithm, key))
+
+        if prepared is None:
+            if algorithm not in self._algorithms:
+                return key
+            prepared = self._algorithms[algorithm].prepare_key(key)
+            self._keys[(algorithm, key)] = prepared
+
+        return prepared
+
+    @staticmethod
+    def _options(options: dict) -> dict:
+        """
+        Translate the python-jose options to PyJWT ones.
+        """
+        return {
+            "verify_signature": options.get("verify_signature", True),
+            "verify_exp": options.get("verify_exp", True),
+            "verify_nbf": options.get("verify_nbf", True),
+            "verify_iat": options.get("verify_iat", True),
+            "verify_aud": options.get("verify_aud", True),
+            "verify_iss": options.get("verify_iss", True),
+            "require": [
+                option.removeprefix("require_")
+                for option, required in options.items()
+                if option.startswith("require_")
+                and required
+                and option != "require_at_hash"
+            ],
+        }
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(
+            claims, self._prepare_key(key, algorithm), algorithm=algorithm
+        )
+
+    def decode(
+        self, token: str, key: str, algorithms: list[str], options: dict
+    ) -> dict:
+        try:
+            if len(algorithms) == 1:
+                key = self._prepare_key(key, algorithms[0])
+            payload = self._jwt.decode(
+                token,
+                key,
+                algorithms=algorithms,
+                options=self._options(options),
+                leeway=options.get("leeway", 0),
+            )
+        except self._jwt.PyJWTError as e:
+            raise JWTDecodeError(str(e)) from e
+
+        for claim in STRING_CLAIMS:
+            if options.get(f"verify_{claim}", True) and claim in payload:
+                if not isinstance(payload[claim], str):
+                    raise JWTDecodeError(f"Invalid {claim} claim, it must be a string")
+
+        return payload
+
+
+CODECS = {JoseCodec.name: JoseCodec, PyJWTCodec.name: PyJWTCodec}
+
+
+def get_codec(name: str) -> JWTCodec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown JWT backend: {name}")
+    return CODECS[name]()
+
+
+jwt_codec = get_codec(settings.JWT_BACKEND)
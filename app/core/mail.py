@@ -1,47 +1,107 @@
-import os
+from typing import TYPE_CHECKING
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from mailjet_rest import Client
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.logger import logger
+from app.modules.core.models import EmailOutbox
 
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
 
-def render_template(template_path, context):
-    env = Environment(
-        loader=FileSystemLoader(os.path.dirname(template_path)),
-        autoescape=select_autoescape(["html", "xml"]),
-    )
-    template = env.get_template(os.path.basename(template_path))
-    return template.render(context)
-
-
-def send_email(subject: str, recipients: list[dict[str, str]], body: str) -> None:
-    if settings.is_prod():
-        mailjet = Client(
-            auth=(settings.MAILJET_API_KEY, settings.MAILJET_API_SECRET), version="v3.1"
-        )
-        recipients_list = [
-            {"Email": recipient["email"], "Name": recipient["name"]}
-            for recipient in recipients
-        ]
-        data = {
-            "Messages": [
-                {
-                    "From": {
-                        "Email": settings.EMAIL_SENDER,
-                        "Name": settings.EMAIL_SENDER_NAME,
-                    },
-                    "To": recipients_list,
-                    "Subject": subject,
-                    "HTMLPart": body,
-                }
-            ]
-        }
-        result = mailjet.send.create(data=data)
-
-        logger.info(f"Email sent to {recipients} with subject {subject}")
-        logger.debug(f"Email result (code {result.status_code}): {result.json()}")
-    else:
-        logger.info(f"Email sent to {recipients} with subject {subject}")
-        logger.info(f"Email body:\n {body}")
+
+class TemplateRegistry:
+    """
+    Compiled email templates of a directory (MAIL_TEMPLATES_DIR).
+
+    Templates are compiled once, at startup with precompile() or on first use, and
+    rendered from the compiled version afterwards. With auto_reload, Jinja checks the
+    mtime of the file before each render and recompiles it when it changed (development).
+    Jinja is imported when the environment is first needed.
+    """
+
+    def __init__(self, directory: str, auto_reload: bool = False) -> None:
+        self.directory = directory
+        self.auto_reload = auto_reload
+        self._env: "Environment | None" = None
+        self._templates: dict[str, "Template"] = {}
+
+    @property
+    def env(self) -> "Environment":
+        if self._env is None:
+            from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+            self._env = Environment(
+                loader=FileSystemLoader(self.directory),
+                autoescape=select_autoescape(["html", "xml"]),
+                auto_reload=self.auto_reload,
+                cache_size=-1,
+            )
+        return self._env
+
+    def precompile(self) -> None:
+        for name in self.env.list_templates():
+            self._templates[name] = self.env.get_template(name)
+        logger.info(f"{len(self._templates)} email templates compiled")
+
+    def get(self, name: str) -> "Template":
+        if self.auto_reload:
+            return self.env.get_template(name)
+
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def render(self, name: str, context: dict) -> str:
+        return self.get(name).render(context)
+
+    def render_many(self, name: str, contexts: list[dict]) -> list[str]:
+        """
+        Render the same template for many contexts (bulk sends).
+        """
+        template = self.get(name)
+        return [template.render(context) for context in contexts]
+
+
+template_registry = TemplateRegistry(
+    settings.MAIL_TEMPLATES_DIR,
+    auto_reload=(
+        settings.is_dev()
+        if settings.MAIL_TEMPLATES_AUTO_RELOAD is None
+        else settings.MAIL_TEMPLATES_AUTO_RELOAD
+    ),
+)
+
+
+def render_template(template_name: str, context: dict) -> str:
+    """
+    Render an email template of MAIL_TEMPLATES_DIR
+    example:
+    render_template("verify_email.jinja", {"username": "john", "verification_url": url})
+    """
+    return template_registry.render(template_name, context)
+
+
+def render_templates(template_name: str, contexts: list[dict]) -> list[str]:
+    """
+    Render an email template for many contexts at once
+    example:
+    render_templates("verify_email.jinja", [context_1, context_2])
+    """
+    return template_registry.render_many(template_name, contexts)
+
+
+def enqueue_email(
+    db: AsyncSession, subject: str, recipients: list[dict[str, str]], body: str
+) -> EmailOutbox:
+    """
+    Add an email to the outbox, it is written with the current transaction
+    and sent afterwards by the outbox dispatcher (app.services.outbox).
+    example:
+    enqueue_email(db, "Hello", [{"email": "john@example.com", "name": "john"}], body)
+    await db.commit()
+    """
+    email = EmailOutbox(subject=subject, recipients=recipients, body=body)
+    db.add(email)
+    return email
@@ -1,12 +1,20 @@
 """
 Overwrites default settings of fastapi_pagination
+and adds a keyset (cursor) pagination mode
 """
 
-from typing import Generic, TypeVar
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Generic, TypeVar
 
-from fastapi import Query
+from fastapi import HTTPException, Query, status
 from fastapi_pagination.default import Page as BasePage
 from fastapi_pagination.default import Params as BaseParams
+from pydantic import BaseModel
+
+from app.services import strings
 
 T = TypeVar("T")
 
@@ -17,3 +25,59 @@ class Params(BaseParams):
 
 class Page(BasePage[T], Generic[T]):
     __params_type__ = Params
+
+
+class CursorOrder(str, Enum):
+    ID = "id"
+    CREATED_AT = "created_at"
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        # id is always the last key so that the ordering is stable
+        return ("id",) if self == CursorOrder.ID else ("created_at", "id")
+
+
+class CursorParams(BaseModel):
+    cursor: str | None = Query(None, description="Cursor of the page to fetch")
+    size: int = Query(100, ge=1, le=200, description="Page size")
+    order_by: CursorOrder = Query(CursorOrder.ID, description="Ordering key")
+    include_total: bool = Query(
+        False, description="Also count the rows (costs a full COUNT(*))"
+    )
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    size: int
+    next_cursor: str | None = None
+    total: int | None = None
+
+
+def encode_cursor(order_by: CursorOrder, values: tuple[Any, ...]) -> str:
+    """
+    Opaque cursor: the ordering key and the key values of the last row of a page.
+    """
+    raw = [
+        value.isoformat() if isinstance(value, datetime) else value for value in values
+    ]
+    data = json.dumps({"o": order_by.value, "k": raw}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(order_by: CursorOrder, cursor: str) -> tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = data["k"]
+
+        if data["o"] != order_by.value or len(keys) != len(order_by.columns):
+            raise ValueError("Cursor doesn't match the ordering")
+
+        return tuple(
+            datetime.fromisoformat(value) if column == "created_at" else int(value)
+            for column, value in zip(order_by.columns, keys)
+        )
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=strings.INVALID_CURSOR
+        )
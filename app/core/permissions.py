@@ -1,11 +1,174 @@
+import base64
+import hashlib
+import time
+from typing import Iterable
+
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.session import async_session
+from app.modules.core.models import Permission
+from app.services.cache import TTLCache
+
 scopes = {
     "admin": "Admin permissions: can do everything",
     "role:read": "Role permissions: can read all roles and specific user roles",
     "role:create": "Role permissions: can create roles",
+    "role:update": "Role permissions: can update roles",
     "role:delete": "Role permissions: can delete roles",
     "role:link": "Role permissions: can link/unlink roles to users",
     "permission:read": "Permission permissions: can read all permissions and specific user permissions",
     "permission:create": "Permission permissions: can create permissions",
+    "permission:update": "Permission permissions: can update permissions",
     "permission:delete": "Permission permissions: can delete permissions",
     "permission:link": "Permission permissions: can link/unlink permissions to roles",
 }
+
+# "role:*" grants every "role:..." scope, "*" grants every scope
+WILDCARD = "*"
+
+
+class ScopeRegistry:
+    """
+    Scopes compiled to bit positions so that access tokens carry a compact bitset
+    (scp claim) and scope checks are a single AND.
+
+    Bits are assigned in the sorted order of the known scopes (app scopes + Permission
+    scopes), the registry version (scv claim) is a digest of that list: a token issued
+    against another version must not be read with this registry.
+    Wildcard scopes ("role:*") have no bit, they are expanded to the bits they cover.
+    Masks resolved again for tokens of another version are cached per (user, version)
+    in user_masks, so that such a token doesn't cost a query per request.
+
+    Usage:
+        mask = scope_registry.mask(["role:*"])
+        token_claims = {"scp": scope_registry.encode(mask), "scv": scope_registry.version}
+        scope_registry.has_any(mask, ["admin", "role:read"])
+    """
+
+    def __init__(
+        self,
+        scopes: Iterable[str] = (),
+        reload_interval: float = 5,
+        user_masks_size: int = 10_000,
+        user_masks_ttl: float = 60,
+    ) -> None:
+        self.reload_interval = reload_interval
+        self.stale = False
+        self._loaded_at = 0.0
+        self.user_masks = TTLCache(
+            "scope_mask", maxsize=user_masks_size, ttl=user_masks_ttl
+        )
+        self.compile(scopes)
+
+    def compile(self, scopes: Iterable[str]) -> None:
+        names = sorted(
+            {scope for scope in scopes if scope and not scope.endswith(WILDCARD)}
+        )
+
+        self._bits = {scope: 1 << position for position, scope in enumerate(names)}
+        self._all = (1 << len(names)) - 1
+        self._masks: dict[tuple[str, ...], int] = {}
+        self.version = hashlib.sha256("\n".join(names).encode()).hexdigest()[:12]
+
+        logger.debug(f"Scope registry {self.version} compiled with {len(names)} scopes")
+
+    def __contains__(self, scope: str) -> bool:
+        return scope in self._bits
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def _scope_mask(self, scope: str) -> int:
+        if scope == WILDCARD:
+            return self._all
+        if scope.endswith(WILDCARD):
+            prefix = scope[:-1]
+            bits = (bit for name, bit in self._bits.items() if name.startswith(prefix))
+            return sum(bits)
+        return self._bits.get(scope, 0)
+
+    def mask(self, scopes: Iterable[str]) -> int:
+        """
+        Bitset of the scopes, wildcards are expanded and unknown scopes are ignored.
+        Masks are memoized per scopes tuple (route scopes are always the same).
+        """
+        key = tuple(scopes)
+        mask = self._masks.get(key)
+
+        if mask is None:
+            mask = 0
+            for scope in key:
+                mask |= self._scope_mask(scope)
+            if len(self._masks) < 4096:
+                self._masks[key] = mask
+
+        return mask
+
+    def has_any(self, granted: int, required: Iterable[str]) -> bool:
+        return bool(granted & self.mask(required))
+
+    def names(self, mask: int) -> list[str]:
+        return [scope for scope, bit in self._bits.items() if mask & bit]
+
+    @staticmethod
+    def encode(mask: int) -> str:
+        raw = mask.to_bytes(max((mask.bit_length() + 7) // 8, 1), "little")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    @staticmethod
+    def decode(value: str) -> int:
+        """
+        Raises ValueError on a malformed bitset.
+        """
+        # validate=True, characters outside of the alphabet aren't silently dropped
+        raw = base64.b64decode(
+            value + "=" * (-len(value) % 4), altchars=b"-_", validate=True
+        )
+        return int.from_bytes(raw, "little")
+
+    def mark_stale(self) -> None:
+        """
+        Permissions changed: reload before issuing the next token.
+        """
+        self.stale = True
+
+    async def load(self, db=None) -> None:
+        """
+        Compile the app scopes and the scopes of every Permission.
+        """
+        query = select(Permission.scope).distinct()
+        if db is None:
+            async with async_session() as session:
+                execute = await session.execute(query)
+        else:
+            execute = await db.execute(query)
+
+        self.compile([*scopes, *execute.scalars().all()])
+        self.stale = False
+        self._loaded_at = time.monotonic()
+
+    async def startup(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            # Tokens still work, only the app scopes are known until the next reload
+            logger.error(f"Couldn't load the scopes from the database: {e}")
+            self.mark_stale()
+
+    async def refresh(self, db, force: bool = False) -> None:
+        """
+        Reload when stale, or when forced (a token from another version was seen)
+        at most once every reload_interval seconds.
+        """
+        throttled = time.monotonic() - self._loaded_at < self.reload_interval
+        if self.stale or (force and not throttled):
+            await self.load(db)
+
+
+scope_registry = ScopeRegistry(
+    scopes,
+    user_masks_size=settings.SCOPE_MASK_CACHE_SIZE,
+    user_masks_ttl=settings.SCOPE_MASK_CACHE_TTL_SECONDS,
+)
@@ -1,34 +1,121 @@
 from fastapi import HTTPException, status
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    any_,
+    bindparam,
+    delete,
+    func,
+    inspect,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import RelationshipDirection
 
+from app.core.params_paginate import CursorParams, decode_cursor, encode_cursor
+from app.db.loading import LoadingProfile, loading_options
+from app.services.principal_cache import principal_cache
 
-def get_all_paginate(model):
+
+def get_all_paginate(model, profile: LoadingProfile = LoadingProfile.SUMMARY):
     """
     Get all entries with pagination : only works with FastAPI pagination
     example:
     get_all_paginate(Role)
     """
-    return select(model)
+    return select(model).options(*loading_options(model, profile))
+
+
+async def get_all_keyset(
+    db: AsyncSession,
+    model,
+    params: CursorParams,
+    filter_lst: list | None = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY,
+) -> dict:
+    """
+    Get a page of entries with keyset pagination, returns a CursorPage compatible dict.
+    Rows are fetched after the cursor (WHERE (created_at, id) > (...)) instead of
+    using an OFFSET, so every page costs the same whatever its depth.
+    example:
+    get_all_keyset(db, Role, params)
+    """
+    filter_lst = filter_lst or []
+    columns = [getattr(model, column) for column in params.order_by.columns]
+
+    query = (
+        select(model)
+        .where(*filter_lst)
+        .options(*loading_options(model, profile))
+        .order_by(*columns)
+        .limit(params.size + 1)
+    )
+
+    if params.cursor:
+        values = decode_cursor(params.order_by, params.cursor)
+        if len(columns) == 1:
+            query = query.where(columns[0] > values[0])
+        else:
+            query = query.where(tuple_(*columns) > tuple_(*values))
+
+    execute = await db.execute(query)
+    items = list(execute.scalars().all())
+
+    next_cursor = None
+    if len(items) > params.size:
+        items = items[: params.size]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            params.order_by,
+            tuple(getattr(last, column) for column in params.order_by.columns),
+        )
+
+    total = None
+    if params.include_total:
+        count = await db.execute(
+            select(func.count()).select_from(model).where(*filter_lst)
+        )
+        total = count.scalar_one()
+
+    return {
+        "items": items,
+        "size": params.size,
+        "next_cursor": next_cursor,
+        "total": total,
+    }
 
 
-async def get_all(db: AsyncSession, model):
+async def get_all(
+    db: AsyncSession, model, profile: LoadingProfile = LoadingProfile.SUMMARY
+):
     """
     Get all entries
     example:
     get_all(db, Role)
     """
-    query = await db.execute(select(model))
+    query = await db.execute(select(model).options(*loading_options(model, profile)))
     return query.scalars().all()
 
 
-async def get_specific_by_id(db: AsyncSession, model, id: int):
+async def get_specific_by_id(
+    db: AsyncSession,
+    model,
+    id: int,
+    profile: LoadingProfile = LoadingProfile.SUMMARY,
+):
     """
-    Get an entry by id
+    Get an entry by id, relationships are loaded according to the profile
     example:
     get_specific_by_id(db, Role, role.id)
+    get_specific_by_id(db, Role, role.id, LoadingProfile.WITH_PERMISSIONS)
     """
-    query = await db.execute(select(model).where(model.id == id))
+    query = await db.execute(
+        select(model).where(model.id == id).options(*loading_options(model, profile))
+    )
     result = query.scalars().first()
 
     if result is not None:
@@ -39,13 +126,20 @@ async def get_specific_by_id(db: AsyncSession, model, id: int):
         )
 
 
-async def get_specific(db: AsyncSession, model, filter_lst: list):
+async def get_specific(
+    db: AsyncSession,
+    model,
+    filter_lst: list,
+    profile: LoadingProfile = LoadingProfile.SUMMARY,
+):
     """
     Get an entry by id
     example:
     get_specific(db, Role, [Role.name == "test"])
     """
-    query = await db.execute(select(model).where(*filter_lst))
+    query = await db.execute(
+        select(model).where(*filter_lst).options(*loading_options(model, profile))
+    )
     result = query.scalars().first()
 
     if result is not None:
@@ -73,6 +167,8 @@ async def delete_by_id(db, model, id: int):
     await db.commit()
     await db.flush()
 
+    principal_cache.invalidate_entry(query)
+
     return {
         "status": True,
         "msg": f"{model.__name__} ({id}) Deleted",
@@ -140,4 +236,195 @@ async def update_entry(db: AsyncSession, model, entry_id: int, schema):
     await db.commit()
     await db.refresh(query)
 
+    principal_cache.invalidate_entry(query)
+
     return query
+
+
+def ids_in(column, ids: list[int]):
+    """
+    column = ANY(:ids) with the ids bound as a single array parameter
+    (one statement whatever the number of ids, unlike an expanding IN)
+    example:
+    select(Role).where(ids_in(Role.id, [1, 2, 3]))
+    """
+    return column == any_(bindparam(None, list(ids), type_=ARRAY(Integer)))
+
+
+def _to_dict(schema) -> dict:
+    if isinstance(schema, dict):
+        return schema
+    return schema.dict(exclude_unset=True)
+
+
+async def _execute_bulk(db: AsyncSession, model, stmt, params: list | None = None):
+    try:
+        return await db.execute(stmt, params)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{model.__name__} bulk operation violates a constraint",
+        )
+
+
+async def bulk_create(
+    db: AsyncSession, model, schemas: list, unique_column: str | None = None
+) -> list:
+    """
+    Create many entries with a multi-row INSERT ... RETURNING in one transaction.
+    With unique_column, conflicting rows are skipped (ON CONFLICT DO NOTHING).
+    Returns a list aligned with schemas: the created entry or None when skipped.
+    example:
+    bulk_create(db, Role, [RoleCreate(...), RoleCreate(...)], unique_column="name")
+    """
+    rows = [_to_dict(schema) for schema in schemas]
+    if not rows:
+        return []
+
+    if unique_column is None:
+        stmt = pg_insert(model).returning(model, sort_by_parameter_order=True)
+        execute = await _execute_bulk(db, model, stmt, rows)
+        created = list(execute.scalars().all())
+        await db.commit()
+        return created
+
+    stmt = (
+        pg_insert(model)
+        .on_conflict_do_nothing(index_elements=[unique_column])
+        .returning(model)
+    )
+    execute = await _execute_bulk(db, model, stmt, rows)
+    created = {getattr(entry, unique_column): entry for entry in execute.scalars()}
+    await db.commit()
+
+    # Skipped rows aren't returned, match them back by their unique value
+    # (the first occurrence of a duplicated value gets the entry)
+    return [created.pop(row.get(unique_column), None) for row in rows]
+
+
+async def bulk_update(db: AsyncSession, model, ids: list[int], schema) -> list[int]:
+    """
+    Update many entries with the same values (UPDATE ... WHERE id = ANY(:ids)),
+    returns the ids that were updated.
+    example:
+    bulk_update(db, User, [1, 2, 3], {"is_active": False})
+    """
+    values = _to_dict(schema)
+    if not ids or not values:
+        return []
+
+    stmt = (
+        update(model)
+        .where(ids_in(model.id, ids))
+        .values(**values)
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    execute = await _execute_bulk(db, model, stmt)
+    updated = list(execute.scalars().all())
+    await db.commit()
+
+    principal_cache.invalidate_model_ids(model, updated)
+
+    return updated
+
+
+async def bulk_delete(
+    db: AsyncSession,
+    model,
+    ids: list[int] | None = None,
+    filter_lst: list | None = None,
+) -> list[int]:
+    """
+    Delete many entries by ids and/or filter with set-based DELETEs, returns the deleted ids.
+    Children deleted by an ORM cascade (e.g. User.profile) are deleted first,
+    pivot tables rely on their ON DELETE CASCADE.
+    example:
+    bulk_delete(db, Role, ids=[1, 2, 3])
+    bulk_delete(db, User, filter_lst=[User.is_active.is_(False)])
+    """
+    if ids is None and not filter_lst:
+        raise ValueError("bulk_delete needs ids or a filter")
+
+    conditions = list(filter_lst or [])
+    if ids is not None:
+        if not ids:
+            return []
+        conditions.append(ids_in(model.id, ids))
+
+    targets = select(model.id).where(*conditions).scalar_subquery()
+
+    for relationship in inspect(model).relationships:
+        if (
+            relationship.direction is not RelationshipDirection.ONETOMANY
+            or not relationship.cascade.delete
+        ):
+            continue
+        child = relationship.mapper.class_
+        for _, remote in relationship.local_remote_pairs:
+            await db.execute(
+                delete(child)
+                .where(remote.in_(targets))
+                .execution_options(synchronize_session=False)
+            )
+
+    stmt = (
+        delete(model)
+        .where(*conditions)
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    execute = await _execute_bulk(db, model, stmt)
+    deleted = list(execute.scalars().all())
+    await db.commit()
+
+    principal_cache.invalidate_model_ids(model, deleted)
+
+    return deleted
+
+
+def bulk_ids_response(model, action: str, ids: list[int], done: list[int]) -> dict:
+    """
+    Per-item response (BulkResponse) of a bulk update/delete
+    example:
+    bulk_ids_response(Role, "deleted", [1, 2], await bulk_delete(db, Role, ids=[1, 2]))
+    """
+    done = set(done)
+    results = [
+        {
+            "id": id,
+            "status": id in done,
+            "msg": f"{model.__name__} {action}"
+            if id in done
+            else f"{model.__name__} not found",
+        }
+        for id in ids
+    ]
+
+    return {
+        "status": all(result["status"] for result in results),
+        "msg": f"{len(done)}/{len(ids)} {model.__name__} {action}",
+        "results": results,
+    }
+
+
+def bulk_create_response(model, entries: list) -> dict:
+    """
+    Per-item response (BulkResponse) of bulk_create, skipped entries already existed
+    example:
+    bulk_create_response(Role, await bulk_create(db, Role, roles, unique_column="name"))
+    """
+    results = [
+        {"id": entry.id, "status": True, "msg": f"{model.__name__} created"}
+        if entry is not None
+        else {"id": None, "status": False, "msg": f"{model.__name__} already exists"}
+        for entry in entries
+    ]
+    created = sum(result["status"] for result in results)
+
+    return {
+        "status": created == len(results),
+        "msg": f"{created}/{len(results)} {model.__name__} created",
+        "results": results,
+    }
@@ -0,0 +1,47 @@
+"""
+Opt-in fast serialization path for responses.
+
+By default FastAPI validates the returned ORM objects against the response_model,
+dumps the model to python objects, runs jsonable_encoder and finally json.dumps.
+serialize_response validates once with a prebuilt pydantic-core TypeAdapter and dumps
+straight to JSON bytes. The route keeps its response_model for the OpenAPI schema.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+
+class PydanticJSONResponse(JSONResponse):
+    """
+    JSONResponse taking already serialized JSON bytes
+    (subclassing JSONResponse keeps the response_model in the OpenAPI schema).
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def serialize_response(
+    schema: Any, content: Any, status_code: int = status.HTTP_200_OK
+) -> PydanticJSONResponse:
+    """
+    Serialize ORM objects/dicts/models to a JSON response with the given schema
+    example:
+    @router.get("/users", response_model=Page[UserSchema], response_class=PydanticJSONResponse)
+    async def get_all_users(...):
+        return serialize_response(Page[UserSchema], await paginate(db, query))
+    """
+    adapter = get_type_adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return PydanticJSONResponse(content=body, status_code=status_code)
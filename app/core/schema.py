@@ -1,9 +1,33 @@
-from typing import Any
+from typing import Any, Generic, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+T = TypeVar("T")
 
 
 class DefaultResponse(BaseModel):
     status: bool
     msg: str
     details: dict[Any, Any] | None = {}
+
+
+class BulkItemResult(BaseModel):
+    id: int | None = None
+    status: bool
+    msg: str
+
+
+class BulkResponse(BaseModel):
+    status: bool
+    msg: str
+    results: list[BulkItemResult]
+
+
+class BulkIds(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+class BulkUpdate(BulkIds, Generic[T]):
+    values: T
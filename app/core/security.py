@@ -1,3 +1,4 @@
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Union
@@ -5,20 +6,27 @@ from typing import Union
 import bcrypt
 from fastapi import Depends, HTTPException, Query
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
-from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from starlette import status
 
 from app.auth.schema import TokenData
 from app.core.config import settings
+from app.core.jwt_codec import JWTDecodeError, jwt_codec
 from app.core.logger import logger
+from app.core.permissions import scope_registry
 from app.core.query_factory import check_if_exists
-from app.db.deps import get_db
+from app.db.deps import get_db, stick_principal
+from app.db.loading import LoadingProfile
 from app.modules.admin.crud import get_user_by_username
+from app.modules.core.crud import get_user_scopes
 from app.modules.core.models import EmailVerification, User
+from app.modules.users.schema import UserPrincipal
 from app.services import strings
+from app.services.hashing import hashing_pool
+from app.services.metrics import BLACKLIST_CONTAINS_LATENCY, BLACKLIST_SET_KEY_LATENCY
+from app.services.principal_cache import principal_cache
 from app.services.storage import storage
+from app.services.token_cache import token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/token",
@@ -56,23 +64,58 @@ def verify_password(password: str, password_hash: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
 
 
+async def get_password_hash_async(password: str) -> str:
+    """
+    Same as get_password_hash but runs on the password hashing pool.
+    """
+    return await hashing_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """
+    Same as verify_password but runs on the password hashing pool.
+    """
+    return await hashing_pool.run(verify_password, password, password_hash)
+
+
 async def _get_user_scopes(db: AsyncSession, user: User) -> list:
     """
     Get user scopes from the database.
     """
-    query = select(User).filter(User.id == user.id)
-    user = await db.execute(query)
-    result = user.scalars().first()
-
-    user_scopes = [
-        permission.scope for role in result.roles for permission in role.permissions
-    ]
+    user_scopes = await get_user_scopes(db, user.id)
 
-    logger.debug(f"User {result.username} has the following scopes: {user_scopes}")
+    logger.debug(f"User {user.username} has the following scopes: {user_scopes}")
 
     return user_scopes
 
 
+async def _get_token_scope_mask(db: AsyncSession, payload: dict, user) -> int:
+    """
+    Scopes bitset granted by an access token (raises ValueError on a malformed bitset).
+    Tokens issued against another registry version get their scopes resolved again
+    (cached per user and version), tokens with a scopes list (JWT_SCOPES_BITSET disabled) are compiled on the fly.
+    """
+    if "scp" not in payload:
+        return scope_registry.mask(payload.get("scopes", []))
+
+    version = payload.get("scv")
+    if version != scope_registry.version:
+        await scope_registry.refresh(db, force=True)
+
+    if version == scope_registry.version:
+        return scope_registry.decode(payload["scp"])
+
+    key = (user.id, scope_registry.version)
+    mask = scope_registry.user_masks.get(key)
+    if mask is None:
+        logger.debug(
+            f"Token scopes from registry {version}, resolving {user.username} scopes"
+        )
+        mask = scope_registry.mask(await get_user_scopes(db, user.id))
+        scope_registry.user_masks.set(key, mask)
+    return mask
+
+
 async def check_user_auth(db: AsyncSession, username: str, password: str):
     """
     Check if user information (username, password) are valid
@@ -87,7 +130,7 @@ async def check_user_auth(db: AsyncSession, username: str, password: str):
 
     if not user:
         raise credentials_error
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         raise credentials_error
 
     logger.info(f"Authenticating user {username}")
@@ -95,6 +138,23 @@ async def check_user_auth(db: AsyncSession, username: str, password: str):
     return user
 
 
+def _get_signing_key(type: str) -> str:
+    if type == "access_token":
+        return settings.JWT_ACCESS_TOKEN_KEY
+    return settings.JWT_REFRESH_TOKEN_KEY
+
+
+def _get_verification_key(type: str) -> str:
+    """
+    Public key with an asymmetric algorithm (RS256, ES256...), else the signing key.
+    """
+    if type == "access_token":
+        public_key = settings.JWT_ACCESS_TOKEN_PUBLIC_KEY
+    else:
+        public_key = settings.JWT_REFRESH_TOKEN_PUBLIC_KEY
+    return public_key or _get_signing_key(type)
+
+
 def create_jwt_token(
     data: dict[str, Union[str, list[str]]],
     expires_delta: timedelta | None = None,
@@ -114,20 +174,36 @@ def create_jwt_token(
     iss = settings.PROJECT_NAME
     jti = str(uuid.uuid4())
 
-    jwt_key = (
-        settings.JWT_ACCESS_TOKEN_KEY
-        if type == "access_token"
-        else settings.JWT_REFRESH_TOKEN_KEY
-    )
-
     to_encode.update({"exp": expire, "iat": iat, "iss": iss, "jti": jti, "type": type})
-    encoded_jwt = jwt.encode(to_encode, jwt_key, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt_codec.encode(
+        to_encode, _get_signing_key(type), algorithm=settings.ALGORITHM
+    )
 
     logger.debug(f"Creating {type} for user {data['sub']}")
 
     return encoded_jwt
 
 
+def decode_jwt_token(token: str, type: str = "access_token") -> dict:
+    """
+    Verify a JWT and return its payload, raises JWTDecodeError when it's invalid.
+    Verified payloads are served from the token cache until the token expires.
+    """
+    payload = token_cache.get_payload(token, type)
+    if payload is not None:
+        return payload
+
+    payload = jwt_codec.decode(
+        token,
+        _get_verification_key(type),
+        algorithms=[settings.ALGORITHM],
+        options=JWT_OPTIONS,
+    )
+    token_cache.set_payload(token, type, payload)
+
+    return payload
+
+
 async def check_jwt(
     security_scopes: SecurityScopes = SecurityScopes(),
     db: AsyncSession = Depends(get_db),
@@ -148,17 +224,7 @@ async def check_jwt(
         authenticate_value = f'Bearer scope="{security_scopes.scope_str}"'
 
     try:
-        jwt_key = (
-            settings.JWT_ACCESS_TOKEN_KEY
-            if type == "access_token"
-            else settings.JWT_REFRESH_TOKEN_KEY
-        )
-        payload = jwt.decode(
-            token,
-            jwt_key,
-            algorithms=[settings.ALGORITHM],
-            options=JWT_OPTIONS,
-        )
+        payload = decode_jwt_token(token, type)
 
         jti: str = payload.get("jti")
         username: str = payload.get("sub")
@@ -168,15 +234,34 @@ async def check_jwt(
 
         token_scopes = payload.get("scopes", [])
         token_data = TokenData(username=username, scopes=token_scopes)
-    except JWTError:
+    except JWTDecodeError:
         raise credentials_exception
 
-    user = await get_user_by_username(db, username=token_data.username)
+    user = principal_cache.get_principal(token_data.username)
 
     if user is None:
-        raise credentials_exception
+        # From the primary: a lagging replica could cache a user that was just
+        # deactivated (and its cache entry invalidated) for the whole TTL
+        db_user = await get_user_by_username(
+            db,
+            username=token_data.username,
+            profile=LoadingProfile.WITH_PROFILE,
+            use_primary=True,
+        )
 
-    if jti in storage:
+        if db_user is None:
+            raise credentials_exception
+
+        user = principal_cache.set_principal(db_user)
+
+    # Reads of a user that wrote recently go to the primary, even without the cookie
+    stick_principal(db, user.id)
+
+    start = time.perf_counter()
+    blacklisted = await storage.contains(jti)
+    BLACKLIST_CONTAINS_LATENCY.observe(time.perf_counter() - start)
+
+    if blacklisted:
         logger.debug(f"{jti} is in blacklist")
         raise credentials_exception
 
@@ -185,9 +270,11 @@ async def check_jwt(
         raise credentials_exception
 
     if security_scopes.scopes:
-        check_scope = any(
-            scope in token_data.scopes for scope in security_scopes.scopes
-        )
+        try:
+            granted = await _get_token_scope_mask(db, payload, user)
+        except ValueError:
+            raise credentials_exception
+        check_scope = scope_registry.has_any(granted, security_scopes.scopes)
     else:
         # If no security scopes are defined, return True
         check_scope = True
@@ -203,8 +290,8 @@ async def check_jwt(
 
 
 def get_current_active_user(
-    current_user: User = Depends(check_jwt),
-) -> User:
+    current_user: UserPrincipal = Depends(check_jwt),
+) -> UserPrincipal:
     """
     Check the current logged-in user.
     """
@@ -229,25 +316,18 @@ def validate_refresh_token(db: AsyncSession, token: str = Depends(oauth2_scheme)
     return check_jwt(db=db, token=token, type="refresh_token")
 
 
-def add_token_to_blacklist(token: str, type: str = "refresh_token") -> None:
+async def add_token_to_blacklist(token: str, type: str = "refresh_token") -> None:
     """
     Add a token to the blacklist (refresh_token, access_token).
     If REDIS_CONNECTION is True, use a redis connection, else use a local dict.
     """
-    jwt_key = (
-        settings.JWT_ACCESS_TOKEN_KEY
-        if type == "access_token"
-        else settings.JWT_REFRESH_TOKEN_KEY
-    )
-    payload = jwt.decode(
-        token,
-        jwt_key,
-        algorithms=[settings.ALGORITHM],
-        options=JWT_OPTIONS,
-    )
+    payload = decode_jwt_token(token, type)
     jti = payload.get("jti")
     exp = payload.get("exp")
-    storage.set_key(jti, exp)
+    start = time.perf_counter()
+    await storage.set_key(jti, exp)
+    BLACKLIST_SET_KEY_LATENCY.observe(time.perf_counter() - start)
+    token_cache.invalidate_jti(jti)
     logger.info(f"Adding {jti} (expiring {exp}) to blacklist")
 
 
@@ -255,11 +335,20 @@ async def generate_access_refresh_token(db: AsyncSession, user) -> dict[str, str
     """
     Return an access token and a refresh token for a specific user.
     """
+    await scope_registry.refresh(db)
     user_scopes = await _get_user_scopes(db, user)
 
+    if settings.JWT_SCOPES_BITSET:
+        scopes_claims = {
+            "scp": scope_registry.encode(scope_registry.mask(user_scopes)),
+            "scv": scope_registry.version,
+        }
+    else:
+        scopes_claims = {"scopes": user_scopes}
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_jwt_token(
-        data={"sub": user.username, "scopes": user_scopes},
+        data={"sub": user.username, **scopes_claims},
         expires_delta=access_token_expires,
     )
 
@@ -1,17 +1,138 @@
+import time
 from typing import AsyncIterator
 
+from fastapi import Request
 from sqlalchemy import Column, ForeignKey, Integer, Table
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.config import settings
 from app.db.base import Base
-from app.db.session import async_session
+from app.db.session import async_session, replica_set
+from app.services.cache import TTLCache
 
+# Set after a commit that wrote, the client then reads from the primary until it expires
+PRIMARY_COOKIE = "db_primary_until"
+READ_METHODS = ("GET", "HEAD")
 
-async def get_db() -> AsyncIterator[AsyncSession]:
-    async with async_session() as db:
+# Users that committed a write, their reads go to the primary until the entry expires.
+# Clients that don't keep cookies (bearer tokens) rely on it, it is per worker.
+primary_principals = TTLCache(
+    "primary_principals",
+    maxsize=100_000,
+    ttl=settings.DATABASE_REPLICA_STICKY_SECONDS,
+)
+
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _session_info(request: Request, read_only: bool) -> dict:
+    info = {}
+    if replica_set:
+        info["read_only"] = read_only and not _reads_from_primary(request)
+        info["state"] = request.state
+    return info
+
+
+async def _get_session(
+    request: Request, read_only: bool
+) -> AsyncIterator[AsyncSession]:
+    async with async_session(info=_session_info(request, read_only)) as db:
+        yield db
+
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Session of the request, the reads of GET/HEAD requests go to a replica
+    when DATABASE_REPLICA_URLS is set (see app.db.session.RoutingSession).
+    """
+    async for db in _get_session(request, request.method in READ_METHODS):
+        yield db
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Same as get_db but reads from a replica whatever the method (e.g. POST searches).
+    """
+    async for db in _get_session(request, True):
+        yield db
+
+
+async def get_primary_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Same as get_db but always uses the primary (GET routes that write).
+    """
+    async for db in _get_session(request, False):
         yield db
 
 
+def stick_principal(db: AsyncSession, principal_id: int) -> None:
+    """
+    Binds the authenticated user to the request, the session of a user that wrote
+    recently reads from the primary (see ReplicaStickinessMiddleware).
+    example:
+    stick_principal(db, user.id)
+    """
+    state = db.info.get("state")
+    if state is None:
+        return
+    state.principal_id = principal_id
+    if principal_id in primary_principals:
+        db.info["read_only"] = False
+
+
+def stream_session(request: Request) -> AsyncSession:
+    """
+    Read-only session for the body of a StreamingResponse, the sessions of the
+    dependencies are closed before the response is sent.
+    example:
+    async with stream_session(request) as db:
+        result = await db.stream(query)
+    """
+    return async_session(info=_session_info(request, True))
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pure ASGI middleware setting the PRIMARY_COOKIE when the request committed a write,
+    so that the next requests of the client read their own writes (read-your-writes).
+    The authenticated user is also kept in primary_principals for the clients
+    without cookies, the Secure flag is set on the cookie over HTTPS.
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: int) -> None:
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            state = scope.get("state", {})
+            if message["type"] == "http.response.start" and state.get("db_wrote"):
+                if state.get("principal_id") is not None:
+                    primary_principals.set(state["principal_id"], True)
+                until = int(time.time()) + self.sticky_seconds
+                secure = "; Secure" if scope.get("scheme") == "https" else ""
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_COOKIE}={until}; Max-Age={self.sticky_seconds}; "
+                    f"Path=/; HttpOnly; SameSite=Lax{secure}",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
 def reference_col(
     tablename: str,
     nullable=False,
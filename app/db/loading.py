@@ -0,0 +1,56 @@
+"""
+Relationship loading profiles.
+
+Every relationship is declared with lazy="raise": an endpoint has to ask explicitly
+for the graph its response_model serializes, by passing a profile to the query_factory
+functions, e.g. get_specific_by_id(db, Role, role_id, LoadingProfile.WITH_PERMISSIONS).
+"""
+
+from enum import Enum
+
+from sqlalchemy.orm.interfaces import LoaderOption
+
+
+class LoadingProfile(str, Enum):
+    SUMMARY = "summary"
+    WITH_PROFILE = "with_profile"
+    WITH_ROLES = "with_roles"
+    WITH_PERMISSIONS = "with_permissions"
+    FULL = "full"
+
+
+_loading_profiles: dict[type, dict[LoadingProfile, list[LoaderOption]]] = {}
+
+
+def register_loading_profiles(
+    model, profiles: dict[LoadingProfile, list[LoaderOption]]
+) -> None:
+    """
+    Register the loader options of each profile for a model.
+
+    Usage:
+        register_loading_profiles(Role, {
+            LoadingProfile.WITH_PERMISSIONS: [selectinload(Role.permissions)],
+        })
+    """
+    _loading_profiles[model] = profiles
+
+
+def loading_options(
+    model, profile: LoadingProfile | str = LoadingProfile.SUMMARY
+) -> list[LoaderOption]:
+    """
+    Return the loader options to apply to a select(model) for a profile.
+    The summary profile only loads the columns of the model.
+    """
+    profile = LoadingProfile(profile)
+
+    if profile == LoadingProfile.SUMMARY:
+        return []
+
+    try:
+        return _loading_profiles[model][profile]
+    except KeyError:
+        raise ValueError(
+            f"Loading profile '{profile.value}' is not defined for {model.__name__}"
+        )
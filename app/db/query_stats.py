@@ -0,0 +1,154 @@
+"""
+SQL statements, rows and database time of the current request, collected with
+engine events and reported in the Server-Timing header and the logs.
+
+The hot routes declare a query budget, a request executing more statements than
+its budget raises QueryBudgetExceeded (re-raised by the TestClient) when
+QUERY_BUDGETS_ENFORCED (tests), otherwise it is logged as a warning:
+    query_budgets.declare("GET", "/api/v1/core/roles/{role_id}/permissions", 3)
+"""
+
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logger import logger
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class QueryStats:
+    __slots__ = ("statements", "rows", "db_time")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.rows = 0
+        self.db_time = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f"app;dur={total * 1000:.2f}, "
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.statements} statements, {self.rows} rows"'
+        )
+
+
+# Stats of the current request, None outside of a request
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements of a connection are sequential
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+
+    if stats is not None:
+        stats.statements += 1
+        # asyncpg reports the number of rows of SELECT statements too
+        stats.rows += max(cursor.rowcount, 0)
+        stats.db_time += time.perf_counter() - conn.info["query_start"]
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudgets:
+    """
+    Maximum number of statements per route ("METHOD", "route path").
+    """
+
+    def __init__(self, enforce: bool) -> None:
+        self.enforce = enforce
+        self.budgets: dict[tuple[str, str], int] = {}
+
+    def declare(self, method: str, route: str, statements: int) -> None:
+        self.budgets[(method.upper(), route)] = statements
+
+    def clear(self) -> None:
+        self.budgets.clear()
+
+    def check(self, method: str, route: str, stats: QueryStats) -> None:
+        budget = self.budgets.get((method, route))
+
+        if budget is None or stats.statements <= budget:
+            return
+
+        message = f"{method} {route} executed {stats.statements} statements, budget is {budget}"
+        if self.enforce:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+query_budgets = QueryBudgets(enforce=settings.QUERY_BUDGETS_ENFORCED)
+
+
+def route_path(scope: Scope) -> str:
+    """
+    Path template of the matched route ("/api/v1/users/{user_id}").
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    return route.path
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware collecting the QueryStats of each request.
+
+    Adds a Server-Timing header (app and db durations, statements and rows),
+    logs the stats (warning above warn_statements) and checks the query budgets.
+    """
+
+    def __init__(self, app: ASGIApp, warn_statements: int) -> None:
+        self.app = app
+        self.warn_statements = warn_statements
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", stats.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _query_stats.reset(token)
+
+        method, route = scope["method"], route_path(scope)
+        log = (
+            logger.warning if stats.statements > self.warn_statements else logger.debug
+        )
+        log(
+            f"{method} {route}: {stats.statements} statements, {stats.rows} rows, "
+            f"{stats.db_time * 1000:.2f}ms in database"
+        )
+        query_budgets.check(method, route, stats)
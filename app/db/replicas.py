@@ -0,0 +1,129 @@
+"""
+Read replicas of the primary database (DATABASE_REPLICA_URLS).
+
+A background task measures the replication lag of each replica every interval
+seconds, a replica is only used while it answers and lags less than max_lag
+seconds, otherwise the reads go back to the primary.
+"""
+
+import asyncio
+import itertools
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.logger import logger
+
+# 0 when the replica replayed everything it received (or isn't a replica)
+REPLICATION_LAG = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        # Unused until the first check succeeds
+        self.healthy = False
+        self.lag: float | None = None
+        self.error: str | None = None
+
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        # A lost connection takes the replica out right away, the next check
+        # puts it back once it answers again
+        if context.is_disconnect or context.connection is None:
+            self.mark_unhealthy(str(context.original_exception))
+
+    def mark_unhealthy(self, error: str) -> None:
+        if self.healthy:
+            logger.warning(f"Replica {self.name} is not used anymore: {error}")
+        self.healthy = False
+        self.error = error
+
+    def stats(self) -> dict:
+        return {"healthy": self.healthy, "lag_seconds": self.lag, "error": self.error}
+
+
+class ReplicaSet:
+    """
+    Healthy replicas are chosen in turn, choose() returns None when there is none
+    (the caller then uses the primary).
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        max_lag: float = 5,
+        interval: float = 2,
+        timeout: float = 2,
+    ) -> None:
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.interval = interval
+        self.timeout = timeout
+        self._cycle = itertools.cycle(replicas)
+        self._task: asyncio.Task | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Replica | None:
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                lag = await asyncio.wait_for(
+                    connection.scalar(REPLICATION_LAG), timeout=self.timeout
+                )
+        except asyncio.TimeoutError:
+            replica.mark_unhealthy(f"Timed out after {self.timeout}s")
+            return
+        except Exception as e:
+            replica.mark_unhealthy(str(e))
+            return
+
+        replica.lag = round(float(lag), 3)
+        if replica.lag > self.max_lag:
+            replica.mark_unhealthy(f"Lagging {replica.lag}s behind the primary")
+            return
+
+        if not replica.healthy:
+            logger.info(f"Replica {replica.name} is used ({replica.lag}s lag)")
+        replica.healthy = True
+        replica.error = None
+
+    async def check_once(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_once()
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self.replicas:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict[str, dict]:
+        return {replica.name: replica.stats() for replica in self.replicas}
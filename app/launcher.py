@@ -0,0 +1,246 @@
+"""
+Production entry point: python -m app.launcher
+
+The app is imported once in the parent, gc.freeze() moves its objects out of the
+garbage collector and N uvicorn workers are forked on a shared socket, so that the
+workers share the memory of the imported app (copy-on-write) instead of each
+importing it. Dead workers are replaced, SIGTERM/SIGINT stop every worker.
+
+The worker count defaults to the CPU quota of the container (cgroup v2 or v1) and
+DATABASE_CONNECTION_BUDGET, when set, is divided between the engines (primary and
+replicas) of the workers.
+"""
+
+import gc
+import math
+import os
+import signal
+import tempfile
+import time
+from dataclasses import dataclass
+from importlib.util import find_spec
+
+from app.core.config import settings
+from app.core.logger import logger
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+@dataclass
+class Topology:
+    workers: int
+    workers_source: str
+    cpus: float
+    loop: str
+    http: str
+    pool_size: int
+    max_overflow: int
+    # Primary and replicas, every engine of a worker has its own pool
+    engines: int = 1
+
+    @property
+    def connections(self) -> int:
+        return self.workers * self.engines * (self.pool_size + self.max_overflow)
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> float | None:
+    """
+    CPUs allowed by the cgroup CPU quota, None without quota.
+    """
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max is not None:
+        quota, period = cpu_max.split()
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+
+    quota, period = _read(CGROUP_V1_CPU_QUOTA), _read(CGROUP_V1_CPU_PERIOD)
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / int(period)
+
+    return None
+
+
+def available_cpus() -> tuple[float, str]:
+    """
+    (CPUs, source), the cgroup quota when there is one, else the CPUs of the process.
+    """
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        return quota, "cgroup quota"
+
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)), "cpu affinity"
+    return os.cpu_count() or 1, "cpu count"
+
+
+def database_engines() -> int:
+    """
+    Engines opened by a worker: the primary and one per DATABASE_REPLICA_URLS entry.
+    """
+    replicas = (settings.DATABASE_REPLICA_URLS or "").split(",")
+    return 1 + sum(1 for replica in replicas if replica.strip())
+
+
+def get_topology() -> Topology:
+    cpus, cpu_source = available_cpus()
+    engines = database_engines()
+
+    if settings.UVICORN_WORKERS:
+        workers, workers_source = settings.UVICORN_WORKERS, "UVICORN_WORKERS"
+    else:
+        workers, workers_source = max(math.ceil(cpus), 1), cpu_source
+
+    pool_size, max_overflow = (
+        settings.DATABASE_POOL_SIZE,
+        settings.DATABASE_MAX_OVERFLOW,
+    )
+    if settings.DATABASE_CONNECTION_BUDGET:
+        per_engine = max(settings.DATABASE_CONNECTION_BUDGET // (workers * engines), 1)
+        pool_size = min(pool_size, per_engine)
+        max_overflow = per_engine - pool_size
+
+    return Topology(
+        workers=workers,
+        workers_source=workers_source,
+        cpus=cpus,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        engines=engines,
+    )
+
+
+def _setup_multiprocess_metrics(workers: int) -> None:
+    """
+    Use an empty prometheus multiprocess directory with several workers,
+    it must be set before the metrics are created (app import).
+    """
+    if workers < 2 or not settings.METRICS_ENABLED:
+        return
+
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+
+
+class Launcher:
+    def __init__(self, topology: Topology) -> None:
+        self.topology = topology
+        self.children: dict[int, int] = {}
+        self.stopping = False
+
+    def _spawn(self, config, sockets: list, index: int) -> None:
+        import uvicorn
+
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+
+        # Worker: restore the default signals (uvicorn installs its own) and the gc
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+        try:
+            uvicorn.Server(config).run(sockets=sockets)
+        finally:
+            os._exit(0)
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        import uvicorn
+
+        # The objects of the app live as long as the workers, keep the gc from
+        # touching (and un-sharing) their pages until they are frozen
+        gc.disable()
+        from app.services.metrics import mark_process_dead
+        from app.setup_app import create_app
+
+        config = uvicorn.Config(
+            create_app(),
+            host=settings.UVICORN_HOST,
+            port=settings.UVICORN_PORT,
+            loop=self.topology.loop,
+            http=self.topology.http,
+            proxy_headers=True,
+        )
+        config.load()
+        sockets = [config.bind_socket()]
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for index in range(self.topology.workers):
+            self._spawn(config, sockets, index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            index = self.children.pop(pid, None)
+            # A killed worker (OOM, SIGKILL) never ran its shutdown hook, its live
+            # gauges (in flight requests, pool connections) would be counted forever
+            mark_process_dead(pid)
+            if index is None or self.stopping:
+                continue
+
+            logger.warning(
+                f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), restarting it"
+            )
+            # Don't spin if the workers die right away (e.g. the port is taken)
+            time.sleep(1)
+            self._spawn(config, sockets, index)
+
+        mark_process_dead(os.getpid())
+        logger.info("All workers stopped")
+
+
+def main() -> None:
+    topology = get_topology()
+
+    settings.DATABASE_POOL_SIZE = topology.pool_size
+    settings.DATABASE_MAX_OVERFLOW = topology.max_overflow
+    _setup_multiprocess_metrics(topology.workers)
+
+    logger.info(
+        f"Starting {topology.workers} workers (from {topology.workers_source}, {topology.cpus:g} CPUs) "
+        f"on {settings.UVICORN_HOST}:{settings.UVICORN_PORT}, loop={topology.loop} http={topology.http}, "
+        f"DB pool {topology.pool_size}+{topology.max_overflow} per engine ({topology.engines} per worker) "
+        f"({topology.connections} connections at most), "
+        f"password hashing {settings.PASSWORD_HASHING_WORKERS} {settings.PASSWORD_HASHING_EXECUTOR}s per worker"
+    )
+
+    Launcher(topology).run()
+
+
+if __name__ == "__main__":
+    main()
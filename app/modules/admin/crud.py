@@ -1,10 +1,36 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.db.loading import LoadingProfile, loading_options
+from app.db.session import warm_statement
 from app.modules.core.models import User
 
 
-async def get_user_by_username(db: AsyncSession, username: str):
-    stmt = select(User).filter(User.username == username)
+def user_by_username_query(
+    username: str, profile: LoadingProfile = LoadingProfile.SUMMARY
+):
+    return (
+        select(User)
+        .filter(User.username == username)
+        .options(*loading_options(User, profile))
+    )
+
+
+async def get_user_by_username(
+    db: AsyncSession,
+    username: str,
+    profile: LoadingProfile = LoadingProfile.SUMMARY,
+    use_primary: bool = False,
+):
+    """
+    use_primary reads from the primary even in a read-only session (no replica lag)
+    """
+    stmt = user_by_username_query(username, profile)
+    if use_primary:
+        stmt = stmt.execution_options(use_primary=True)
     result = await db.execute(stmt)
     return result.scalars().first()
+
+
+# User lookup of check_jwt when the principal cache misses
+warm_statement(lambda: user_by_username_query("", LoadingProfile.WITH_PROFILE))
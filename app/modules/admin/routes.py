@@ -1,46 +1,152 @@
-from fastapi import APIRouter, Depends, Security, status
+import asyncio
+import io
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Security,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import add_pagination
-from fastapi_pagination.bases import AbstractPage
 from fastapi_pagination.ext.async_sqlalchemy import paginate
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.params_paginate import Page
+from app.core.config import settings
+from app.core.export import ExportFormat, stream_export
+from app.core.params_paginate import CursorPage, CursorParams, Page
 from app.core.query_factory import (
+    bulk_delete,
+    bulk_ids_response,
+    bulk_update,
     delete_by_id,
+    get_all_keyset,
     get_all_paginate,
     get_specific_by_id,
     update_entry,
 )
-from app.core.schema import DefaultResponse
+from app.core.responses import PydanticJSONResponse, serialize_response
+from app.core.schema import BulkIds, BulkResponse, BulkUpdate, DefaultResponse
 from app.core.security import get_current_active_user
 from app.db.deps import get_db
+from app.db.loading import LoadingProfile
+from app.db.query_stats import query_budgets
+from app.modules.admin.user_import import UserImporter, read_rows
 from app.modules.core.models import Profile, User
 from app.modules.users.schema import (
+    UserBulkUpdate,
+    UserImportReport,
     UserProfile,
     UserProfileBase,
     UserSchema,
     UserSchemaProfile,
 )
+from app.services import strings
+from app.services.principal_cache import principal_cache
+from app.services.token_cache import token_cache
 
 router = APIRouter(prefix="/admin")
 
+# One import at a time per worker, its hashing shares the password hashing pool
+import_lock = asyncio.Lock()
+
 
 @router.get(
     "/users",
     status_code=status.HTTP_200_OK,
     response_model=Page[UserSchema],
+    response_class=PydanticJSONResponse,
     description="Get all users with pagination",
 )
 async def get_all_users(
     db: AsyncSession = Depends(get_db),
     current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
-) -> AbstractPage:
-    return await paginate(db, get_all_paginate(User))
+) -> PydanticJSONResponse:
+    page = await paginate(db, get_all_paginate(User))
+    return serialize_response(Page[UserSchema], page)
+
+
+@router.get(
+    "/users/cursor",
+    status_code=status.HTTP_200_OK,
+    response_model=CursorPage[UserSchema],
+    response_class=PydanticJSONResponse,
+    description="Get all users with keyset (cursor) pagination",
+)
+async def get_all_users_cursor(
+    params: CursorParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> PydanticJSONResponse:
+    page = await get_all_keyset(db, User, params)
+    return serialize_response(CursorPage[UserSchema], page)
+
+
+@router.get(
+    "/users/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    description="Export all users as CSV or NDJSON (streamed)",
+)
+async def export_users(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Export format"),
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> StreamingResponse:
+    return stream_export(
+        request,
+        [
+            User.id,
+            User.username,
+            User.email,
+            User.is_active,
+            User.created_at,
+            User.updated_at,
+        ],
+        format,
+        "users",
+    )
+
+
+@router.post(
+    "/users/import",
+    status_code=status.HTTP_200_OK,
+    response_model=UserImportReport,
+    description="Create (or update by username) users from a CSV or NDJSON file, "
+    "see scripts/import_users.py for large files",
+)
+async def import_users(
+    file: UploadFile,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="File format"),
+    update_existing: bool = Query(
+        False,
+        description="Update the users that already exist instead of rejecting them",
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> UserImportReport:
+    if import_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=strings.IMPORT_RUNNING
+        )
+
+    async with import_lock:
+        # The upload is already spooled to a temporary file, the importer reads it
+        # batch by batch in the threadpool
+        rows = read_rows(
+            io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""), format
+        )
+        return await UserImporter(db, update_existing).run(rows)
 
 
 @router.get(
     "/users/{user_id}",
     response_model=UserSchemaProfile,
+    response_class=PydanticJSONResponse,
     status_code=status.HTTP_200_OK,
     description="Get specific user by user_id",
 )
@@ -50,8 +156,9 @@ async def get_specific_user(
     current_user: UserSchemaProfile = Security(  # noqa
         get_current_active_user, scopes=["admin"]
     ),
-):
-    return await get_specific_by_id(db, User, user_id)
+) -> PydanticJSONResponse:
+    user = await get_specific_by_id(db, User, user_id, LoadingProfile.WITH_PROFILE)
+    return serialize_response(UserSchemaProfile, user)
 
 
 @router.delete(
@@ -68,6 +175,36 @@ async def delete_specific_user(
     return await delete_by_id(db, User, user_id)
 
 
+@router.patch(
+    "/users/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Update many users by user_id (e.g. deactivate them)",
+)
+async def bulk_update_users(
+    data: BulkUpdate[UserBulkUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> dict:
+    updated = await bulk_update(db, User, data.ids, data.values)
+    return bulk_ids_response(User, "updated", data.ids, updated)
+
+
+@router.post(
+    "/users/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Delete many users by user_id",
+)
+async def bulk_delete_users(
+    data: BulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> dict:
+    deleted = await bulk_delete(db, User, ids=data.ids)
+    return bulk_ids_response(User, "deleted", data.ids, deleted)
+
+
 @router.put(
     "/users/{user_id}/profile",
     status_code=status.HTTP_200_OK,
@@ -85,4 +222,41 @@ async def update_specific_profile(
     return await update_entry(db, Profile, user_id, profile)
 
 
+@router.get(
+    "/cache/principal",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Get hit/miss statistics of the authenticated users cache",
+)
+async def get_principal_cache_stats(
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> DefaultResponse:
+    return DefaultResponse(
+        status=True, msg="Principal cache statistics", details=principal_cache.stats()
+    )
+
+
+@router.get(
+    "/cache/token",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Get hit/miss statistics of the verified tokens cache",
+)
+async def get_token_cache_stats(
+    current_user: User = Security(get_current_active_user, scopes=["admin"]),  # noqa
+) -> DefaultResponse:
+    return DefaultResponse(
+        status=True, msg="Token cache statistics", details=token_cache.stats()
+    )
+
+
 add_pagination(router)
+
+# Statements per request, the lookup of a user missing from the principal cache included
+for method, path, statements in (
+    ("GET", "/users", 3),
+    ("GET", "/users/cursor", 2),
+):
+    query_budgets.declare(
+        method, f"{settings.API_V1_STR}{router.prefix}{path}", statements
+    )
@@ -0,0 +1,425 @@
+"""
+Bulk user import from CSV or NDJSON (POST /admin/users/import, scripts/import_users.py).
+
+The rows are handled IMPORT_BATCH_SIZE at a time, each batch in its own transaction:
+1. the rows are validated (UserImportRow), the invalid ones are rejected
+2. the batch is loaded with COPY into a temporary staging table where set-based
+   statements reject the conflicting rows
+3. the passwords of the remaining rows are hashed (rows with a bcrypt password_hash skip
+   it), on the shared hashing_pool for the endpoint and on a private process pool for
+   the CLI. The staging of 2. is rolled back meanwhile and done again with the hashes,
+   bcrypt isn't paid for rejected rows and no transaction is held while hashing
+4. the users are upserted (by username) with their profiles and role links
+
+Only one batch is in memory at a time whatever the size of the file. No verification
+email is sent, imported users are active unless is_active says otherwise. Inactive
+users get an already expired email verification, resend_verification_email sends them
+a new one.
+"""
+
+import asyncio
+import csv
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, TextIO
+
+from asyncpg import PostgresError
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.export import ExportFormat
+from app.core.logger import logger
+from app.core.security import get_password_hash
+from app.modules.users.schema import ImportRejectedRow, UserImportReport, UserImportRow
+from app.services.hashing import hashing_pool
+from app.services.principal_cache import principal_cache
+
+# Role names separator of the CSV roles column
+CSV_ROLES_SEPARATOR = "|"
+
+STAGING_TABLE = "import_user"
+STAGING_COLUMNS = [
+    "line",
+    "username",
+    "email",
+    "password",
+    "is_active",
+    "line1",
+    "line2",
+    "city",
+    "province",
+    "postcode",
+    "roles",
+]
+CREATE_STAGING = text(
+    f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+    "line integer NOT NULL, username varchar(30) NOT NULL, email varchar(255) NOT NULL, "
+    "password varchar(100), is_active boolean NOT NULL, "
+    "line1 varchar(255), line2 varchar(255), city varchar(255), province varchar(255), "
+    "postcode varchar(255), roles text[] NOT NULL, user_id integer, inserted boolean"
+    ") ON COMMIT DROP"
+)
+
+# (reason, statement) deleting the rejected rows from the staging table
+REJECTS = [
+    (
+        "duplicate username in the file",
+        "DELETE FROM import_user s USING import_user f "
+        "WHERE s.username = f.username AND s.line > f.line RETURNING s.line, s.username",
+    ),
+    (
+        "duplicate email in the file",
+        "DELETE FROM import_user s USING import_user f "
+        "WHERE s.email = f.email AND s.line > f.line RETURNING s.line, s.username",
+    ),
+    (
+        "email already used by another user",
+        "DELETE FROM import_user s USING cre_user u "
+        "WHERE u.email = s.email AND u.username <> s.username RETURNING s.line, s.username",
+    ),
+    (
+        "unknown role",
+        "DELETE FROM import_user s WHERE EXISTS ("
+        "SELECT 1 FROM unnest(s.roles) AS n(name) LEFT JOIN cre_role r ON r.name = n.name "
+        "WHERE r.id IS NULL) RETURNING s.line, s.username",
+    ),
+]
+REJECT_EXISTING = (
+    "user already exists",
+    "DELETE FROM import_user s USING cre_user u "
+    "WHERE u.username = s.username RETURNING s.line, s.username",
+)
+
+UPSERT_USERS = text(
+    "WITH upserted AS ("
+    "INSERT INTO cre_user (username, email, password, is_active, created_at, updated_at) "
+    "SELECT username, email, password, is_active, CAST(:now AS timestamp), CAST(:now AS timestamp) FROM import_user "
+    "ON CONFLICT (username) DO UPDATE SET email = excluded.email, password = excluded.password, "
+    "is_active = excluded.is_active, updated_at = excluded.updated_at "
+    "RETURNING id, username, xmax = 0 AS inserted) "
+    "UPDATE import_user s SET user_id = upserted.id, inserted = upserted.inserted "
+    "FROM upserted WHERE upserted.username = s.username"
+)
+UPDATED_USERS = text("SELECT user_id FROM import_user WHERE NOT inserted")
+CREATED_COUNT = text("SELECT count(*) FROM import_user WHERE inserted")
+
+# Profile fields missing from the file keep their value
+UPDATE_PROFILES = text(
+    "UPDATE cre_profile p SET line1 = COALESCE(s.line1, p.line1), "
+    "line2 = COALESCE(s.line2, p.line2), city = COALESCE(s.city, p.city), "
+    "province = COALESCE(s.province, p.province), "
+    "postcode = COALESCE(s.postcode, p.postcode), updated_at = :now "
+    "FROM import_user s WHERE p.user_id = s.user_id AND NOT s.inserted"
+)
+INSERT_PROFILES = text(
+    "INSERT INTO cre_profile (user_id, line1, line2, city, province, postcode, created_at, updated_at) "
+    "SELECT s.user_id, s.line1, s.line2, s.city, s.province, s.postcode, CAST(:now AS timestamp), CAST(:now AS timestamp) "
+    "FROM import_user s WHERE NOT EXISTS (SELECT 1 FROM cre_profile p WHERE p.user_id = s.user_id)"
+)
+# Expired on creation, resend_verification_email replaces the token and the expiration
+INSERT_EMAIL_VERIFICATIONS = text(
+    "INSERT INTO cre_email_verification (token, user_id, expires_at, created_at, updated_at) "
+    "SELECT md5(random()::text || s.user_id), s.user_id, CAST(:now AS timestamp), "
+    "CAST(:now AS timestamp), CAST(:now AS timestamp) "
+    "FROM import_user s WHERE s.inserted AND NOT s.is_active"
+)
+# Role links are added, the existing links of updated users are kept
+INSERT_USER_ROLES = text(
+    "INSERT INTO cre_user_role (cre_user_id, cre_role_id) "
+    "SELECT s.user_id, r.id FROM import_user s "
+    "CROSS JOIN LATERAL unnest(s.roles) AS n(name) JOIN cre_role r ON r.name = n.name "
+    "ON CONFLICT DO NOTHING"
+)
+
+
+def read_rows(
+    file: TextIO, import_format: ExportFormat
+) -> Iterator[tuple[int, dict | str]]:
+    """
+    (line, row) of a CSV (with a header line) or NDJSON file, row is the error
+    message when the line can't be parsed.
+    CSV roles are separated by "|", empty CSV fields are left out.
+    example:
+    with open("users.csv", newline="", encoding="utf-8-sig") as file:
+        rows = read_rows(file, ExportFormat.CSV)
+    """
+    if import_format == ExportFormat.CSV:
+        reader = csv.DictReader(file)
+        for row in reader:
+            data = {
+                key: value
+                for key, value in row.items()
+                if key is not None and value not in ("", None)
+            }
+            if "roles" in data:
+                data["roles"] = [
+                    role.strip()
+                    for role in data["roles"].split(CSV_ROLES_SEPARATOR)
+                    if role.strip()
+                ]
+            yield reader.line_num, data
+        return
+
+    for line, content in enumerate(file, start=1):
+        if not content.strip():
+            continue
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            yield line, f"invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line, "invalid JSON: not an object"
+            continue
+        yield line, data
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _hash_passwords(passwords: list[str]) -> list[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+def _take(rows: Iterator, count: int) -> list:
+    return list(itertools.islice(rows, count))
+
+
+class SharedPoolHasher:
+    """
+    Hashes on the hashing_pool of the worker (endpoint), at most one password per
+    hashing worker at a time. A full queue is waited out instead of failing the import,
+    so that logins and signups keep going.
+    """
+
+    async def _hash_one(self, password: str, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            while True:
+                try:
+                    return await hashing_pool.run(get_password_hash, password)
+                except HTTPException as e:
+                    if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                        raise
+                    await asyncio.sleep(1)
+
+    async def hash(self, passwords: list[str]) -> list[str]:
+        semaphore = asyncio.Semaphore(hashing_pool.workers)
+        return await asyncio.gather(
+            *(self._hash_one(password, semaphore) for password in passwords)
+        )
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ProcessPoolHasher:
+    """
+    Hashes on a private process pool of `workers` processes (scripts/import_users.py),
+    not meant for the app: the pool would be forked from a serving worker.
+    """
+
+    def __init__(self, workers: int | None = None) -> None:
+        self.workers = workers or settings.IMPORT_HASHING_WORKERS or os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def hash(self, passwords: list[str]) -> list[str]:
+        # Created on first use, files with password_hash only don't need it
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        # One chunk per worker, bcrypt takes the same time for every password
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._pool, _hash_passwords, chunk)
+                for chunk in _chunks(
+                    passwords, math.ceil(len(passwords) / self.workers)
+                )
+            )
+        )
+        return [password for chunk in chunks for password in chunk]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _validation_reason(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+class UserImporter:
+    """
+    Imports users in batches (see module docstring), on_rejected is called with every
+    rejected row while the report only keeps the first IMPORT_MAX_REPORTED_REJECTS.
+    The hasher defaults to the shared hashing_pool (SharedPoolHasher).
+    example:
+    report = await UserImporter(db, update_existing=True).run(read_rows(file, ExportFormat.CSV))
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        update_existing: bool = False,
+        batch_size: int | None = None,
+        hasher: SharedPoolHasher | ProcessPoolHasher | None = None,
+        on_rejected: Callable[[ImportRejectedRow], None] | None = None,
+    ) -> None:
+        self.db = db
+        self.update_existing = update_existing
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.hasher = hasher or SharedPoolHasher()
+        self.on_rejected = on_rejected
+        self.report = UserImportReport()
+
+    def _reject(self, line: int, username: str | None, reason: str) -> None:
+        rejected = ImportRejectedRow(line=line, username=username, reason=reason)
+        self.report.rejected += 1
+        if len(self.report.rejected_rows) < settings.IMPORT_MAX_REPORTED_REJECTS:
+            self.report.rejected_rows.append(rejected)
+        if self.on_rejected is not None:
+            self.on_rejected(rejected)
+
+    @staticmethod
+    def _records(
+        batch: list[tuple[int, UserImportRow]], hashes: dict[int, str]
+    ) -> list[tuple]:
+        return [
+            (
+                line,
+                row.username,
+                row.email,
+                row.password_hash or hashes.get(line),
+                row.is_active,
+                row.line1,
+                row.line2,
+                row.city,
+                row.province,
+                row.postcode,
+                row.roles,
+            )
+            for line, row in batch
+        ]
+
+    async def _stage(self, records: list[tuple]) -> list[tuple[int, str, str]]:
+        """
+        COPY the records into the staging table and delete the rejected ones,
+        returns their (line, username, reason).
+        """
+        rejects = [*REJECTS] if self.update_existing else [*REJECTS, REJECT_EXISTING]
+        connection = await self.db.connection()
+        await connection.execute(CREATE_STAGING)
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=records, columns=STAGING_COLUMNS
+        )
+
+        rejected = []
+        for reason, stmt in rejects:
+            execute = await connection.execute(text(stmt))
+            rejected.extend((line, username, reason) for line, username in execute)
+        return rejected
+
+    async def _load(self, batch: list[tuple[int, UserImportRow]]) -> None:
+        now = datetime.utcnow()
+        rejected = []
+        try:
+            if any(row.password_hash is None for _, row in batch):
+                # Staged without the hashes first, to only hash the rows that are kept
+                rejected = await self._stage(self._records(batch, {}))
+                await self.db.rollback()
+                lines = {line for line, _, _ in rejected}
+                batch = [(line, row) for line, row in batch if line not in lines]
+
+            to_hash = [(line, row) for line, row in batch if row.password_hash is None]
+            hashes = await self.hasher.hash([row.password for _, row in to_hash])
+            hashes = {line: hashed for (line, _), hashed in zip(to_hash, hashes)}
+
+            # Rejects again the rows that conflict with users created meanwhile
+            rejected_late = await self._stage(self._records(batch, hashes))
+
+            connection = await self.db.connection()
+            await connection.execute(UPSERT_USERS, {"now": now})
+            await connection.execute(UPDATE_PROFILES, {"now": now})
+            await connection.execute(INSERT_PROFILES, {"now": now})
+            await connection.execute(INSERT_EMAIL_VERIFICATIONS, {"now": now})
+            await connection.execute(INSERT_USER_ROLES)
+            created = await connection.scalar(CREATED_COUNT)
+            updated = (await connection.scalars(UPDATED_USERS)).all()
+            # Statements on the connection bypass RoutingSession.get_bind, flag the write
+            # so that the client reads its imported users from the primary
+            self.db.info["wrote"] = True
+            await self.db.commit()
+        except (DBAPIError, PostgresError) as e:
+            # e.g. a user created meanwhile with the same email, the rows of the batch
+            # are rejected and can be imported again. COPY runs on the asyncpg
+            # connection, its errors aren't wrapped by SQLAlchemy
+            await self.db.rollback()
+            error = e.orig if isinstance(e, DBAPIError) else e
+            logger.warning(f"User import batch failed: {error}")
+            rejected.extend(
+                (line, row.username, f"batch failed: {error}") for line, row in batch
+            )
+            for line, username, reason in sorted(rejected):
+                self._reject(line, username, reason)
+            return
+
+        for line, username, reason in sorted(rejected + rejected_late):
+            self._reject(line, username, reason)
+        self.report.created += created
+        self.report.updated += len(updated)
+        principal_cache.invalidate_many(updated)
+
+    def _validate(self, line: int, data: dict | str) -> UserImportRow | None:
+        if isinstance(data, str):
+            self._reject(line, None, data)
+            return None
+
+        try:
+            row = UserImportRow.model_validate(data)
+        except ValidationError as e:
+            username = data.get("username")
+            self._reject(
+                line,
+                username if isinstance(username, str) else None,
+                _validation_reason(e),
+            )
+            return None
+        if row.password is None and row.password_hash is None:
+            self._reject(line, row.username, "password or password_hash is required")
+            return None
+        return row
+
+    async def run(self, rows: Iterable[tuple[int, dict | str]]) -> UserImportReport:
+        rows = iter(rows)
+        # The file is read (and parsed) in the threadpool, batch_size rows at a time
+        while chunk := await run_in_threadpool(_take, rows, self.batch_size):
+            self.report.rows += len(chunk)
+            batch = [
+                (line, row)
+                for line, data in chunk
+                if (row := self._validate(line, data)) is not None
+            ]
+            if batch:
+                await self._load(batch)
+            logger.info(
+                f"User import: {self.report.rows} rows read, {self.report.created} created, "
+                f"{self.report.updated} updated, {self.report.rejected} rejected"
+            )
+
+        return self.report
@@ -1,9 +1,13 @@
 from fastapi import HTTPException, status
+from sqlalchemy import delete, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
 
-from app.modules.core.models import User, user_role
+from app.core.query_factory import ids_in
+from app.db.session import warm_statement
+from app.modules.core.models import Permission, Role, User, role_permission, user_role
 from app.modules.core.schema import UserPermissionBase
 from app.services import strings
 
@@ -28,20 +32,121 @@ async def get_user_roles(db: AsyncSession, user_id: int):
     return result
 
 
+def user_permissions_query(user_id: int, *columns):
+    """
+    SELECT DISTINCT columns of the permissions granted to a user through its roles,
+    resolved with joins on the pivot tables (no User/Role entity is loaded)
+    example:
+    user_permissions_query(user.id, Permission.scope)
+    """
+    return (
+        select(*columns)
+        .distinct()
+        .select_from(user_role)
+        .join(
+            role_permission,
+            role_permission.c.cre_role_id == user_role.c.cre_role_id,
+        )
+        .join(Permission, Permission.id == role_permission.c.cre_permission_id)
+        .where(user_role.c.cre_user_id == user_id)
+    )
+
+
+def user_scopes_query(user_id: int):
+    return user_permissions_query(user_id, Permission.scope).order_by(Permission.scope)
+
+
+async def get_user_scopes(db: AsyncSession, user_id: int) -> list[str]:
+    """
+    Distinct scopes granted to a user (login/refresh tokens)
+    """
+    execute = await db.execute(user_scopes_query(user_id))
+    return list(execute.scalars().all())
+
+
+# Scopes of check_jwt tokens without scopes bitset and of login/refresh
+warm_statement(lambda: user_scopes_query(0))
+
+
 async def get_user_permission(db: AsyncSession, user_id: int) -> UserPermissionBase:
-    query = select(User).filter(User.id == user_id)
-    execute = await db.execute(query)
-    result = execute.scalars().first()
+    execute = await db.execute(select(User.id, User.username).where(User.id == user_id))
+    user = execute.first()
 
-    if result is None:
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=strings.USER_NOT_FOUND
         )
 
-    user_permission = [
-        permission for role in result.roles for permission in role.permissions
-    ]
+    query = user_permissions_query(
+        user_id, Permission.id, Permission.scope, Permission.description
+    ).order_by(Permission.id)
+    execute = await db.execute(query)
 
     return UserPermissionBase(
-        id=result.id, username=result.username, permissions=user_permission
+        id=user.id,
+        username=user.username,
+        permissions=[permission._asdict() for permission in execute],
     )
+
+
+async def link_pivot(db: AsyncSession, pivot, left, left_ids, right, right_ids) -> int:
+    """
+    Link every left entry to every right entry with one
+    INSERT INTO pivot SELECT ... ON CONFLICT DO NOTHING, unknown ids and existing
+    links are skipped. Returns the number of links created.
+    example:
+    link_pivot(db, user_role, User, [1, 2], Role, [3])
+    """
+    left_column, right_column = pivot.c
+    # Explicit cross join, both sides are filtered by their ids
+    pairs = (
+        select(left.id, right.id)
+        .join_from(left, right, true())
+        .where(ids_in(left.id, left_ids), ids_in(right.id, right_ids))
+    )
+    stmt = (
+        pg_insert(pivot)
+        .from_select([left_column.name, right_column.name], pairs)
+        .on_conflict_do_nothing()
+    )
+    execute = await db.execute(stmt)
+    await db.commit()
+
+    return execute.rowcount
+
+
+async def unlink_pivot(db: AsyncSession, pivot, left_ids, right_ids) -> int:
+    """
+    Remove the links between the left and right ids with one DELETE,
+    returns the number of links removed.
+    example:
+    unlink_pivot(db, user_role, [1, 2], [3])
+    """
+    left_column, right_column = pivot.c
+    stmt = delete(pivot).where(
+        ids_in(left_column, left_ids), ids_in(right_column, right_ids)
+    )
+    execute = await db.execute(stmt)
+    await db.commit()
+
+    return execute.rowcount
+
+
+async def link_roles_to_users(db: AsyncSession, role_ids, user_ids) -> int:
+    return await link_pivot(db, user_role, User, user_ids, Role, role_ids)
+
+
+async def unlink_roles_from_users(db: AsyncSession, role_ids, user_ids) -> int:
+    return await unlink_pivot(db, user_role, user_ids, role_ids)
+
+
+async def link_roles_to_permissions(db: AsyncSession, role_ids, permission_ids) -> int:
+    return await link_pivot(
+        db, role_permission, Role, role_ids, Permission, permission_ids
+    )
+
+
+async def unlink_roles_from_permissions(
+    db: AsyncSession, role_ids, permission_ids
+) -> int:
+    return await unlink_pivot(db, role_permission, role_ids, permission_ids)
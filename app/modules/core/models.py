@@ -1,8 +1,11 @@
-from sqlalchemy import Boolean, Column, DateTime, String
-from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import joinedload, relationship, selectinload
 
 from app.db.base import Base
 from app.db.deps import pivot_table, reference_col
+from app.db.loading import LoadingProfile, register_loading_profiles
 from app.db.mixins import BaseFeaturesMixin
 
 # Association/Pivot tables
@@ -21,6 +24,8 @@ role_permission = pivot_table(
 
 class User(Base, BaseFeaturesMixin):
     __tablename__ = "cre_user"
+    # Keyset pagination ordered by (created_at, id)
+    __table_args__ = (Index("cre_user_created_at_id_idx", "created_at", "id"),)
 
     username = Column(String(30), unique=True, index=True, nullable=False)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -33,17 +38,17 @@ class User(Base, BaseFeaturesMixin):
         back_populates="user",
         cascade="all,delete",
         uselist=False,
-        lazy=False,
+        lazy="raise",
     )
     roles = relationship(
-        "Role", secondary=user_role, back_populates="users", lazy=False
+        "Role", secondary=user_role, back_populates="users", lazy="raise"
     )
     email_verification = relationship(
         "EmailVerification",
         back_populates="user",
         cascade="all,delete",
         uselist=False,
-        lazy=False,
+        lazy="raise",
     )
 
 
@@ -55,7 +60,7 @@ class EmailVerification(Base, BaseFeaturesMixin):
     expires_at = Column(DateTime, nullable=False)
 
     # Relationship
-    user = relationship("User", back_populates="email_verification", lazy=False)
+    user = relationship("User", back_populates="email_verification", lazy="raise")
 
 
 class Profile(Base, BaseFeaturesMixin):
@@ -69,31 +74,101 @@ class Profile(Base, BaseFeaturesMixin):
     user_id = reference_col(User.__tablename__)
 
     # Relationship
-    user = relationship("User", back_populates="profile", lazy=False)
+    user = relationship("User", back_populates="profile", lazy="raise")
 
 
 class Role(Base, BaseFeaturesMixin):
     __tablename__ = "cre_role"
+    # Keyset pagination ordered by (created_at, id)
+    __table_args__ = (Index("cre_role_created_at_id_idx", "created_at", "id"),)
 
     name = Column(String(50), unique=True)
     description = Column(String(255))
 
     # Relationship
     users = relationship(
-        "User", secondary=user_role, back_populates="roles", lazy=False
+        "User", secondary=user_role, back_populates="roles", lazy="raise"
     )
     permissions = relationship(
-        "Permission", secondary=role_permission, back_populates="roles", lazy=False
+        "Permission", secondary=role_permission, back_populates="roles", lazy="raise"
     )
 
 
 class Permission(Base, BaseFeaturesMixin):
     __tablename__ = "cre_permission"
+    # Keyset pagination ordered by (created_at, id)
+    __table_args__ = (Index("cre_permission_created_at_id_idx", "created_at", "id"),)
 
     scope = Column(String(50), unique=True, index=True)
     description = Column(String(255))
 
     # Relationship
     roles = relationship(
-        "Role", secondary=role_permission, back_populates="permissions", lazy=False
+        "Role", secondary=role_permission, back_populates="permissions", lazy="raise"
+    )
+
+
+class EmailOutbox(Base, BaseFeaturesMixin):
+    __tablename__ = "cre_email_outbox"
+    # Pending emails are polled by (status, next_attempt_at)
+    __table_args__ = (
+        Index(
+            "cre_email_outbox_status_next_attempt_at_idx", "status", "next_attempt_at"
+        ),
     )
+
+    subject = Column(String(255), nullable=False)
+    recipients = Column(JSON, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    sent_at = Column(DateTime)
+
+
+# Loading profiles (see app.db.loading)
+register_loading_profiles(
+    User,
+    {
+        LoadingProfile.WITH_PROFILE: [joinedload(User.profile)],
+        LoadingProfile.WITH_ROLES: [selectinload(User.roles)],
+        LoadingProfile.WITH_PERMISSIONS: [
+            selectinload(User.roles).selectinload(Role.permissions)
+        ],
+        LoadingProfile.FULL: [
+            joinedload(User.profile),
+            joinedload(User.email_verification),
+            selectinload(User.roles).selectinload(Role.permissions),
+        ],
+    },
+)
+
+register_loading_profiles(
+    Role,
+    {
+        LoadingProfile.WITH_PERMISSIONS: [selectinload(Role.permissions)],
+        LoadingProfile.FULL: [
+            selectinload(Role.permissions),
+            selectinload(Role.users),
+        ],
+    },
+)
+
+register_loading_profiles(
+    Permission,
+    {
+        LoadingProfile.WITH_ROLES: [selectinload(Permission.roles)],
+        LoadingProfile.FULL: [selectinload(Permission.roles)],
+    },
+)
+
+register_loading_profiles(
+    Profile,
+    {LoadingProfile.FULL: [joinedload(Profile.user)]},
+)
+
+register_loading_profiles(
+    EmailVerification,
+    {LoadingProfile.FULL: [joinedload(EmailVerification.user)]},
+)
@@ -1,22 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Security,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import add_pagination
 from fastapi_pagination.bases import AbstractPage
 from fastapi_pagination.ext.async_sqlalchemy import paginate
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.params_paginate import Page
+from app.core.config import settings
+from app.core.export import ExportFormat, stream_export
+from app.core.params_paginate import CursorPage, CursorParams, Page
+from app.core.permissions import scope_registry
 from app.core.query_factory import (
+    bulk_create,
+    bulk_create_response,
+    bulk_delete,
+    bulk_ids_response,
+    bulk_update,
     check_if_exists,
     create_entry,
     delete_by_id,
+    get_all_keyset,
     get_all_paginate,
     get_specific_by_id,
     update_entry,
 )
-from app.core.schema import DefaultResponse
+from app.core.responses import PydanticJSONResponse, serialize_response
+from app.core.schema import BulkIds, BulkResponse, BulkUpdate, DefaultResponse
 from app.core.security import get_current_active_user
 from app.db.deps import get_db
-from app.modules.core.crud import get_user_permission, get_user_roles
+from app.db.loading import LoadingProfile
+from app.db.query_stats import query_budgets
+from app.modules.core.crud import (
+    get_user_permission,
+    get_user_roles,
+    link_roles_to_permissions,
+    link_roles_to_users,
+    unlink_roles_from_permissions,
+    unlink_roles_from_users,
+)
 from app.modules.core.models import Permission, Role, User
 from app.modules.core.schema import (
     PermissionBase,
@@ -25,10 +54,13 @@ from app.modules.core.schema import (
     RoleBase,
     RoleCreate,
     RolePermissions,
+    RolePermissionsLink,
     RoleUpdate,
+    RoleUsersLink,
     UserPermissionBase,
     UserRoleBase,
 )
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/core")
 
@@ -48,6 +80,43 @@ async def get_all_roles(
     return await paginate(db, get_all_paginate(Role))
 
 
+@router.get(
+    "/roles/cursor",
+    status_code=status.HTTP_200_OK,
+    response_model=CursorPage[RoleBase],
+    description="Get all roles with keyset (cursor) pagination",
+)
+async def get_all_roles_cursor(
+    params: CursorParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:read"]
+    ),
+) -> dict:
+    return await get_all_keyset(db, Role, params)
+
+
+@router.get(
+    "/roles/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    description="Export all roles as CSV or NDJSON (streamed)",
+)
+async def export_roles(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Export format"),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:read"]
+    ),
+) -> StreamingResponse:
+    return stream_export(
+        request,
+        [Role.id, Role.name, Role.description, Role.created_at, Role.updated_at],
+        format,
+        "roles",
+    )
+
+
 @router.get(
     "/roles/{role_id}",
     status_code=status.HTTP_200_OK,
@@ -81,6 +150,59 @@ async def create_role(
     return await create_entry(db, Role, role)
 
 
+@router.post(
+    "/roles/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Create many roles, existing ones are skipped",
+)
+async def bulk_create_roles(
+    roles: list[RoleCreate] = Body(
+        ..., min_length=1, max_length=settings.BULK_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:create"]
+    ),
+) -> dict:
+    entries = await bulk_create(db, Role, roles, unique_column="name")
+    return bulk_create_response(Role, entries)
+
+
+@router.patch(
+    "/roles/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Update many roles by role_id with the same values",
+)
+async def bulk_update_roles(
+    data: BulkUpdate[RoleUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:update"]
+    ),
+) -> dict:
+    updated = await bulk_update(db, Role, data.ids, data.values)
+    return bulk_ids_response(Role, "updated", data.ids, updated)
+
+
+@router.post(
+    "/roles/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Delete many roles by role_id",
+)
+async def bulk_delete_roles(
+    data: BulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:delete"]
+    ),
+) -> dict:
+    deleted = await bulk_delete(db, Role, ids=data.ids)
+    return bulk_ids_response(Role, "deleted", data.ids, deleted)
+
+
 @router.put(
     "/roles/{role_id}",
     status_code=status.HTTP_200_OK,
@@ -116,6 +238,100 @@ async def delete_specific_role(
     return await delete_by_id(db, Role, role_id)
 
 
+@router.post(
+    "/roles/users/link",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Link every given role to every given user",
+)
+async def link_roles_to_users_bulk(
+    data: RoleUsersLink,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:link"]
+    ),
+) -> DefaultResponse:
+    linked = await link_roles_to_users(db, data.role_ids, data.user_ids)
+
+    principal_cache.invalidate_many(data.user_ids)
+
+    return DefaultResponse(
+        status=True,
+        msg=f"{linked} role/user links created",
+        details={"affected": linked},
+    )
+
+
+@router.post(
+    "/roles/users/unlink",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Unlink every given role from every given user",
+)
+async def unlink_roles_from_users_bulk(
+    data: RoleUsersLink,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "role:link"]
+    ),
+) -> DefaultResponse:
+    unlinked = await unlink_roles_from_users(db, data.role_ids, data.user_ids)
+
+    principal_cache.invalidate_many(data.user_ids)
+
+    return DefaultResponse(
+        status=True,
+        msg=f"{unlinked} role/user links removed",
+        details={"affected": unlinked},
+    )
+
+
+@router.post(
+    "/roles/permissions/link",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Link every given role to every given permission",
+)
+async def link_roles_to_permissions_bulk(
+    data: RolePermissionsLink,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:link"]
+    ),
+) -> DefaultResponse:
+    linked = await link_roles_to_permissions(db, data.role_ids, data.permission_ids)
+
+    return DefaultResponse(
+        status=True,
+        msg=f"{linked} role/permission links created",
+        details={"affected": linked},
+    )
+
+
+@router.post(
+    "/roles/permissions/unlink",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Unlink every given role from every given permission",
+)
+async def unlink_roles_from_permissions_bulk(
+    data: RolePermissionsLink,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:link"]
+    ),
+) -> DefaultResponse:
+    unlinked = await unlink_roles_from_permissions(
+        db, data.role_ids, data.permission_ids
+    )
+
+    return DefaultResponse(
+        status=True,
+        msg=f"{unlinked} role/permission links removed",
+        details={"affected": unlinked},
+    )
+
+
 @router.get(
     "/roles/user/{user_id}",
     status_code=status.HTTP_200_OK,
@@ -146,13 +362,14 @@ async def link_role_to_user(
         get_current_active_user, scopes=["admin", "role:link"]
     ),
 ) -> UserRoleBase:
-    user = await get_specific_by_id(db, User, user_id)
+    user = await get_specific_by_id(db, User, user_id, LoadingProfile.WITH_ROLES)
     role = await get_specific_by_id(db, Role, role_id)
 
     user.roles.append(role)
 
     await db.commit()
-    await db.refresh(user)
+
+    principal_cache.invalidate(user_id)
 
     return await get_user_roles(db, user_id)
 
@@ -161,6 +378,7 @@ async def link_role_to_user(
     "/roles/{role_id}/permissions",
     status_code=status.HTTP_200_OK,
     response_model=RolePermissions,
+    response_class=PydanticJSONResponse,
     description="Get specific permissions for a role given a role_id",
 )
 async def get_role_permission(
@@ -169,15 +387,10 @@ async def get_role_permission(
     current_user: User = Security(  # noqa
         get_current_active_user, scopes=["admin", "role:read"]
     ),
-) -> RolePermissions:
-    role = await get_specific_by_id(db, Role, role_id)
+) -> PydanticJSONResponse:
+    role = await get_specific_by_id(db, Role, role_id, LoadingProfile.WITH_PERMISSIONS)
 
-    return RolePermissions(
-        id=role.id,
-        description=role.description,
-        name=role.name,
-        permissions=[permission for permission in role.permissions],
-    )
+    return serialize_response(RolePermissions, role)
 
 
 @router.delete(
@@ -194,7 +407,7 @@ async def unlink_role_from_user(
         get_current_active_user, scopes=["admin", "role:link"]
     ),
 ) -> DefaultResponse:
-    user = await get_specific_by_id(db, User, user_id)
+    user = await get_specific_by_id(db, User, user_id, LoadingProfile.WITH_ROLES)
     role = await get_specific_by_id(db, Role, role_id)
 
     # Check if user has the role
@@ -207,6 +420,8 @@ async def unlink_role_from_user(
     user.roles.remove(role)
     await db.commit()
 
+    principal_cache.invalidate(user_id)
+
     return DefaultResponse(status=True, msg="Role unlinked from user")
 
 
@@ -224,13 +439,12 @@ async def link_role_to_permission(
         get_current_active_user, scopes=["admin", "permission:link"]
     ),
 ) -> RolePermissions:
-    role = await get_specific_by_id(db, Role, role_id)
+    role = await get_specific_by_id(db, Role, role_id, LoadingProfile.WITH_PERMISSIONS)
     permission = await get_specific_by_id(db, Permission, permission_id)
 
     role.permissions.append(permission)
 
     await db.commit()
-    await db.refresh(role)
 
     return RolePermissions(
         id=role.id,
@@ -254,7 +468,7 @@ async def unlink_role_from_permission(
         get_current_active_user, scopes=["admin", "permission:link"]
     ),
 ) -> DefaultResponse:
-    role = await get_specific_by_id(db, Role, role_id)
+    role = await get_specific_by_id(db, Role, role_id, LoadingProfile.WITH_PERMISSIONS)
     permission = await get_specific_by_id(db, Permission, permission_id)
 
     # Check if role has the permission
@@ -285,6 +499,49 @@ async def get_all_permissions(
     return await paginate(db, get_all_paginate(Permission))
 
 
+@router.get(
+    "/permissions/cursor",
+    status_code=status.HTTP_200_OK,
+    response_model=CursorPage[PermissionBase],
+    description="Get all permissions with keyset (cursor) pagination",
+)
+async def get_all_permissions_cursor(
+    params: CursorParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:read"]
+    ),
+) -> dict:
+    return await get_all_keyset(db, Permission, params)
+
+
+@router.get(
+    "/permissions/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    description="Export all permissions as CSV or NDJSON (streamed)",
+)
+async def export_permissions(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Export format"),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:read"]
+    ),
+) -> StreamingResponse:
+    return stream_export(
+        request,
+        [
+            Permission.id,
+            Permission.scope,
+            Permission.description,
+            Permission.created_at,
+            Permission.updated_at,
+        ],
+        format,
+        "permissions",
+    )
+
+
 @router.get(
     "/permissions/{permission_id}",
     status_code=status.HTTP_200_OK,
@@ -315,7 +572,66 @@ async def create_permission(
     ),
 ) -> PermissionBase:
     await check_if_exists(db, Permission, [Permission.scope == permission.scope])
-    return await create_entry(db, Permission, permission)
+    permission = await create_entry(db, Permission, permission)
+    scope_registry.mark_stale()
+
+    return permission
+
+
+@router.post(
+    "/permissions/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Create many permissions, existing ones are skipped",
+)
+async def bulk_create_permissions(
+    permissions: list[PermissionCreate] = Body(
+        ..., min_length=1, max_length=settings.BULK_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:create"]
+    ),
+) -> dict:
+    entries = await bulk_create(db, Permission, permissions, unique_column="scope")
+    scope_registry.mark_stale()
+    return bulk_create_response(Permission, entries)
+
+
+@router.patch(
+    "/permissions/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Update many permissions by permission_id with the same values",
+)
+async def bulk_update_permissions(
+    data: BulkUpdate[PermissionUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:update"]
+    ),
+) -> dict:
+    updated = await bulk_update(db, Permission, data.ids, data.values)
+    scope_registry.mark_stale()
+    return bulk_ids_response(Permission, "updated", data.ids, updated)
+
+
+@router.post(
+    "/permissions/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResponse,
+    description="Delete many permissions by permission_id",
+)
+async def bulk_delete_permissions(
+    data: BulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(  # noqa
+        get_current_active_user, scopes=["admin", "permission:delete"]
+    ),
+) -> dict:
+    deleted = await bulk_delete(db, Permission, ids=data.ids)
+    scope_registry.mark_stale()
+    return bulk_ids_response(Permission, "deleted", data.ids, deleted)
 
 
 @router.put(
@@ -334,7 +650,10 @@ async def update_specific_permission(
 ) -> PermissionBase:
     await check_if_exists(db, Permission, [Permission.scope == permission.scope])
 
-    return await update_entry(db, Permission, permission_id, permission)
+    permission = await update_entry(db, Permission, permission_id, permission)
+    scope_registry.mark_stale()
+
+    return permission
 
 
 @router.delete(
@@ -350,7 +669,10 @@ async def delete_specific_permission(
         get_current_active_user, scopes=["admin", "permission:delete"]
     ),
 ) -> DefaultResponse:
-    return await delete_by_id(db, Permission, permission_id)
+    response = await delete_by_id(db, Permission, permission_id)
+    scope_registry.mark_stale()
+
+    return response
 
 
 @router.get(
@@ -372,3 +694,13 @@ async def get_specific_user_permission(
 
 
 add_pagination(router)
+
+# Statements per request, the lookup of a user missing from the principal cache included
+for method, path, statements in (
+    ("GET", "/roles", 3),
+    ("GET", "/roles/cursor", 2),
+    ("GET", "/roles/{role_id}/permissions", 3),
+):
+    query_budgets.declare(
+        method, f"{settings.API_V1_STR}{router.prefix}{path}", statements
+    )
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from app.core.config import settings
+
 
 class OrmTrue(BaseModel):
     class Config:
@@ -53,3 +55,15 @@ class UserPermissionBase(OrmTrue):
 
 class RolePermissions(RoleBase):
     permissions: list[PermissionBase] | None = None
+
+
+class RoleUsersLink(BaseModel):
+    role_ids: list[int] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    user_ids: list[int] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+class RolePermissionsLink(BaseModel):
+    role_ids: list[int] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    permission_ids: list[int] = Field(
+        ..., min_length=1, max_length=settings.BULK_MAX_ITEMS
+    )
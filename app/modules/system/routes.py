@@ -1,10 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
 from app.core.config import settings
 from app.core.schema import DefaultResponse
-from app.db.deps import get_db
+from app.services import metrics
+from app.services.health import health_prober
 
 router = APIRouter()
 
@@ -21,13 +20,50 @@ def root() -> dict:
     }
 
 
-@router.get("/health", status_code=status.HTTP_200_OK, response_model=DefaultResponse)
-async def get_health(db: AsyncSession = Depends(get_db)) -> dict:
-    try:
-        healthy = await db.execute(text("SELECT 1"))
-        if healthy.scalars().first() is None:
-            raise HTTPException(status_code=404, detail={"msg": "Not Healthy ❌"})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get(
+    "/health/live",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Liveness probe, the process is up",
+)
+async def get_liveness() -> dict:
+    return {"status": True, "msg": "Alive ✅", "details": health_prober.live()}
 
-    return {"status": True, "msg": "Healthy ✅"}
+
+@router.get(
+    "/health/ready",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Readiness probe served from the last background probe (503 when not ready)",
+)
+async def get_readiness(response: Response) -> dict:
+    ready, details = health_prober.ready()
+
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return {
+        "status": ready,
+        "msg": "Healthy ✅" if ready else "Not Healthy ❌",
+        "details": details,
+    }
+
+
+@router.get(
+    "/health",
+    status_code=status.HTTP_200_OK,
+    response_model=DefaultResponse,
+    description="Same as /health/ready",
+)
+async def get_health(response: Response) -> dict:
+    return await get_readiness(response)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request) -> Response:
+    client = request.client.host if request.client else None
+    if not settings.METRICS_ENABLED or not metrics.is_allowed_client(client):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    body, content_type = metrics.generate_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
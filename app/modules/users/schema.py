@@ -1,14 +1,15 @@
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, constr, field_validator
 
 
 class UserProfileBase(BaseModel):
-    line1: str | None = None
-    line2: str | None = None
-    city: str | None = None
-    province: str | None = None
-    postcode: str | None = None
+    # Lengths of the cre_profile columns
+    line1: constr(max_length=255) | None = None
+    line2: constr(max_length=255) | None = None
+    city: constr(max_length=255) | None = None
+    province: constr(max_length=255) | None = None
+    postcode: constr(max_length=255) | None = None
 
 
 class UserProfile(UserProfileBase):
@@ -60,3 +61,64 @@ class UserSchemaProfile(UserInDBProfile):
 
 class UserInDB(UserInDBBase):
     password: constr(min_length=8)
+
+
+class UserBulkUpdate(BaseModel):
+    is_active: bool | None = None
+
+
+class PrincipalProfile(UserProfile):
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class UserPrincipal(UserInDBBase):
+    """
+    Immutable snapshot of an authenticated user, safe to share between requests.
+    """
+
+    is_active: bool | None = None
+    profile: PrincipalProfile | None = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+BCRYPT_HASH_PATTERN = r"^\$2[aby]\$\d\d\$[./A-Za-z0-9]{53}$"
+
+
+class UserImportRow(UserBase, UserProfileBase):
+    """
+    Row of a bulk user import, password_hash (bcrypt) skips the hashing of password.
+    """
+
+    password: constr(min_length=8, max_length=255) | None = None
+    password_hash: constr(pattern=BCRYPT_HASH_PATTERN) | None = None
+    is_active: bool = True
+    roles: list[str] = []
+
+    @field_validator("*")
+    @classmethod
+    def no_nul_character(cls, value):
+        # PostgreSQL text can't hold NUL, a single one would fail the whole batch
+        values = value if isinstance(value, list) else [value]
+        if any(isinstance(item, str) and "\x00" in item for item in values):
+            raise ValueError("NUL characters are not allowed")
+        return value
+
+
+class ImportRejectedRow(BaseModel):
+    line: int
+    username: str | None = None
+    reason: str
+
+
+class UserImportReport(BaseModel):
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    # The first IMPORT_MAX_REPORTED_REJECTS rejected rows
+    rejected_rows: list[ImportRejectedRow] = []
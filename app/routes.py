@@ -1,16 +1,15 @@
-from fastapi import APIRouter
-
 from app.auth.routes import router as auth_router
 from app.modules.admin.routes import router as admin_router
 from app.modules.core.routes import router as core_router
 from app.modules.system.routes import router as system_router
 from app.modules.users.routes import router as users_router
 
-api_router = APIRouter()
-
-
-api_router.include_router(admin_router, tags=["Admin"])
-api_router.include_router(users_router, tags=["Users"])
-api_router.include_router(core_router, tags=["Core"])
-api_router.include_router(auth_router, tags=["Auth"])
-api_router.include_router(system_router, tags=["System"])
+# (router, tag) included in the app under API_V1_STR, each route is built once more
+# by the app instead of twice through an intermediate APIRouter
+api_routers = [
+    (admin_router, "Admin"),
+    (users_router, "Users"),
+    (core_router, "Core"),
+    (auth_router, "Auth"),
+    (system_router, "System"),
+]
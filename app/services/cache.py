@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache where every entry expires after a TTL.
+    Keeps hit/miss/eviction counters so the cache efficiency can be monitored.
+
+    With index_key, a secondary index (index_key(value) -> key) allows to pop an entry
+    by another attribute of its value (e.g. the id of a user cached by username).
+
+    Usage:
+        cache = TTLCache("principal", maxsize=10_000, ttl=30)
+        cache.set("antoine", snapshot)
+        cache.get("antoine")
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        index_key: Callable[[Any], Hashable] | None = None,
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.index_key = index_key
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._index: dict[Hashable, Hashable] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store a value, ttl (seconds) overrides the default TTL of the cache.
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+        if self.index_key is not None:
+            self._index[self.index_key(value)] = key
+            # Expired/evicted entries leave their index behind, rebuild it once it drifts too much
+            if len(self._index) > 2 * self.maxsize:
+                self._index = {
+                    self.index_key(value): key for key, (_, value) in self._data.items()
+                }
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def pop_indexed(self, index_value: Hashable, default: Any = None) -> Any:
+        """
+        Pop the entry whose index_key(value) is index_value.
+        """
+        key = self._index.pop(index_value, None)
+        return default if key is None else self.pop(key, default)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._index.clear()
+
+    def stats(self) -> dict[str, int | float | str]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.services import strings
+from app.services.metrics import PASSWORD_HASHING_REJECTED, PASSWORD_HASHING_WAIT
+
+
+class PasswordHashingPool:
+    """
+    Runs bcrypt calls outside the event loop on a bounded thread/process pool.
+
+    At most `workers` calls run at the same time and at most `queue_size` calls
+    wait for a worker, any call above that is rejected right away with a 503.
+    """
+
+    def __init__(self, executor: str, workers: int, queue_size: int) -> None:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hashing executor: {executor}")
+
+        self.executor_type = executor
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(workers)
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so that the pool is never inherited by a forked worker
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.waiting >= self.queue_size:
+            self.rejected += 1
+            PASSWORD_HASHING_REJECTED.inc()
+            logger.warning(
+                f"Password hashing queue is full ({self.waiting} waiting), rejecting request"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=strings.SERVER_BUSY,
+                headers={"Retry-After": "1"},
+            )
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        wait_time = time.perf_counter() - start
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        PASSWORD_HASHING_WAIT.observe(wait_time)
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, int | float | str]:
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time_avg": (
+                round(self.wait_time_total / self.completed, 6)
+                if self.completed
+                else 0.0
+            ),
+            "wait_time_max": round(self.wait_time_max, 6),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = PasswordHashingPool(
+    executor=settings.PASSWORD_HASHING_EXECUTOR,
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    queue_size=settings.PASSWORD_HASHING_QUEUE_SIZE,
+)
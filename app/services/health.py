@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.session import engine, replica_set
+from app.services.outbox import outbox_dispatcher
+from app.services.storage import storage
+
+POSTGRES = "postgres"
+REDIS = "redis"
+MAIL = "mail"
+
+
+class HealthProber:
+    """
+    Background task probing the dependencies of the app every interval seconds.
+
+    Liveness/readiness probes are served from the last results and never do any I/O.
+    The app is ready when the last probe is recent and every critical component
+    (Postgres, Redis when REDIS_CONNECTION) is healthy, mail is only reported: it is
+    probed every mail_interval seconds and its last result is reported in between.
+    """
+
+    def __init__(
+        self, interval: float = 5, timeout: float = 2, mail_interval: float = 300
+    ) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.mail_interval = mail_interval
+        self.started_at = time.monotonic()
+        self.last_probe_at: float | None = None
+        self.mail_probed_at: float | None = None
+        self.components: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def critical(self) -> tuple[str, ...]:
+        return (POSTGRES, REDIS) if settings.REDIS_CONNECTION else (POSTGRES,)
+
+    async def _check_postgres(self) -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def _check_redis(self) -> None:
+        await storage.ping()
+
+    async def _check_mail(self) -> None:
+        await outbox_dispatcher.transport.ping()
+
+    async def _probe(self, name: str, check) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), timeout=self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"Timed out after {self.timeout}s"
+        except Exception as e:
+            error = str(e)
+
+        if error is not None and self.components.get(name, {}).get("healthy", True):
+            logger.warning(f"Health probe {name} failed: {error}")
+
+        self.components[name] = {
+            "healthy": error is None,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": error,
+        }
+
+    async def probe_once(self) -> None:
+        now = time.monotonic()
+        checks = {POSTGRES: self._check_postgres}
+        if settings.REDIS_CONNECTION:
+            checks[REDIS] = self._check_redis
+        # The mail provider is a third-party API, not probed every interval by every worker
+        if (
+            self.mail_probed_at is None
+            or now - self.mail_probed_at >= self.mail_interval
+        ):
+            checks[MAIL] = self._check_mail
+            self.mail_probed_at = now
+
+        await asyncio.gather(
+            *(self._probe(name, check) for name, check in checks.items())
+        )
+        self.last_probe_at = time.monotonic()
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def pool_stats() -> dict:
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return {"status": pool.status()}
+
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        }
+
+    def live(self) -> dict:
+        return {"uptime_seconds": round(time.monotonic() - self.started_at, 1)}
+
+    def ready(self) -> tuple[bool, dict]:
+        """
+        (ready, details), the last probe must be less than 3 intervals old.
+        """
+        age = None
+        if self.last_probe_at is not None:
+            age = round(time.monotonic() - self.last_probe_at, 2)
+
+        ready = (
+            age is not None
+            and age < 3 * self.interval
+            and all(
+                self.components.get(name, {}).get("healthy") for name in self.critical
+            )
+        )
+
+        return ready, {
+            "last_probe_age_seconds": age,
+            "components": self.components,
+            "pool": self.pool_stats(),
+            # Reads fall back to the primary, replicas don't make the app unready
+            "replicas": replica_set.stats(),
+        }
+
+
+health_prober = HealthProber(
+    interval=settings.HEALTH_PROBE_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+    mail_interval=settings.HEALTH_PROBE_MAIL_INTERVAL_SECONDS,
+)
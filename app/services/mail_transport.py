@@ -0,0 +1,143 @@
+"""
+Email transports used by the outbox dispatcher.
+
+A transport sends a batch of outbox entries (subject, recipients, body) and returns,
+for each entry and in the same order, None when it was sent or the error message.
+"""
+
+from abc import ABC, abstractmethod
+
+from app.core.config import settings
+from app.core.logger import logger
+
+MAILJET_API_URL = "https://api.mailjet.com/"
+MAILJET_SEND_URL = "https://api.mailjet.com/v3.1/send"
+# Mailjet v3.1 accepts at most 50 messages per call
+MAILJET_MAX_BATCH_SIZE = 50
+
+
+class MailTransport(ABC):
+    @abstractmethod
+    async def send_batch(self, emails: list) -> list[str | None]:
+        pass
+
+    async def ping(self) -> None:
+        """
+        Raise when the mail provider can't be reached (health probe).
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class LogTransport(MailTransport):
+    """
+    Only logs the emails (development).
+    """
+
+    async def send_batch(self, emails: list) -> list[str | None]:
+        for email in emails:
+            logger.info(
+                f"Email sent to {email.recipients} with subject {email.subject}"
+            )
+            logger.info(f"Email body:\n {email.body}")
+        return [None] * len(emails)
+
+
+class MemoryTransport(MailTransport):
+    """
+    Keeps the emails in memory, fail_with makes every send fail with this error (tests).
+    """
+
+    def __init__(self, fail_with: str | None = None) -> None:
+        self.sent: list = []
+        self.fail_with = fail_with
+
+    async def send_batch(self, emails: list) -> list[str | None]:
+        if self.fail_with is not None:
+            return [self.fail_with] * len(emails)
+
+        self.sent.extend(emails)
+        return [None] * len(emails)
+
+
+class MailjetTransport(MailTransport):
+    """
+    Sends the emails with the Mailjet v3.1 API, many messages per call,
+    over a single HTTP client kept open between batches.
+    """
+
+    def __init__(self, api_key: str, api_secret: str, timeout: float = 10) -> None:
+        # Imported here so that httpx is only loaded when mailjet is used
+        import httpx
+
+        self._httpx = httpx
+        self._client = httpx.AsyncClient(auth=(api_key, api_secret), timeout=timeout)
+
+    @staticmethod
+    def _message(email) -> dict:
+        return {
+            "From": {
+                "Email": settings.EMAIL_SENDER,
+                "Name": settings.EMAIL_SENDER_NAME,
+            },
+            "To": [
+                {"Email": recipient["email"], "Name": recipient["name"]}
+                for recipient in email.recipients
+            ],
+            "Subject": email.subject,
+            "HTMLPart": email.body,
+            "CustomID": str(email.id),
+        }
+
+    async def send_batch(self, emails: list) -> list[str | None]:
+        errors: list[str | None] = []
+
+        for start in range(0, len(emails), MAILJET_MAX_BATCH_SIZE):
+            end = start + MAILJET_MAX_BATCH_SIZE
+            errors.extend(await self._send(emails[start:end]))
+
+        return errors
+
+    async def _send(self, emails: list) -> list[str | None]:
+        data = {"Messages": [self._message(email) for email in emails]}
+
+        try:
+            response = await self._client.post(MAILJET_SEND_URL, json=data)
+            results = response.json().get("Messages")
+        except (self._httpx.HTTPError, ValueError) as e:
+            return [f"Mailjet request failed: {e}"] * len(emails)
+
+        if not results or len(results) != len(emails):
+            return [f"Mailjet error (code {response.status_code})"] * len(emails)
+
+        logger.debug(f"Mailjet result (code {response.status_code}): {results}")
+
+        return [
+            None
+            if result.get("Status") == "success"
+            else str(result.get("Errors") or result.get("Status"))
+            for result in results
+        ]
+
+    async def ping(self) -> None:
+        # Any HTTP answer means the API is reachable, only network errors raise
+        await self._client.head(MAILJET_API_URL)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def get_transport() -> MailTransport:
+    """
+    Transport selected by EMAIL_TRANSPORT ("mailjet" or "log"),
+    defaults to mailjet in production and log otherwise.
+    """
+    transport = settings.EMAIL_TRANSPORT or ("mailjet" if settings.is_prod() else "log")
+
+    if transport == "mailjet":
+        return MailjetTransport(settings.MAILJET_API_KEY, settings.MAILJET_API_SECRET)
+    if transport == "log":
+        return LogTransport()
+
+    raise ValueError(f"Unknown email transport: {transport}")
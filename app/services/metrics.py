@@ -0,0 +1,271 @@
+"""
+Prometheus metrics of the app, served by /metrics.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by the workers (wiped before the server starts): every worker writes its
+samples there and /metrics aggregates the samples of all the workers.
+"""
+
+import ipaddress
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.query_stats import current_query_stats
+from app.db.session import engine
+
+UNMATCHED_ROUTE = "unmatched"
+# Any other method is recorded as OTHER so that clients can't create new label sets
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE")
+)
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request by route",
+    ["method", "route"],
+    buckets=QUERIES_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being processed",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Size of the SQLAlchemy pool", multiprocess_mode="livesum"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections opened by the SQLAlchemy pool (overflow included)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections checked out from the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+
+PASSWORD_HASHING_WAIT = Histogram(
+    "password_hashing_wait_seconds",
+    "Time spent waiting for a password hashing worker",
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASHING_REJECTED = Counter(
+    "password_hashing_rejected",
+    "Password hashing calls rejected because the queue was full",
+)
+
+_BLACKLIST_STORAGE_LATENCY = Histogram(
+    "blacklist_storage_duration_seconds",
+    "Latency of the token blacklist storage by operation",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+BLACKLIST_CONTAINS_LATENCY = _BLACKLIST_STORAGE_LATENCY.labels("contains")
+BLACKLIST_SET_KEY_LATENCY = _BLACKLIST_STORAGE_LATENCY.labels("set_key")
+
+
+def record_pool_size() -> None:
+    """
+    Startup event, run by each worker (the gauge of a forked worker starts empty).
+    """
+    pool = engine.sync_engine.pool
+    if hasattr(pool, "size"):
+        DB_POOL_SIZE.set(pool.size())
+
+
+def _on_connect(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.inc()
+
+
+def _on_close(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.dec()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_engine() -> None:
+    """
+    Track the pool with events, the gauges are then correct for every worker
+    without reading the pool on scrape.
+    """
+    pool = engine.sync_engine.pool
+
+    event.listen(pool, "connect", _on_connect)
+    event.listen(pool, "close", _on_close)
+    event.listen(pool, "close_detached", _on_close)
+    event.listen(pool, "checkout", _on_checkout)
+    event.listen(pool, "checkin", _on_checkin)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the latency, statements and status of each request,
+    it must run inside QueryStatsMiddleware to record the statements.
+
+    Label children are created once per route at startup (and once per new status
+    code), a request only looks them up in a dict.
+    """
+
+    def __init__(self, app: ASGIApp, routes: list) -> None:
+        self.app = app
+        self._children: dict[tuple[str, str], tuple] = {}
+        self._counters: dict[tuple[str, str, int], Counter] = {}
+        self._paths = {
+            route.endpoint: route.path for route in routes if hasattr(route, "endpoint")
+        }
+
+        for route in routes:
+            for method in getattr(route, "methods", None) or ():
+                self._get_children(method, route.path)
+
+    def _get_children(self, method: str, route: str) -> tuple:
+        key = (method, route)
+        children = self._children.get(key)
+
+        if children is None:
+            children = (
+                HTTP_REQUEST_DURATION.labels(method, route),
+                HTTP_REQUEST_QUERIES.labels(method, route),
+            )
+            self._children[key] = children
+
+        return children
+
+    def _get_counter(self, method: str, route: str, status: int) -> Counter:
+        key = (method, route, status)
+        counter = self._counters.get(key)
+
+        if counter is None:
+            counter = HTTP_REQUESTS.labels(method, route, str(status))
+            self._counters[key] = counter
+
+        return counter
+
+    def _route(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Routes not declared with FastAPI (e.g. the docs) only set scope["endpoint"]
+        return self._paths.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            route = self._route(scope)
+            latency, statements = self._get_children(method, route)
+            latency.observe(duration)
+            # Collected by QueryStatsMiddleware when QUERY_STATS_ENABLED
+            stats = current_query_stats()
+            if stats is not None:
+                statements.observe(stats.statements)
+            self._get_counter(method, route, status_code).inc()
+
+
+def parse_networks(value: str) -> list | None:
+    """
+    Networks of a comma separated list of CIDRs, None ("*") allows any client.
+    example:
+    parse_networks("10.0.0.0/8,::1/128")
+    """
+    if value.strip() == "*":
+        return None
+    return [
+        ipaddress.ip_network(network.strip())
+        for network in value.split(",")
+        if network.strip()
+    ]
+
+
+ALLOWED_NETWORKS = parse_networks(settings.METRICS_ALLOWED_NETWORKS)
+
+
+def is_allowed_client(
+    host: str | None, networks: list | None = ALLOWED_NETWORKS
+) -> bool:
+    """
+    Whether a client (IP address) can read /metrics.
+    """
+    if networks is None:
+        return True
+    try:
+        address = ipaddress.ip_address(host or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    (body, content type) of the metrics of this process or of every worker.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """
+    Drop the live gauges of a worker (this one by default, on shutdown) from the
+    multiprocess directory, app.launcher also calls it for every worker that exits.
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.session import async_session
+from app.modules.core.models import EmailOutbox
+from app.services.mail_transport import MailTransport, get_transport
+
+PENDING = "pending"
+# Claimed by a dispatcher until next_attempt_at (lease), pending again after that
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class OutboxDispatcher:
+    """
+    Background task draining cre_email_outbox.
+
+    Pending emails are claimed in a short transaction (FOR UPDATE SKIP LOCKED, several
+    workers can run a dispatcher): marked as sending for lease seconds. They are sent
+    in batches through the transport outside of any transaction, then marked as sent,
+    or retried with an exponential backoff until max_attempts is reached. Emails of a
+    dispatcher that died while sending are claimed again once their lease expires.
+    """
+
+    def __init__(
+        self,
+        transport: MailTransport | None = None,
+        batch_size: int = 50,
+        poll_interval: float = 2.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 30.0,
+        lease: float = 300.0,
+    ) -> None:
+        self._transport = transport
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    @property
+    def transport(self) -> MailTransport:
+        if self._transport is None:
+            self._transport = get_transport()
+        return self._transport
+
+    def wake(self) -> None:
+        """
+        Dispatch right away instead of waiting for the next poll (e.g. after a commit).
+        """
+        self._wake.set()
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Email outbox dispatcher started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        if self._transport is not None:
+            await self._transport.close()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                dispatched = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Email outbox dispatch failed: {e}")
+                dispatched = 0
+
+            # A full batch means there are probably more emails waiting
+            if dispatched >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _next_attempt_at(self, attempts: int) -> datetime:
+        delay = min(self.retry_backoff * 2 ** (attempts - 1), 3600)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    async def _claim(self) -> tuple[list[EmailOutbox], datetime]:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=self.lease)
+
+        async with async_session() as db:
+            query = (
+                select(EmailOutbox)
+                .where(
+                    or_(EmailOutbox.status == PENDING, EmailOutbox.status == SENDING),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            execute = await db.execute(query)
+            emails = execute.scalars().all()
+
+            # The attempt is counted when claimed, an email that kills the dispatcher
+            # still ends up failed
+            for email in emails:
+                email.status = SENDING
+                email.next_attempt_at = lease_until
+                email.attempts += 1
+            await db.commit()
+
+        return emails, lease_until
+
+    async def _record(
+        self, emails: list[EmailOutbox], errors: list[str | None], lease_until: datetime
+    ) -> None:
+        now = datetime.utcnow()
+
+        async with async_session() as db:
+            for email, error in zip(emails, errors):
+                if error is None:
+                    values = {"status": SENT, "sent_at": now, "last_error": None}
+                elif email.attempts >= self.max_attempts:
+                    values = {"status": FAILED, "last_error": error}
+                    logger.error(f"Email {email.id} failed permanently: {error}")
+                else:
+                    values = {
+                        "status": PENDING,
+                        "next_attempt_at": self._next_attempt_at(email.attempts),
+                        "last_error": error,
+                    }
+                    logger.warning(f"Email {email.id} failed, will retry: {error}")
+
+                # Only while the lease is ours (not claimed again after it expired)
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id == email.id,
+                        EmailOutbox.status == SENDING,
+                        EmailOutbox.next_attempt_at == lease_until,
+                    )
+                    .values(**values, updated_at=now)
+                )
+            await db.commit()
+
+    async def dispatch_once(self) -> int:
+        """
+        Send one batch of pending emails, returns the number of emails processed.
+        """
+        emails, lease_until = await self._claim()
+        if not emails:
+            return 0
+
+        # No transaction nor connection is held while the provider answers
+        try:
+            errors = await self.transport.send_batch(emails)
+        except Exception as e:
+            errors = [str(e)] * len(emails)
+
+        await self._record(emails, errors, lease_until)
+
+        sent = errors.count(None)
+        logger.info(f"Email outbox: {sent}/{len(emails)} emails sent")
+
+        return len(emails)
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_backoff=settings.EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS,
+    lease=settings.EMAIL_OUTBOX_LEASE_SECONDS,
+)
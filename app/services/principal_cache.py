@@ -0,0 +1,143 @@
+import asyncio
+from operator import attrgetter
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.modules.core.models import Profile, User
+from app.modules.users.schema import UserPrincipal
+from app.services.cache import TTLCache
+from app.services.storage import RedisStorage, storage
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+INVALIDATION_CHANNEL = "principal_cache:invalidate"
+
+
+class PrincipalCache(TTLCache):
+    """
+    Cache of authenticated users (UserPrincipal snapshots) keyed by username.
+    Indexed by user id (index_key) so writes can invalidate by primary key.
+
+    Once started with a Redis client, invalidations are published on INVALIDATION_CHANNEL
+    and applied by the other workers, otherwise they only reach this process and the
+    other workers keep their entry until it expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(
+            "principal", maxsize=maxsize, ttl=ttl, index_key=attrgetter("id")
+        )
+        self._client: "Redis | None" = None
+        # Identifies this process' messages, set on start as workers are forked after the import
+        self._origin = ""
+        self._outgoing: set[int] = set()
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def get_principal(self, username: str) -> UserPrincipal | None:
+        return self.get(username)
+
+    def set_principal(self, user: User) -> UserPrincipal:
+        principal = UserPrincipal.model_validate(user)
+        self.set(principal.username, principal)
+        return principal
+
+    def invalidate(self, user_id: int) -> None:
+        self._invalidate_local(user_id)
+        if self._tasks:
+            self._outgoing.add(user_id)
+            self._wake.set()
+
+    def _invalidate_local(self, user_id: int) -> None:
+        if self.pop_indexed(user_id) is not None:
+            logger.debug(f"Principal cache invalidated for user {user_id}")
+
+    def invalidate_many(self, user_ids) -> None:
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def invalidate_model_ids(self, model, ids) -> None:
+        """
+        Invalidate after a set-based write on rows of model, only User rows are cached.
+        """
+        if model is User:
+            self.invalidate_many(ids)
+
+    def invalidate_entry(self, entry) -> None:
+        """
+        Invalidate the principal related to an ORM entry (User or Profile), other entries are ignored.
+        """
+        if isinstance(entry, User):
+            self.invalidate(entry.id)
+        elif isinstance(entry, Profile):
+            self.invalidate(entry.user_id)
+
+    async def start(self, client: "Redis | None" = None) -> None:
+        """
+        Share the invalidations with the other workers through Redis pub/sub, client
+        defaults to the blacklist storage's one (only when REDIS_CONNECTION is set).
+        """
+        if client is None and isinstance(storage, RedisStorage):
+            client = storage.r
+        if client is None or self.maxsize <= 0:
+            return
+        self._client = client
+        self._origin = uuid4().hex
+        self._tasks = [
+            asyncio.create_task(self._publish()),
+            asyncio.create_task(self._subscribe()),
+        ]
+        logger.info("Principal cache invalidations shared through Redis")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _publish(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            user_ids, self._outgoing = self._outgoing, set()
+            message = f"{self._origin} {','.join(map(str, user_ids))}"
+            try:
+                await self._client.publish(INVALIDATION_CHANNEL, message)
+            except Exception as e:
+                # The other workers keep serving these users until their entry expires
+                logger.error(f"Principal cache invalidation not published: {e}")
+
+    async def _subscribe(self) -> None:
+        while True:
+            try:
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Invalidations published while disconnected are lost
+                    self.clear()
+                    while True:
+                        # Polled, a blocking read would hit the pool's socket timeout when idle
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message is not None:
+                            self._apply(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Principal cache invalidations subscription failed: {e}")
+                await asyncio.sleep(1)
+
+    def _apply(self, data: bytes) -> None:
+        origin, _, user_ids = data.decode().partition(" ")
+        if origin == self._origin:
+            return
+        for user_id in user_ids.split(","):
+            self._invalidate_local(int(user_id))
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
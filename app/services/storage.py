@@ -1,36 +1,164 @@
+import asyncio
 from datetime import datetime
-
-import redis
+from typing import TYPE_CHECKING
 
 from app.core.config import settings
+from app.core.logger import logger
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+BLACKLISTED_VALUE = "Blacklisted token"
 
 
 class LocalStorage:
     def __init__(self) -> None:
         self.storage = {}
 
-    def __contains__(self, key_name):
-        return True if key_name in self.storage else False
+    async def contains(self, key_name) -> bool:
+        return key_name in self.storage
 
-    def set_key(self, key_name, expire_timestamp):
+    async def ping(self) -> None:
+        pass
+
+    async def set_key(self, key_name, expire_timestamp):
         timestamp_to_datetime = str(datetime.fromtimestamp(expire_timestamp))
         self.storage[key_name] = timestamp_to_datetime
 
+    async def close(self) -> None:
+        pass
+
 
 class RedisStorage:
-    def __init__(self):
-        self.r = redis.Redis(
-            host=settings.REDIS_URL,
-            port=settings.REDIS_PORT,
-            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
-        )
+    """
+    Blacklist stored in Redis through a shared asyncio connection pool.
+
+    With pipeline=True, set_key only buffers the key and the buffer is written with a
+    single pipeline once it reaches batch_size or after flush_interval seconds.
+    Buffered keys are already visible to contains() in this process. A failed flush
+    is retried with an exponential backoff (up to max_retry_delay seconds).
+
+    A client can be given to use another Redis (e.g. fakeredis.aioredis.FakeRedis()),
+    otherwise redis is imported and the client created on first use.
+    """
+
+    def __init__(
+        self,
+        client: "Redis | None" = None,
+        pipeline: bool = False,
+        batch_size: int = 100,
+        flush_interval: float = 0.005,
+        max_retry_delay: float = 5.0,
+    ):
+        self._r = client
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self._pending: dict[str, int] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def r(self) -> "Redis":
+        if self._r is None:
+            from redis import asyncio as aioredis
+
+            pool = aioredis.ConnectionPool(
+                host=settings.REDIS_URL,
+                port=settings.REDIS_PORT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+            )
+            self._r = aioredis.Redis(connection_pool=pool)
+        return self._r
+
+    @staticmethod
+    def _ttl(expire_timestamp) -> int:
+        return max(int(expire_timestamp - datetime.now().timestamp()), 1)
+
+    async def contains(self, key_name) -> bool:
+        if key_name in self._pending:
+            return True
+        return bool(await self.r.exists(key_name))
+
+    async def ping(self) -> None:
+        await self.r.ping()
+
+    async def set_key(self, key_name, expire_timestamp):
+        if not self.pipeline:
+            await self.r.setex(
+                key_name, self._ttl(expire_timestamp), value=BLACKLISTED_VALUE
+            )
+            return
+
+        self._pending[key_name] = expire_timestamp
+
+        if len(self._pending) >= self.batch_size:
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                # The key is buffered, the logout must not fail: retry in the background
+                logger.error(f"Couldn't flush the blacklist pipeline, retrying: {e}")
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        delay = self.flush_interval
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    await self.flush()
+                    return
+                except Exception as e:
+                    delay = min(max(delay * 2, 0.1), self.max_retry_delay)
+                    logger.error(
+                        f"Couldn't flush the blacklist pipeline, retrying in {delay}s: {e}"
+                    )
+        finally:
+            self._flush_task = None
+
+    async def flush(self) -> None:
+        """
+        Write the buffered keys with one pipeline (pipeline mode only).
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for key_name, expire_timestamp in pending.items():
+                    pipe.setex(key_name, self._ttl(expire_timestamp), BLACKLISTED_VALUE)
+                await pipe.execute()
+        except Exception:
+            # Keep the keys so that they are retried with the next flush
+            self._pending = {**pending, **self._pending}
+            raise
 
-    def __contains__(self, key_name):
-        return self.r.exists(key_name)
+        logger.debug(f"Flushed {len(pending)} blacklisted tokens to redis")
 
-    def set_key(self, key_name, expire_timestamp):
-        ttl = expire_timestamp - int(datetime.now().timestamp())
-        self.r.setex(key_name, ttl, value="Blacklisted token")
+    async def close(self) -> None:
+        # A flush retrying with backoff would delay the shutdown, flush once instead
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self._r is not None:
+            await self._r.aclose()
 
 
-storage = LocalStorage() if not settings.REDIS_CONNECTION else RedisStorage()
+storage = (
+    LocalStorage()
+    if not settings.REDIS_CONNECTION
+    else RedisStorage(
+        pipeline=settings.REDIS_PIPELINE,
+        batch_size=settings.REDIS_PIPELINE_BATCH_SIZE,
+        flush_interval=settings.REDIS_PIPELINE_FLUSH_MS / 1000,
+    )
+)
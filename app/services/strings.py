@@ -14,3 +14,6 @@ EMAIL_VERIFIED = "Successfully verified email"
 LOGGED_OUT = "Successfully logged out"
 EMAIL_ALREADY_VERIFIED = "Email already verified"
 EMAIL_SENT = "Email sent"
+SERVER_BUSY = "Server is busy, please retry later"
+INVALID_CURSOR = "Invalid pagination cursor"
+IMPORT_RUNNING = "A user import is already running, please retry later"
@@ -0,0 +1,40 @@
+import hashlib
+import time
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+
+class TokenCache(TTLCache):
+    """
+    Payloads of already verified JWTs, kept until the token expires (exp claim).
+
+    Entries are keyed by a SHA-256 digest of the token type and the raw token (the
+    token itself is never stored) and a jti -> key index purges a token once it's
+    blacklisted. The blacklist itself is still checked on every request.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(
+            "token", maxsize=maxsize, ttl=0, index_key=lambda payload: payload["jti"]
+        )
+
+    @staticmethod
+    def key(token: str, type: str) -> bytes:
+        return hashlib.sha256(f"{type}:{token}".encode()).digest()
+
+    def get_payload(self, token: str, type: str) -> dict | None:
+        return self.get(self.key(token, type))
+
+    def set_payload(self, token: str, type: str, payload: dict) -> None:
+        ttl = payload["exp"] - time.time()
+        if ttl <= 0:
+            return
+
+        self.set(self.key(token, type), payload, ttl=ttl)
+
+    def invalidate_jti(self, jti: str) -> None:
+        self.pop_indexed(jti)
+
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE)
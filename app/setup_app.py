@@ -1,9 +1,19 @@
-import sentry_sdk
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.routes import api_router
+from app.core.mail import template_registry
+from app.core.permissions import scope_registry
+from app.db import query_stats
+from app.db.deps import ReplicaStickinessMiddleware
+from app.db.session import engine, replica_set
+from app.routes import api_routers
+from app.services import metrics
+from app.services.hashing import hashing_pool
+from app.services.health import health_prober
+from app.services.outbox import outbox_dispatcher
+from app.services.principal_cache import principal_cache
+from app.services.storage import storage
 
 
 def create_app() -> FastAPI:
@@ -17,11 +27,17 @@ def create_app() -> FastAPI:
     setup_routers(app)
     setup_middlewares(app)
     setup_sentry()
+    setup_metrics(app)
+    setup_query_stats(app)
+    setup_events(app)
     return app
 
 
 def setup_sentry():
     if settings.SENTRY_ENABLED:
+        # Only imported when enabled, it is one of the slowest imports of the app
+        import sentry_sdk
+
         sentry_sdk.init(
             dsn=settings.SENTRY_DSN,
             environment=settings.SENTRY_ENV,
@@ -29,8 +45,46 @@ def setup_sentry():
         )
 
 
+def setup_metrics(app: FastAPI) -> None:
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine()
+        # Wraps the middlewares added before it, QueryStatsMiddleware is added after it
+        # (outermost) so that the statements of the request are collected when it records them
+        app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+        app.add_event_handler("startup", metrics.record_pool_size)
+        app.add_event_handler("shutdown", metrics.mark_process_dead)
+
+
+def setup_query_stats(app: FastAPI) -> None:
+    if settings.QUERY_STATS_ENABLED:
+        query_stats.instrument_engine(engine)
+        for replica in replica_set.replicas:
+            query_stats.instrument_engine(replica.engine)
+        app.add_middleware(
+            query_stats.QueryStatsMiddleware,
+            warn_statements=settings.QUERY_STATS_WARN_STATEMENTS,
+        )
+
+
+def setup_events(app: FastAPI) -> None:
+    app.add_event_handler("startup", template_registry.precompile)
+    app.add_event_handler("startup", scope_registry.startup)
+    app.add_event_handler("startup", health_prober.start)
+    app.add_event_handler("startup", replica_set.start)
+    app.add_event_handler("startup", principal_cache.start)
+    if settings.EMAIL_OUTBOX_DISPATCHER_ENABLED:
+        app.add_event_handler("startup", outbox_dispatcher.start)
+    app.add_event_handler("shutdown", health_prober.stop)
+    app.add_event_handler("shutdown", replica_set.stop)
+    app.add_event_handler("shutdown", principal_cache.stop)
+    app.add_event_handler("shutdown", outbox_dispatcher.stop)
+    app.add_event_handler("shutdown", hashing_pool.shutdown)
+    app.add_event_handler("shutdown", storage.close)
+
+
 def setup_routers(app: FastAPI) -> None:
-    app.include_router(api_router, prefix=settings.API_V1_STR)
+    for router, tag in api_routers:
+        app.include_router(router, prefix=settings.API_V1_STR, tags=[tag])
 
 
 def setup_middlewares(app) -> None:
@@ -52,3 +106,9 @@ def setup_middlewares(app) -> None:
             allow_methods=["*"],
             allow_headers=["*"],
         ),
+
+    if replica_set:
+        app.add_middleware(
+            ReplicaStickinessMiddleware,
+            sticky_seconds=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        )
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Encode/decode throughput of the JWT codecs (app.core.jwt_codec) for HS384 and
+asymmetric algorithms, with the claims and JWT_OPTIONS of the access tokens.
+
+    python benchmarks/bench_jwt.py [--rounds 2000] [--algorithms HS384 RS256 ES256]
+"""
+import argparse
+import base64
+import calendar
+import os.path
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, rsa  # noqa: E402
+
+from app.core.jwt_codec import CODECS, get_codec  # noqa: E402
+from app.core.security import JWT_OPTIONS  # noqa: E402
+
+ALGORITHMS = ("HS384", "RS256", "ES256")
+
+
+def _pem(private_key) -> tuple[str, str]:
+    private = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private.decode(), public.decode()
+
+
+def make_keys(algorithm: str) -> tuple[str, str]:
+    """
+    (signing key, verification key) for the algorithm
+    """
+    if algorithm.startswith("HS"):
+        key = base64.urlsafe_b64encode(os.urandom(48)).decode()
+        return key, key
+    if algorithm.startswith("RS"):
+        return _pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    return _pem(ec.generate_private_key(ec.SECP256R1()))
+
+
+def make_claims() -> dict:
+    now = datetime.utcnow()
+    return {
+        "sub": "benchmark",
+        "scopes": ["admin"],
+        "exp": calendar.timegm((now + timedelta(minutes=15)).utctimetuple()),
+        "iat": calendar.timegm(now.utctimetuple()),
+        "iss": "FastAPI app template",
+        "jti": str(uuid.uuid4()),
+        "type": "access_token",
+    }
+
+
+def ops_per_second(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return rounds / (time.perf_counter() - start)
+
+
+def main(algorithms: list[str], rounds: int) -> None:
+    print(f"{'algorithm':<10} {'backend':<8} {'encode/s':>12} {'decode/s':>12}")
+
+    for algorithm in algorithms:
+        signing_key, verification_key = make_keys(algorithm)
+        claims = make_claims()
+
+        for name in CODECS:
+            codec = get_codec(name)
+            token = codec.encode(dict(claims), signing_key, algorithm)
+
+            encode = ops_per_second(
+                lambda: codec.encode(dict(claims), signing_key, algorithm), rounds
+            )
+            decode = ops_per_second(
+                lambda: codec.decode(token, verification_key, [algorithm], JWT_OPTIONS),
+                rounds,
+            )
+
+            print(f"{algorithm:<10} {name:<8} {encode:12.0f} {decode:12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS))
+    args = parser.parse_args()
+
+    main(args.algorithms, args.rounds)
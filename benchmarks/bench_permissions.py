@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Compare the previous permission resolution (User loaded with its roles and their
+permissions, scopes flattened in Python) with the SELECT DISTINCT resolver of
+app.modules.core.crud.
+
+Needs the configured PostgreSQL database (alembic upgrade head). Seeds 5k roles and
+5k permissions by default, the seeded rows are deleted at the end:
+    python benchmarks/bench_permissions.py [--roles 5000] [--permissions 5000]
+        [--user-roles 200] [--role-permissions 50] [--rounds 50]
+"""
+import argparse
+import asyncio
+import os.path
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app.db.loading import LoadingProfile, loading_options  # noqa: E402
+from app.db.session import async_session, engine  # noqa: E402
+from app.modules.core.crud import get_user_scopes  # noqa: E402
+from app.modules.core.models import (  # noqa: E402
+    Permission,
+    Role,
+    User,
+    role_permission,
+    user_role,
+)
+
+PREFIX = "benchperm"
+
+
+async def cleanup() -> None:
+    async with async_session() as db:
+        await db.execute(delete(User).where(User.username.startswith(PREFIX)))
+        await db.execute(delete(Role).where(Role.name.startswith(PREFIX)))
+        await db.execute(delete(Permission).where(Permission.scope.startswith(PREFIX)))
+        await db.commit()
+
+
+async def seed(args) -> int:
+    rng = random.Random(42)
+
+    async with async_session() as db:
+        execute = await db.execute(
+            insert(Role).returning(Role.id),
+            [
+                {"name": f"{PREFIX}{i}", "description": "bench"}
+                for i in range(args.roles)
+            ],
+        )
+        role_ids = list(execute.scalars())
+
+        execute = await db.execute(
+            insert(Permission).returning(Permission.id),
+            [
+                {"scope": f"{PREFIX}:{i}", "description": "bench"}
+                for i in range(args.permissions)
+            ],
+        )
+        permission_ids = list(execute.scalars())
+
+        execute = await db.execute(
+            insert(User).returning(User.id),
+            [
+                {
+                    "username": f"{PREFIX}user",
+                    "email": f"{PREFIX}@example.com",
+                    "password": "x",
+                    "is_active": True,
+                }
+            ],
+        )
+        user_id = execute.scalar_one()
+
+        await db.execute(
+            insert(role_permission),
+            [
+                {"cre_role_id": role_id, "cre_permission_id": permission_id}
+                for role_id in role_ids
+                for permission_id in rng.sample(permission_ids, args.role_permissions)
+            ],
+        )
+        await db.execute(
+            insert(user_role),
+            [
+                {"cre_user_id": user_id, "cre_role_id": role_id}
+                for role_id in rng.sample(role_ids, args.user_roles)
+            ],
+        )
+        await db.commit()
+
+    return user_id
+
+
+async def legacy_scopes(db, user_id: int) -> list[str]:
+    query = (
+        select(User)
+        .filter(User.id == user_id)
+        .options(*loading_options(User, LoadingProfile.WITH_PERMISSIONS))
+    )
+    execute = await db.execute(query)
+    user = execute.scalars().first()
+    return [permission.scope for role in user.roles for permission in role.permissions]
+
+
+async def bench(name: str, resolver, user_id: int, rounds: int) -> list[str]:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        async with async_session() as db:
+            scopes = await resolver(db, user_id)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    print(f"{name:<20} {elapsed * 1000:9.3f} ms   {len(scopes):6} scopes returned")
+    return scopes
+
+
+async def main(args) -> None:
+    await cleanup()
+    try:
+        user_id = await seed(args)
+
+        legacy = await bench("eager load", legacy_scopes, user_id, args.rounds)
+        distinct = await bench("select distinct", get_user_scopes, user_id, args.rounds)
+
+        assert set(legacy) == set(distinct)
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roles", type=int, default=5000)
+    parser.add_argument("--permissions", type=int, default=5000)
+    parser.add_argument("--user-roles", type=int, default=200)
+    parser.add_argument("--role-permissions", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=50)
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Latency of the check_jwt lookup (user with profile + scopes) and of the roles list
+endpoints (offset and keyset pages) with the direct and pooler DATABASE_POOL_MODE.
+
+Needs the configured PostgreSQL database (alembic upgrade head) with at least one user,
+--pooler ("host[:port]" or URI) runs the pooler mode through PgBouncer (transaction mode):
+    python benchmarks/bench_pool_mode.py [--rounds 500] [--pooler 127.0.0.1:6432]
+
+Each mode runs on a fresh engine, "first" is the average of the first 10 rounds
+(cold connection, warm statements only in direct mode), "steady" of the others.
+"""
+import argparse
+import asyncio
+import os.path
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi_pagination.ext.async_sqlalchemy import paginate  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.params_paginate import CursorParams, Params  # noqa: E402
+from app.core.query_factory import get_all_keyset, get_all_paginate  # noqa: E402
+from app.db.loading import LoadingProfile  # noqa: E402
+from app.db.session import replica_uri  # noqa: E402
+from app.db.session import SQLALCHEMY_DATABASE_URI, make_engine  # noqa: E402
+from app.modules.admin.crud import get_user_by_username  # noqa: E402
+from app.modules.core.crud import get_user_scopes  # noqa: E402
+from app.modules.core.models import Role, User  # noqa: E402
+
+FIRST_ROUNDS = 10
+
+
+async def check_jwt_lookup(db, username: str) -> None:
+    user = await get_user_by_username(db, username, LoadingProfile.WITH_PROFILE)
+    await get_user_scopes(db, user.id)
+
+
+async def list_offset(db, username: str) -> None:
+    await paginate(db, get_all_paginate(Role), params=Params(page=1, size=50))
+
+
+async def list_keyset(db, username: str) -> None:
+    await get_all_keyset(db, Role, CursorParams(size=50))
+
+
+SCENARIOS = {
+    "check_jwt lookup": check_jwt_lookup,
+    "roles offset page": list_offset,
+    "roles keyset page": list_keyset,
+}
+
+
+async def bench(mode: str, uri: str, username: str, rounds: int) -> None:
+    engine = make_engine(uri, mode)
+    session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    for name, scenario in SCENARIOS.items():
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with session() as db:
+                await scenario(db, username)
+            timings.append(time.perf_counter() - start)
+
+        first = sum(timings[:FIRST_ROUNDS]) / FIRST_ROUNDS
+        steady = sum(timings[FIRST_ROUNDS:]) / (rounds - FIRST_ROUNDS)
+        print(
+            f"{mode:<8} {name:<20} first {first * 1000:8.3f} ms   steady {steady * 1000:8.3f} ms"
+        )
+
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    engine = make_engine(SQLALCHEMY_DATABASE_URI, "direct")
+    async with engine.connect() as connection:
+        username = await connection.scalar(select(User.username).limit(1))
+    await engine.dispose()
+
+    if username is None:
+        print("No user in the database, run scripts/generate_random_data.py first")
+        return
+
+    # Same URI format as DATABASE_REPLICA_URLS
+    pooler_uri = replica_uri(args.pooler) if args.pooler else SQLALCHEMY_DATABASE_URI
+
+    await bench("direct", SQLALCHEMY_DATABASE_URI, username, args.rounds)
+    await bench("pooler", pooler_uri, username, args.rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--pooler", default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Compare the default FastAPI response path (response_model validation + jsonable_encoder
++ json.dumps) with app.core.responses.serialize_response on the admin list endpoints.
+
+Runs without a database, on 200 transient ORM rows:
+    python benchmarks/bench_serialization.py [--rows 200] [--rounds 200]
+"""
+import argparse
+import asyncio
+import os.path
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response as fastapi_serialize  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.core.params_paginate import Page  # noqa: E402
+from app.core.responses import serialize_response  # noqa: E402
+from app.modules.core.models import Profile, User  # noqa: E402
+from app.modules.users.schema import UserSchema, UserSchemaProfile  # noqa: E402
+
+
+def make_users(rows: int) -> list[User]:
+    now = datetime.utcnow()
+    users = []
+    for i in range(rows):
+        user = User(
+            id=i,
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="x",
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        user.profile = Profile(id=i, user_id=i, city="Paris", postcode="75000")
+        users.append(user)
+    return users
+
+
+async def fastapi_path(field, content) -> bytes:
+    value = await fastapi_serialize(field=field, response_content=content)
+    return JSONResponse(value).body
+
+
+def fast_path(schema, content) -> bytes:
+    return serialize_response(schema, content).body
+
+
+async def bench(name: str, schema, content, rounds: int) -> None:
+    field = create_response_field(name="Response", type_=schema)
+
+    # Both paths must produce the same document
+    assert (await fastapi_path(field, content)).replace(b" ", b"") == fast_path(
+        schema, content
+    ).replace(b" ", b"")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fastapi_path(field, content)
+    default = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fast_path(schema, content)
+    fast = (time.perf_counter() - start) / rounds
+
+    print(
+        f"{name:<40} default {default * 1000:8.3f} ms   "
+        f"fast {fast * 1000:8.3f} ms   x{default / fast:.1f}"
+    )
+
+
+async def main(rows: int, rounds: int) -> None:
+    users = make_users(rows)
+    page = Page[UserSchema](items=users, total=rows, page=1, size=rows, pages=1)
+
+    await bench(f"GET /admin/users ({rows} rows)", Page[UserSchema], page, rounds)
+    await bench("GET /admin/users/{user_id}", UserSchemaProfile, users[0], rounds * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.rounds))
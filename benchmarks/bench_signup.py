@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Compare the previous signup sequence (2 existence checks, token lookup, 3 inserts each
+in their own transaction + outbox email) with app.auth.crud.create_user_account.
+
+Needs the configured PostgreSQL database (alembic upgrade head), created users are deleted:
+    python benchmarks/bench_signup.py [--rounds 200]
+"""
+import argparse
+import asyncio
+import os.path
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import delete, event, select  # noqa: E402
+
+from app.auth.crud import create_user_account  # noqa: E402
+from app.core.mail import enqueue_email  # noqa: E402
+from app.core.query_factory import check_if_exists, create_entry  # noqa: E402
+from app.db.session import async_session, engine  # noqa: E402
+from app.modules.core.models import (  # noqa: E402
+    EmailOutbox,
+    EmailVerification,
+    Profile,
+    User,
+)
+
+PREFIX = "benchsignup"
+BODY = "<p>bench signup</p>"
+# Hashing is not measured, both paths get an already hashed password
+PASSWORD = "$2b$12$C6UzMDM.H6dfI/f/IKxGhuK1gM1iA1Jx.JV4h7y3RrD8UZ3oc6H.e"
+
+counters = {"statements": 0, "transactions": 0}
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def count_statement(*args) -> None:
+    counters["statements"] += 1
+
+
+@event.listens_for(engine.sync_engine, "commit")
+def count_transaction(*args) -> None:
+    counters["transactions"] += 1
+
+
+def make_data(name: str) -> tuple[dict, dict]:
+    data_in = {
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": PASSWORD,
+        "is_active": False,
+    }
+    email = {
+        "subject": "Verify your email",
+        "recipients": [{"email": data_in["email"], "name": name}],
+        "body": BODY,
+    }
+    return data_in, email
+
+
+async def legacy_signup(db, data_in: dict, email: dict) -> None:
+    await check_if_exists(db, User, [User.username == data_in["username"]])
+    await check_if_exists(db, User, [User.email == data_in["email"]])
+
+    token = str(uuid.uuid4())
+    await check_if_exists(db, EmailVerification, [EmailVerification.token == token])
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    enqueue_email(db, email["subject"], email["recipients"], email["body"])
+    user = await create_entry(db, User, data_in)
+    await create_entry(
+        db,
+        EmailVerification,
+        {"token": token, "user_id": user.id, "expires_at": expires_at},
+    )
+    await create_entry(db, Profile, {"user_id": user.id})
+
+
+async def single_statement_signup(db, data_in: dict, email: dict) -> None:
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    await create_user_account(db, data_in, str(uuid.uuid4()), expires_at, email)
+
+
+async def cleanup() -> None:
+    async with async_session() as db:
+        users = select(User.id).where(User.username.startswith(PREFIX))
+        await db.execute(
+            delete(EmailVerification).where(EmailVerification.user_id.in_(users))
+        )
+        await db.execute(delete(Profile).where(Profile.user_id.in_(users)))
+        await db.execute(delete(User).where(User.username.startswith(PREFIX)))
+        await db.execute(delete(EmailOutbox).where(EmailOutbox.body == BODY))
+        await db.commit()
+
+
+async def bench(name: str, signup, rounds: int) -> None:
+    counters.update(statements=0, transactions=0)
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        data_in, email = make_data(f"{PREFIX}{name[:6]}{i}")
+        async with async_session() as db:
+            await signup(db, data_in, email)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    print(
+        f"{name:<24} {elapsed * 1000:8.3f} ms/signup   "
+        f"{counters['statements'] / rounds:5.1f} statements   "
+        f"{counters['transactions'] / rounds:4.1f} transactions"
+    )
+
+
+async def main(rounds: int) -> None:
+    await cleanup()
+    try:
+        await bench("legacy", legacy_signup, rounds)
+        await bench("single statement", single_statement_signup, rounds)
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rounds))
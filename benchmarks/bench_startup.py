@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Cold start of the app, each run in a fresh interpreter: time to import main (app
+created) and time to answer the first request (GET /health/live, without the
+lifespan events so that no database is needed).
+
+Exits with 1 when the median cold start is above --max-seconds (CI check):
+    python benchmarks/bench_startup.py [--runs 5] [--max-seconds 2.5] [--slowest 15]
+"""
+import argparse
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.core.config import settings
+client = TestClient(main.app)
+client_created = time.perf_counter()
+response = client.get(f"{settings.API_V1_STR}/health/live")
+assert response.status_code == 200, response.text
+first_request = time.perf_counter() - client_created
+print(json.dumps({"import": imported - start, "first_request": first_request}))
+"""
+
+# Modules that must not be loaded by "import main" (loaded on first use)
+LAZY_MODULES = ("sentry_sdk", "httpx", "jinja2", "redis", "jose")
+
+CHECK_LAZY = f"""
+import sys
+import main
+print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Settings required by the app, the values don't matter here
+    env.setdefault("JWT_ACCESS_TOKEN_KEY", "bench-startup")
+    env.setdefault("JWT_REFRESH_TOKEN_KEY", "bench-startup")
+    return env
+
+
+def run_child(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def slowest_packages(count: int) -> list[tuple[int, str]]:
+    """
+    (microseconds, package) of the packages taking the most time to import with main,
+    summing the self time of their modules.
+    """
+    stderr = run_child("import main", "-X", "importtime").stderr
+    packages: dict[str, int] = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = line.removeprefix("import time:").split("|")
+        if self_time.strip().isdigit():
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(self_time)
+
+    return sorted(((us, name) for name, us in packages.items()), reverse=True)[:count]
+
+
+def main(runs: int, max_seconds: float, slowest: int) -> int:
+    results = [
+        json.loads(run_child(CHILD).stdout.splitlines()[-1]) for _ in range(runs)
+    ]
+
+    imports = [result["import"] for result in results]
+    first_requests = [result["first_request"] for result in results]
+    totals = [i + f for i, f in zip(imports, first_requests)]
+
+    print(f"{'':<16} {'median':>10} {'min':>10} {'max':>10}")
+    for name, values in (
+        ("import main", imports),
+        ("first request", first_requests),
+        ("cold start", totals),
+    ):
+        print(
+            f"{name:<16} {statistics.median(values) * 1000:8.1f}ms "
+            f"{min(values) * 1000:8.1f}ms {max(values) * 1000:8.1f}ms"
+        )
+
+    if slowest:
+        print("\nslowest packages to import:")
+        for us, name in slowest_packages(slowest):
+            print(f"  {us / 1000:8.1f}ms {name}")
+
+    eager = run_child(CHECK_LAZY).stdout.strip()
+    if eager:
+        print(f"\nFAIL: loaded at import time: {eager}")
+        return 1
+
+    median = statistics.median(totals)
+    if median > max_seconds:
+        print(f"\nFAIL: cold start {median:.2f}s > {max_seconds:.2f}s")
+        return 1
+
+    print(f"\nOK: cold start {median:.2f}s <= {max_seconds:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=2.5)
+    parser.add_argument("--slowest", type=int, default=15)
+    args = parser.parse_args()
+
+    sys.exit(main(args.runs, args.max_seconds, args.slowest))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Throughput and peak memory of the bulk user import (app/modules/admin/user_import.py).
+
+Needs the configured PostgreSQL database (alembic upgrade head). Generates an NDJSON
+file of --rows users, by default with an already hashed password so that the COPY and
+upserts are measured (--hash-every N gives a plain password to every Nth row instead),
+imports it twice (creation then --update-existing) and deletes the users at the end:
+    python benchmarks/bench_user_import.py [--rows 1000000] [--batch-size 5000]
+        [--hash-every 0] [--workers 8]
+"""
+import argparse
+import asyncio
+import json
+import os.path
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from app.core.export import ExportFormat  # noqa: E402
+from app.db.session import async_session, engine  # noqa: E402
+from app.modules.admin.user_import import (  # noqa: E402
+    ProcessPoolHasher,
+    UserImporter,
+    read_rows,
+)
+from app.modules.core.models import Profile, User  # noqa: E402
+
+PREFIX = "benchimport"
+PASSWORD_HASH = "$2b$12$C6UzMDM.H6dfI/f/IKxGhuK1gM1iA1Jx.JV4h7y3RrD8UZ3oc6H.e"
+
+
+def write_file(path: str, rows: int, hash_every: int) -> None:
+    with open(path, "w") as file:
+        for i in range(rows):
+            row = {
+                "username": f"{PREFIX}{i}",
+                "email": f"{PREFIX}{i}@example.com",
+                "city": "Paris",
+            }
+            if hash_every and i % hash_every == 0:
+                row["password"] = "password123"
+            else:
+                row["password_hash"] = PASSWORD_HASH
+            file.write(json.dumps(row) + "\n")
+
+
+async def cleanup() -> None:
+    async with async_session() as db:
+        users = select(User.id).where(User.username.startswith(PREFIX))
+        await db.execute(delete(Profile).where(Profile.user_id.in_(users)))
+        await db.execute(delete(User).where(User.username.startswith(PREFIX)))
+        await db.commit()
+
+
+async def bench(name: str, path: str, update_existing: bool, args) -> None:
+    start = time.perf_counter()
+    hasher = ProcessPoolHasher(args.workers)
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        async with async_session() as db:
+            importer = UserImporter(
+                db,
+                update_existing=update_existing,
+                batch_size=args.batch_size,
+                hasher=hasher,
+            )
+            report = await importer.run(read_rows(file, ExportFormat.NDJSON))
+    hasher.shutdown()
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{name:<8} {report.rows} rows in {elapsed:7.1f}s ({report.rows / elapsed:8.0f} rows/s)   "
+        f"{report.created} created, {report.updated} updated, {report.rejected} rejected   "
+        f"peak RSS {peak:.0f} MB"
+    )
+
+
+async def main(args) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "users.ndjson")
+    write_file(path, args.rows, args.hash_every)
+
+    await cleanup()
+    try:
+        await bench("create", path, False, args)
+        await bench("update", path, True, args)
+    finally:
+        await cleanup()
+        await engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--hash-every", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Check the read replica routing of app.db.session against real servers, e.g. two local
+PostgreSQL instances (the second doesn't need to be an actual replica):
+    DATABASE_PORT=5432 DATABASE_REPLICA_URLS=127.0.0.1:5433 python benchmarks/check_replica_routing.py
+
+Reports which server (inet_server_port()) answered each step and exits with 1
+when a read-only session isn't routed as expected.
+"""
+import asyncio
+import os.path
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import async_session, replica_set  # noqa: E402
+from app.modules.core.models import Role  # noqa: E402
+
+SERVER_PORT = select(func.inet_server_port())
+
+
+async def server_port(db) -> int:
+    return await db.scalar(SERVER_PORT)
+
+
+async def main() -> int:
+    if not replica_set:
+        print("DATABASE_REPLICA_URLS is not set")
+        return 1
+
+    await replica_set.check_once()
+    print(f"replicas: {replica_set.stats()}")
+    primary = settings.DATABASE_PORT
+    errors = []
+
+    def expect(step: str, port: int, expected: str) -> None:
+        on_primary = port == primary
+        print(f"{step:<40} port {port} ({'primary' if on_primary else 'replica'})")
+        if on_primary != (expected == "primary"):
+            errors.append(f"{step}: expected the {expected}")
+
+    async with async_session() as db:
+        expect("default session", await server_port(db), "primary")
+
+    async with async_session(info={"read_only": True}) as db:
+        expect("read-only session", await server_port(db), "replica")
+        await db.execute(select(Role.id).limit(1).with_for_update())
+        expect("read-only session after FOR UPDATE", await server_port(db), "primary")
+
+    for replica in replica_set.replicas:
+        replica.mark_unhealthy("marked unhealthy by the check")
+    async with async_session(info={"read_only": True}) as db:
+        expect("read-only session, replicas down", await server_port(db), "primary")
+
+    await replica_set.check_once()
+    async with async_session(info={"read_only": True}) as db:
+        expect("read-only session, replicas back", await server_port(db), "replica")
+
+    await replica_set.stop()
+    for error in errors:
+        print(f"  {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
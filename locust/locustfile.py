@@ -14,6 +14,21 @@ class QuickstartUser(HttpUser):
             f"/api/v1/admin/users?page={random.randint(1, 100)}", headers={"Authorization": f"Bearer {jwt_token}"}
         )
 
+    @task
+    def get_all_users_cursor(self):
+        # Walk a few pages with keyset pagination, every page should cost the same
+        cursor = None
+        for _ in range(random.randint(1, 100)):
+            params = f"&cursor={cursor}" if cursor else ""
+            response = self.client.get(
+                f"/api/v1/admin/users/cursor?size=100{params}",
+                headers={"Authorization": f"Bearer {jwt_token}"},
+                name="/api/v1/admin/users/cursor",
+            )
+            cursor = response.json().get("next_cursor")
+            if cursor is None:
+                break
+
     @task(2)
     def get_random_user(self):
         self.client.get(
@@ -1,53 +1,353 @@
-import asyncio
+#!/usr/bin/env python
+"""
+Load a synthetic dataset for benchmarks: users with their profile, roles, permissions
+and the user/role and role/permission links, e.g. 1M users:
+    python scripts/generate_random_data.py --users 1000000 [--roles 5000] [--permissions 5000]
+        [--user-roles 0-5] [--role-skew 1.0] [--role-permissions 5-50] [--permission-skew 0.5]
+        [--inactive-ratio 0.1] [--batch-size 20000] [--workers 8] [--seed 42]
+        [--password password123]
+
+Users are generated in batches by --workers processes and loaded with COPY, one
+transaction per batch, so the memory used doesn't depend on --users. Ids follow the
+existing rows and the sequences are moved past the loaded ones at the end.
+
+Each batch has its own random.Random(seed, batch): the same --seed and --batch-size
+give the same dataset whatever --workers (except the bcrypt salts). Every user logs in
+with --password, hashed PASSWORD_HASHES times up front and reused (bcrypt is far too
+slow to hash a password per user).
+
+--user-roles and --role-permissions are "min-max" link counts (uniform), --role-skew
+and --permission-skew the Zipf exponent of the linked roles/permissions (0 is uniform,
+the higher the more the first roles/permissions are linked).
+"""
+import argparse
+import csv
+import io
+import itertools
 import os.path
+import random
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 
-from faker import Faker
+import bcrypt
+import psycopg2
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from app.db.session import async_session
-from app.modules.core.models import Permission, Role, User
+from app.core.config import settings  # noqa: E402
+
+PASSWORD_HASHES = 16
+# created_at of the generated rows is spread over the year after START_DATE
+START_DATE = datetime(2024, 1, 1)
+SPREAD_SECONDS = 365 * 24 * 3600
+
+FIRST_NAMES = [
+    "adam",
+    "alice",
+    "anna",
+    "ben",
+    "chloe",
+    "david",
+    "emma",
+    "eva",
+    "felix",
+    "hugo",
+    "ines",
+    "jack",
+    "jade",
+    "leo",
+    "lina",
+    "louis",
+    "lucas",
+    "mia",
+    "noah",
+    "nora",
+    "oscar",
+    "paul",
+    "rose",
+    "sam",
+    "sara",
+    "tom",
+    "zoe",
+]
+LAST_NAMES = [
+    "bernard",
+    "brown",
+    "dubois",
+    "durand",
+    "garcia",
+    "jones",
+    "lambert",
+    "martin",
+    "miller",
+    "moreau",
+    "petit",
+    "richard",
+    "robert",
+    "roux",
+    "smith",
+    "taylor",
+    "thomas",
+    "wilson",
+]
+DOMAINS = ["example.com", "example.org", "example.net"]
+STREETS = ["main street", "oak avenue", "park road", "rue de la paix", "station road"]
+CITIES = ["berlin", "lisbon", "london", "lyon", "madrid", "paris", "rome", "toulouse"]
+RESOURCES = [
+    "billing",
+    "invoice",
+    "order",
+    "permission",
+    "product",
+    "project",
+    "report",
+    "role",
+    "team",
+    "user",
+]
+ACTIONS = ["admin", "create", "delete", "export", "read", "update"]
+
+USER_COLUMNS = [
+    "id",
+    "username",
+    "email",
+    "password",
+    "is_active",
+    "created_at",
+    "updated_at",
+]
+PROFILE_COLUMNS = [
+    "id",
+    "user_id",
+    "line1",
+    "city",
+    "postcode",
+    "created_at",
+    "updated_at",
+]
+ROLE_COLUMNS = ["id", "name", "description", "created_at", "updated_at"]
+PERMISSION_COLUMNS = ["id", "scope", "description", "created_at", "updated_at"]
+TABLES = ["cre_user", "cre_profile", "cre_role", "cre_permission"]
+
+
+def dsn() -> str:
+    return "postgresql://{0}:{1}@{2}:{3}/{4}".format(
+        settings.DATABASE_USER,
+        settings.DATABASE_PASSWORD,
+        settings.DATABASE_URL,
+        settings.DATABASE_PORT,
+        settings.DATABASE_NAME,
+    )
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
 
-fake = Faker()
 
+def zipf_weights(count: int, skew: float) -> list[float]:
+    # Cumulative weights of the ranks 1..count for random.choices
+    return list(itertools.accumulate(1 / rank**skew for rank in range(1, count + 1)))
 
-async def generate():
-    async with async_session() as session:
-        session.add_all(
-            [
-                User(
-                    username=fake.unique.user_name(),
-                    email=fake.unique.email(),
-                    password=fake.password(),
-                    is_active=True,
-                )
-                for _ in range(100_000)
-            ]
+
+def pick(
+    rng: random.Random, count: int, cum_weights: list[float], links: tuple[int, int]
+) -> list[int]:
+    """
+    Distinct indexes (0..count-1) of the linked rows, between links[0] and links[1] of them.
+    """
+    wanted = min(rng.randint(*links), count)
+    picked = set()
+    while len(picked) < wanted:
+        picked.update(
+            rng.choices(range(count), cum_weights=cum_weights, k=wanted - len(picked))
         )
+    return sorted(picked)
+
+
+def timestamp(rng: random.Random) -> datetime:
+    return START_DATE + timedelta(seconds=rng.randrange(SPREAD_SECONDS))
+
+
+def copy(cursor, table: str, columns: list[str], rows: list[tuple]) -> None:
+    # None is written as an empty unquoted field, i.e. NULL for COPY csv
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+_worker: dict = {}
+
+
+def _init_worker(options: dict) -> None:
+    _worker["options"] = options
+    _worker["connection"] = psycopg2.connect(dsn())
+    _worker["role_weights"] = zipf_weights(options["roles"], options["role_skew"])
 
-        session.add_all(
-            [
-                Role(
-                    name=fake.unique.text(max_nb_chars=50),
-                    description=fake.text(max_nb_chars=255),
-                )
-                for _ in range(5000)
-            ]
+
+def load_users(batch: int) -> int:
+    options = _worker["options"]
+    rng = random.Random(f"{options['seed']}:users:{batch}")
+    first = batch * options["batch_size"]
+    last = min(first + options["batch_size"], options["users"])
+
+    users, profiles, links = [], [], []
+    for index in range(first, last):
+        user_id = options["user_base"] + index + 1
+        username = f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}{user_id}"
+        created_at = timestamp(rng)
+        users.append(
+            (
+                user_id,
+                username,
+                f"{username}@{rng.choice(DOMAINS)}",
+                rng.choice(options["password_hashes"]),
+                rng.random() >= options["inactive_ratio"],
+                created_at,
+                created_at,
+            )
+        )
+        profiles.append(
+            (
+                options["profile_base"] + index + 1,
+                user_id,
+                f"{rng.randint(1, 200)} {rng.choice(STREETS)}",
+                rng.choice(CITIES),
+                f"{rng.randint(10000, 99999)}",
+                created_at,
+                created_at,
+            )
+        )
+        for role in pick(
+            rng, options["roles"], _worker["role_weights"], options["user_roles"]
+        ):
+            links.append((user_id, options["role_base"] + role + 1))
+
+    connection = _worker["connection"]
+    with connection, connection.cursor() as cursor:
+        copy(cursor, "cre_user", USER_COLUMNS, users)
+        copy(cursor, "cre_profile", PROFILE_COLUMNS, profiles)
+        copy(cursor, "cre_user_role", ["cre_user_id", "cre_role_id"], links)
+
+    return last - first
+
+
+def load_roles_permissions(cursor, options: dict, args) -> int:
+    rng = random.Random(f"{args.seed}:roles")
+
+    roles = []
+    for index in range(args.roles):
+        role_id = options["role_base"] + index + 1
+        created_at = timestamp(rng)
+        name = f"{rng.choice(RESOURCES)} {rng.choice(ACTIONS)} {role_id}"
+        roles.append((role_id, name, f"Role {name}", created_at, created_at))
+
+    permissions = []
+    for index in range(args.permissions):
+        permission_id = options["permission_base"] + index + 1
+        created_at = timestamp(rng)
+        scope = f"{rng.choice(RESOURCES)}:{rng.choice(ACTIONS)}:{permission_id}"
+        permissions.append(
+            (permission_id, scope, f"Permission {scope}", created_at, created_at)
         )
 
-        session.add_all(
-            [
-                Permission(
-                    scope=fake.unique.text(max_nb_chars=50),
-                    description=fake.text(max_nb_chars=255),
-                )
-                for _ in range(5000)
-            ]
+    weights = zipf_weights(args.permissions, args.permission_skew)
+    links = [
+        (role_id, options["permission_base"] + permission + 1)
+        for role_id, *_ in roles
+        for permission in pick(
+            rng, args.permissions, weights, parse_range(args.role_permissions)
         )
+    ]
+
+    copy(cursor, "cre_role", ROLE_COLUMNS, roles)
+    copy(cursor, "cre_permission", PERMISSION_COLUMNS, permissions)
+    copy(cursor, "cre_role_permission", ["cre_role_id", "cre_permission_id"], links)
+    return len(links)
+
+
+def main(args) -> None:
+    start = time.perf_counter()
+    password_hashes = [
+        bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt()).decode()
+        for _ in range(PASSWORD_HASHES)
+    ]
+
+    connection = psycopg2.connect(dsn())
+    with connection, connection.cursor() as cursor:
+        bases = {}
+        for table in TABLES:
+            cursor.execute(f"SELECT COALESCE(max(id), 0) FROM {table}")
+            bases[table] = cursor.fetchone()[0]
 
-        await session.commit()
+        options = {
+            "seed": args.seed,
+            "users": args.users,
+            "roles": args.roles,
+            "batch_size": args.batch_size,
+            "user_base": bases["cre_user"],
+            "profile_base": bases["cre_profile"],
+            "role_base": bases["cre_role"],
+            "permission_base": bases["cre_permission"],
+            "password_hashes": password_hashes,
+            "inactive_ratio": args.inactive_ratio,
+            "user_roles": parse_range(args.user_roles),
+            "role_skew": args.role_skew,
+        }
+        role_links = load_roles_permissions(cursor, options, args)
+    # Not inherited by the workers, their exit would close it
+    connection.close()
+    print(
+        f"{args.roles} roles, {args.permissions} permissions, {role_links} role/permission links"
+    )
+
+    loaded = 0
+    batches = range((args.users + args.batch_size - 1) // args.batch_size)
+    with ProcessPoolExecutor(
+        args.workers, initializer=_init_worker, initargs=(options,)
+    ) as pool:
+        for count in pool.map(load_users, batches):
+            loaded += count
+            elapsed = time.perf_counter() - start
+            print(f"{loaded}/{args.users} users ({loaded / elapsed:.0f} users/s)")
+
+    connection = psycopg2.connect(dsn())
+    with connection, connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+            )
+    # Planner statistics of the loaded tables (outside of a transaction)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        for table in [*TABLES, "cre_user_role", "cre_role_permission"]:
+            cursor.execute(f"ANALYZE {table}")
+    connection.close()
+
+    print(
+        f"Done in {time.perf_counter() - start:.1f}s, every user's password is {args.password!r}"
+    )
 
 
 if __name__ == "__main__":
-    asyncio.run(generate())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--roles", type=int, default=5000)
+    parser.add_argument("--permissions", type=int, default=5000)
+    parser.add_argument("--user-roles", default="0-5")
+    parser.add_argument("--role-skew", type=float, default=1.0)
+    parser.add_argument("--role-permissions", default="5-50")
+    parser.add_argument("--permission-skew", type=float, default=0.5)
+    parser.add_argument("--inactive-ratio", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password123")
+    args = parser.parse_args()
+
+    main(args)
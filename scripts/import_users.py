@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Import users from a CSV or NDJSON file (see app/modules/admin/user_import.py):
+    python scripts/import_users.py users.csv [--format csv] [--update-existing]
+        [--batch-size 5000] [--workers 8] [--rejects rejects.ndjson]
+
+Columns/keys: username, email, password or password_hash (bcrypt), is_active,
+line1, line2, city, province, postcode and roles (role names, "|" separated in CSV).
+Every rejected row is written to --rejects (NDJSON) when given.
+"""
+import argparse
+import asyncio
+import os.path
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.export import ExportFormat  # noqa: E402
+from app.db.session import async_session  # noqa: E402
+from app.modules.admin.user_import import (  # noqa: E402
+    ProcessPoolHasher,
+    UserImporter,
+    read_rows,
+)
+
+
+async def main(args) -> int:
+    import_format = args.format or (
+        ExportFormat.CSV if args.file.endswith(".csv") else ExportFormat.NDJSON
+    )
+    rejects = open(args.rejects, "w") if args.rejects else None
+
+    def on_rejected(row) -> None:
+        if rejects is not None:
+            rejects.write(row.model_dump_json() + "\n")
+
+    start = time.perf_counter()
+    hasher = ProcessPoolHasher(args.workers)
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as file:
+            async with async_session() as db:
+                importer = UserImporter(
+                    db,
+                    update_existing=args.update_existing,
+                    batch_size=args.batch_size,
+                    hasher=hasher,
+                    on_rejected=on_rejected,
+                )
+                report = await importer.run(read_rows(file, import_format))
+    finally:
+        hasher.shutdown()
+        if rejects is not None:
+            rejects.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{report.rows} rows in {elapsed:.1f}s ({report.rows / elapsed:.0f} rows/s): "
+        f"{report.created} created, {report.updated} updated, {report.rejected} rejected"
+    )
+    if args.rejects is None:
+        for row in report.rejected_rows[:20]:
+            print(f"  line {row.line} ({row.username}): {row.reason}")
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file")
+    parser.add_argument("--format", type=ExportFormat, default=None)
+    parser.add_argument("--update-existing", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rejects", default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,6 @@
+import os
+
+# Required settings, set before app.core.config is imported by the tests
+os.environ.setdefault("JWT_ACCESS_TOKEN_KEY", "test-access-key-" + "a" * 48)
+os.environ.setdefault("JWT_REFRESH_TOKEN_KEY", "test-refresh-key-" + "b" * 48)
+os.environ.setdefault("QUERY_BUDGETS_ENFORCED", "true")
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.modules.core.crud import (
+    link_roles_to_users,
+    unlink_roles_from_users,
+    user_permissions_query,
+    user_scopes_query,
+)
+from app.modules.core.models import Permission, role_permission, user_role
+from tests.test_query_factory import FakeSession
+
+
+class FakeRowcount:
+    def __init__(self, rowcount: int) -> None:
+        self.rowcount = rowcount
+
+
+class FakeLinkSession(FakeSession):
+    def __init__(self, *rowcounts: int) -> None:
+        super().__init__()
+        self.rowcounts = list(rowcounts)
+
+    async def execute(self, stmt, params=None) -> FakeRowcount:
+        await super().execute(stmt, params)
+        return FakeRowcount(self.rowcounts.pop(0))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    # The pivot tables and the permissions only, the timestamps default to now()
+    # which SQLite doesn't parse
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE cre_permission (id INTEGER PRIMARY KEY, scope TEXT, "
+                "description TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"
+            )
+        )
+    Base.metadata.create_all(engine, tables=[user_role, role_permission])
+
+    with Session(engine) as session:
+        session.execute(
+            insert(Permission.__table__),
+            [{"id": id, "scope": f"scope{id}"} for id in (1, 2, 3)],
+        )
+        # Both roles of user 1 grant scope2
+        session.execute(
+            insert(user_role),
+            [
+                {"cre_user_id": 1, "cre_role_id": 1},
+                {"cre_user_id": 1, "cre_role_id": 2},
+            ],
+        )
+        session.execute(
+            insert(role_permission),
+            [
+                {"cre_role_id": 1, "cre_permission_id": 1},
+                {"cre_role_id": 1, "cre_permission_id": 2},
+                {"cre_role_id": 2, "cre_permission_id": 2},
+                {"cre_role_id": 2, "cre_permission_id": 3},
+            ],
+        )
+        session.commit()
+        yield session
+
+    engine.dispose()
+
+
+def test_permissions_shared_by_roles_are_returned_once(db):
+    scopes = db.scalars(user_scopes_query(1)).all()
+
+    assert scopes == ["scope1", "scope2", "scope3"]
+    permissions = db.execute(
+        user_permissions_query(1, Permission.id, Permission.scope).order_by(
+            Permission.id
+        )
+    ).all()
+    assert [tuple(permission) for permission in permissions] == [
+        (1, "scope1"),
+        (2, "scope2"),
+        (3, "scope3"),
+    ]
+
+
+def test_user_without_roles_has_no_permissions(db):
+    assert db.scalars(user_scopes_query(2)).all() == []
+
+
+def test_relinking_is_idempotent():
+    # The second link only conflicts with the existing links
+    db = FakeLinkSession(2, 0)
+
+    assert asyncio.run(link_roles_to_users(db, [1, 2], [1])) == 2
+    assert asyncio.run(link_roles_to_users(db, [1, 2], [1])) == 0
+
+    for statement, params in zip(db.statements, db.params):
+        assert statement.startswith(
+            "INSERT INTO cre_user_role (cre_user_id, cre_role_id) SELECT cre_user.id, cre_role.id"
+        )
+        assert statement.endswith("ON CONFLICT DO NOTHING")
+        assert list(params.values()) == [[1], [1, 2]]
+    assert db.commits == 2
+
+
+def test_unlink_only_removes_the_given_links():
+    db = FakeLinkSession(1)
+
+    assert asyncio.run(unlink_roles_from_users(db, [2], [1, 3])) == 1
+
+    assert db.statements[0].startswith("DELETE FROM cre_user_role WHERE")
+    assert list(db.params[0].values()) == [[1, 3], [2]]
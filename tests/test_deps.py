@@ -0,0 +1,107 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from app.db import deps
+from app.db.deps import (
+    PRIMARY_COOKIE,
+    ReplicaStickinessMiddleware,
+    _session_info,
+    stick_principal,
+)
+
+
+@pytest.fixture(autouse=True)
+def replicas(monkeypatch):
+    monkeypatch.setattr(deps, "replica_set", True)
+    monkeypatch.setattr(
+        deps,
+        "primary_principals",
+        deps.TTLCache("primary_principals", maxsize=100, ttl=10),
+    )
+
+
+def _request(cookie: str | None = None) -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "headers": headers, "state": {}})
+
+
+def test_reads_go_to_the_replica_without_the_cookie():
+    assert _session_info(_request(), True)["read_only"] is True
+    assert _session_info(_request(), False)["read_only"] is False
+
+
+def test_reads_go_to_the_primary_during_the_sticky_window():
+    until = int(time.time()) + 10
+    info = _session_info(_request(f"{PRIMARY_COOKIE}={until}"), True)
+
+    assert info["read_only"] is False
+
+
+@pytest.mark.parametrize("value", [int(time.time()) - 1, "garbage"])
+def test_expired_or_invalid_cookie_is_ignored(value):
+    info = _session_info(_request(f"{PRIMARY_COOKIE}={value}"), True)
+
+    assert info["read_only"] is True
+
+
+def test_no_routing_without_replicas(monkeypatch):
+    monkeypatch.setattr(deps, "replica_set", False)
+
+    assert _session_info(_request(), True) == {}
+
+
+def test_principal_that_wrote_reads_from_the_primary():
+    request = _request()
+    db = SimpleNamespace(info=_session_info(request, True))
+
+    stick_principal(db, 1)
+    assert db.info["read_only"] is True
+    assert request.state.principal_id == 1
+
+    deps.primary_principals.set(1, True)
+    stick_principal(db, 1)
+    assert db.info["read_only"] is False
+
+
+def _run_middleware(scheme: str, wrote: bool, principal_id: int | None = None):
+    async def app(scope, receive, send):
+        scope["state"]["db_wrote"] = wrote
+        scope["state"]["principal_id"] = principal_id
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "scheme": scheme, "state": {}}
+    asyncio.run(ReplicaStickinessMiddleware(app, 10)(scope, None, send))
+    return [
+        value.decode()
+        for name, value in messages[0]["headers"]
+        if name == b"set-cookie"
+    ]
+
+
+def test_middleware_sets_the_cookie_after_a_write():
+    (cookie,) = _run_middleware("http", wrote=True, principal_id=7)
+
+    assert cookie.startswith(f"{PRIMARY_COOKIE}=")
+    assert "Max-Age=10" in cookie and "HttpOnly" in cookie
+    assert "Secure" not in cookie
+    assert 7 in deps.primary_principals
+
+
+def test_middleware_cookie_is_secure_over_https():
+    (cookie,) = _run_middleware("https", wrote=True)
+
+    assert cookie.endswith("; Secure")
+
+
+def test_middleware_without_write_sets_nothing():
+    assert _run_middleware("https", wrote=False, principal_id=7) == []
+    assert 7 not in deps.primary_principals
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from app.core.export import _csv_lines, _ndjson_lines
+
+
+def test_csv_escapes_formulas():
+    rows = [(1, "=HYPERLINK(1)", "+1", "-1", "@SUM(A1)", "\tx", "safe", -1)]
+
+    assert _csv_lines(rows) == (b"1,'=HYPERLINK(1),'+1,'-1,'@SUM(A1),'\tx,safe,-1\r\n")
+
+
+def test_csv_formats_datetimes():
+    assert _csv_lines([(datetime(2026, 1, 2, 3, 4),)]) == b"2026-01-02T03:04:00\r\n"
+
+
+def test_ndjson_keeps_values():
+    assert _ndjson_lines(["name"], [("=1+1",)]) == b'{"name":"=1+1"}\n'
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.hashing import PasswordHashingPool
+
+
+def test_saturated_pool_rejects_with_503():
+    async def run():
+        pool = PasswordHashingPool("thread", workers=1, queue_size=1)
+        release = threading.Event()
+
+        running = asyncio.create_task(pool.run(release.wait))
+        waiting = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert (pool.running, pool.waiting) == (1, 1)
+
+        with pytest.raises(HTTPException) as error:
+            await pool.run(release.wait)
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+        assert pool.rejected == 1
+
+        release.set()
+        assert await asyncio.gather(running, waiting) == [True, True]
+        assert pool.stats()["completed"] == 2
+        assert (pool.running, pool.waiting) == (0, 0)
+        pool.shutdown()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "executor, executor_class",
+    [("thread", ThreadPoolExecutor), ("process", ProcessPoolExecutor)],
+)
+def test_executor_type(executor, executor_class):
+    async def run():
+        pool = PasswordHashingPool(executor, workers=1, queue_size=1)
+
+        assert await pool.run(pow, 2, 10) == 1024
+        assert isinstance(pool._executor, executor_class)
+        pool.shutdown()
+        assert pool._executor is None
+
+    asyncio.run(run())
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        PasswordHashingPool("fiber", workers=1, queue_size=1)
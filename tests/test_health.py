@@ -0,0 +1,32 @@
+import asyncio
+
+from app.services.health import MAIL, POSTGRES, HealthProber
+
+
+def test_mail_probed_on_its_own_interval(monkeypatch):
+    prober = HealthProber(interval=5, timeout=1, mail_interval=300)
+    calls = []
+
+    async def check_postgres():
+        calls.append(POSTGRES)
+
+    async def check_mail():
+        calls.append(MAIL)
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(prober, "_check_postgres", check_postgres)
+    monkeypatch.setattr(prober, "_check_mail", check_mail)
+
+    asyncio.run(prober.probe_once())
+    asyncio.run(prober.probe_once())
+
+    assert calls == [POSTGRES, MAIL, POSTGRES]
+    # The last mail result is kept, and doesn't make the app unready
+    assert prober.components[MAIL]["healthy"] is False
+    assert prober.components[MAIL]["error"] == "unreachable"
+    assert prober.ready()[0] is True
+
+    prober.mail_probed_at -= 300
+    asyncio.run(prober.probe_once())
+
+    assert calls[-1] == MAIL
@@ -0,0 +1,152 @@
+"""
+Cross-backend conformance of app.core.jwt_codec: every codec must decode the tokens of
+every other codec to the same payload, and reject the same invalid tokens with the
+JWT_OPTIONS of app.core.security.
+"""
+import base64
+import calendar
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from app.core.jwt_codec import CODECS, JWTDecodeError, get_codec
+from app.core.security import JWT_OPTIONS
+
+ALGORITHMS = ("HS384", "RS256", "ES256")
+INVALID_CASES = (
+    "expired",
+    "wrong key",
+    "tampered payload",
+    "alg none",
+    "sub not a string",
+    "jti not a string",
+    "garbage",
+    "missing exp",
+    "missing iat",
+    "missing iss",
+    "missing sub",
+    "missing jti",
+    "algorithm not allowed",
+)
+
+
+def _pem(private_key) -> tuple[str, str]:
+    private = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private.decode(), public.decode()
+
+
+def _generate_keys(algorithm: str) -> tuple[str, str]:
+    if algorithm.startswith("HS"):
+        key = base64.urlsafe_b64encode(os.urandom(48)).decode()
+        return key, key
+    if algorithm.startswith("RS"):
+        return _pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    return _pem(ec.generate_private_key(ec.SECP256R1()))
+
+
+@lru_cache
+def make_keys(algorithm: str) -> tuple[str, str]:
+    """
+    (signing key, verification key) for the algorithm, generated once per test run
+    """
+    return _generate_keys(algorithm)
+
+
+def timestamp(value: datetime) -> int:
+    return calendar.timegm(value.utctimetuple())
+
+
+def make_claims(**overrides) -> dict:
+    now = datetime.utcnow()
+    claims = {
+        "sub": "conformance",
+        "scopes": ["admin"],
+        "exp": timestamp(now + timedelta(minutes=15)),
+        "iat": timestamp(now),
+        "iss": "FastAPI app template",
+        "jti": str(uuid.uuid4()),
+        "type": "access_token",
+    }
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+def _b64(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def invalid_token(encoder, algorithm: str, case: str) -> tuple[str, str]:
+    """
+    (token, algorithm accepted by the decoder) of an invalid token
+    """
+    key, _ = make_keys(algorithm)
+    header, payload, signature = encoder.encode(make_claims(), key, algorithm).split(
+        "."
+    )
+    expired = timestamp(datetime.utcnow() - timedelta(seconds=5))
+
+    if case == "expired":
+        return encoder.encode(make_claims(exp=expired), key, algorithm), algorithm
+    if case == "wrong key":
+        other_key, _ = _generate_keys(algorithm)
+        return encoder.encode(make_claims(), other_key, algorithm), algorithm
+    if case == "tampered payload":
+        tampered = _b64({**make_claims(), "sub": "admin"})
+        return ".".join([header, tampered, signature]), algorithm
+    if case == "alg none":
+        return ".".join([_b64({"alg": "none", "typ": "JWT"}), payload, ""]), algorithm
+    if case == "sub not a string":
+        return encoder.encode(make_claims(sub=42), key, algorithm), algorithm
+    if case == "jti not a string":
+        return encoder.encode(make_claims(jti=42), key, algorithm), algorithm
+    if case == "garbage":
+        return "not.a.token", algorithm
+    if case.startswith("missing "):
+        claim = case.removeprefix("missing ")
+        return encoder.encode(make_claims(**{claim: None}), key, algorithm), algorithm
+    # A valid token signed with an algorithm the decoder doesn't accept
+    if not algorithm.startswith("HS"):
+        pytest.skip("needs a symmetric key usable with another algorithm")
+    other_algorithm = "HS256" if algorithm != "HS256" else "HS384"
+    return encoder.encode(make_claims(), key, other_algorithm), algorithm
+
+
+@pytest.mark.parametrize("decoder_name", CODECS)
+@pytest.mark.parametrize("encoder_name", CODECS)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_decodes_valid_token(algorithm, encoder_name, decoder_name):
+    signing_key, verification_key = make_keys(algorithm)
+    claims = make_claims()
+    token = get_codec(encoder_name).encode(dict(claims), signing_key, algorithm)
+
+    payload = get_codec(decoder_name).decode(
+        token, verification_key, [algorithm], JWT_OPTIONS
+    )
+
+    assert payload == claims
+
+
+@pytest.mark.parametrize("case", INVALID_CASES)
+@pytest.mark.parametrize("decoder_name", CODECS)
+@pytest.mark.parametrize("encoder_name", CODECS)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_rejects_invalid_token(algorithm, encoder_name, decoder_name, case):
+    _, verification_key = make_keys(algorithm)
+    token, accepted = invalid_token(get_codec(encoder_name), algorithm, case)
+
+    with pytest.raises(JWTDecodeError):
+        get_codec(decoder_name).decode(token, verification_key, [accepted], JWT_OPTIONS)
@@ -0,0 +1,102 @@
+import pytest
+
+from app import launcher
+from app.core.config import settings
+from app.launcher import cgroup_cpu_quota, get_topology
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """
+    Writes the given cgroup files, the missing ones don't exist.
+    """
+    paths = {
+        "CGROUP_V2_CPU_MAX": tmp_path / "cpu.max",
+        "CGROUP_V1_CPU_QUOTA": tmp_path / "cpu.cfs_quota_us",
+        "CGROUP_V1_CPU_PERIOD": tmp_path / "cpu.cfs_period_us",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(launcher, name, str(path))
+
+    def write(**files: str) -> None:
+        for name, content in files.items():
+            paths[name].write_text(f"{content}\n")
+
+    return write
+
+
+def test_cgroup_v2_quota(cgroup):
+    cgroup(CGROUP_V2_CPU_MAX="150000 100000")
+    assert cgroup_cpu_quota() == 1.5
+
+
+def test_cgroup_v2_without_quota(cgroup):
+    cgroup(CGROUP_V2_CPU_MAX="max 100000", CGROUP_V1_CPU_QUOTA="200000")
+    assert cgroup_cpu_quota() is None
+
+
+def test_cgroup_v1_quota(cgroup):
+    cgroup(CGROUP_V1_CPU_QUOTA="200000", CGROUP_V1_CPU_PERIOD="100000")
+    assert cgroup_cpu_quota() == 2
+
+
+def test_cgroup_v1_without_quota(cgroup):
+    cgroup(CGROUP_V1_CPU_QUOTA="-1", CGROUP_V1_CPU_PERIOD="100000")
+    assert cgroup_cpu_quota() is None
+
+
+def test_no_cgroup(cgroup):
+    assert cgroup_cpu_quota() is None
+
+
+@pytest.fixture
+def database(monkeypatch):
+    def configure(workers=None, budget=None, replicas=None, pool_size=5, overflow=10):
+        monkeypatch.setattr(settings, "UVICORN_WORKERS", workers)
+        monkeypatch.setattr(settings, "DATABASE_CONNECTION_BUDGET", budget)
+        monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", replicas)
+        monkeypatch.setattr(settings, "DATABASE_POOL_SIZE", pool_size)
+        monkeypatch.setattr(settings, "DATABASE_MAX_OVERFLOW", overflow)
+
+    return configure
+
+
+def test_workers_default_to_the_cpu_quota(database, monkeypatch):
+    database()
+    monkeypatch.setattr(launcher, "cgroup_cpu_quota", lambda: 1.5)
+
+    topology = get_topology()
+
+    assert (topology.workers, topology.workers_source) == (2, "cgroup quota")
+    assert (topology.pool_size, topology.max_overflow, topology.engines) == (5, 10, 1)
+    assert topology.connections == 30
+
+
+def test_budget_divided_between_the_workers(database):
+    database(workers=4, budget=100)
+
+    topology = get_topology()
+
+    assert (topology.pool_size, topology.max_overflow) == (5, 20)
+    assert topology.connections == 100
+
+
+def test_budget_divided_between_the_engines_of_the_workers(database):
+    # 2 workers with a primary and 2 replicas: 6 pools of 10 connections
+    database(workers=2, budget=60, replicas="10.0.0.2, 10.0.0.3:5433,")
+
+    topology = get_topology()
+
+    assert topology.engines == 3
+    assert (topology.pool_size, topology.max_overflow) == (5, 5)
+    assert topology.connections == 60
+
+
+def test_budget_smaller_than_the_pools(database):
+    database(workers=4, budget=6, replicas="10.0.0.2")
+
+    topology = get_topology()
+
+    # At least one connection per engine
+    assert (topology.pool_size, topology.max_overflow) == (1, 0)
+    assert topology.connections == 8
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.modules.system.routes import get_metrics
+from app.services.metrics import ALLOWED_NETWORKS, is_allowed_client, parse_networks
+
+
+def metrics_request(host: str) -> Request:
+    return Request(
+        {"type": "http", "method": "GET", "headers": [], "client": (host, 0)}
+    )
+
+
+@pytest.mark.parametrize(
+    "host, allowed",
+    [
+        ("127.0.0.1", True),
+        ("::1", True),
+        ("10.1.2.3", True),
+        ("172.20.0.5", True),
+        ("192.168.1.1", True),
+        ("8.8.8.8", False),
+        ("2001:db8::1", False),
+        ("testclient", False),
+        (None, False),
+    ],
+)
+def test_metrics_are_restricted_to_private_networks(host, allowed):
+    assert is_allowed_client(host) is allowed
+
+
+def test_any_client_is_allowed_with_a_star():
+    assert parse_networks(" * ") is None
+    assert is_allowed_client("8.8.8.8", parse_networks("*"))
+    assert not is_allowed_client("8.8.8.8", parse_networks("10.0.0.0/8, 127.0.0.1/32"))
+
+
+def test_metrics_route_is_a_404_for_other_clients():
+    assert ALLOWED_NETWORKS is not None
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_metrics(metrics_request("8.8.8.8")))
+    assert error.value.status_code == 404
+
+    response = asyncio.run(get_metrics(metrics_request("10.0.0.1")))
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
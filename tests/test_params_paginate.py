@@ -0,0 +1,98 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.params_paginate import (
+    CursorOrder,
+    CursorParams,
+    decode_cursor,
+    encode_cursor,
+)
+from app.core.query_factory import get_all_keyset
+from app.modules.core.models import Role
+
+NOW = datetime(2026, 10, 18, 12, 0, 0, 123456)
+
+
+def params(order_by: CursorOrder, cursor: str | None = None) -> CursorParams:
+    return CursorParams(cursor=cursor, size=2, order_by=order_by, include_total=False)
+
+
+@pytest.mark.parametrize(
+    "order_by, values",
+    [(CursorOrder.ID, (42,)), (CursorOrder.CREATED_AT, (NOW, 42))],
+)
+def test_cursor_round_trip(order_by, values):
+    cursor = encode_cursor(order_by, values)
+
+    assert "=" not in cursor
+    assert decode_cursor(order_by, cursor) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "garbage!",
+        "e30",  # {}
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+        base64.urlsafe_b64encode(b'{"o": "id", "k": ["x"]}').decode(),
+        base64.urlsafe_b64encode(b'{"o": "id", "k": [1, 2]}').decode(),
+        # A cursor of another ordering
+        encode_cursor(CursorOrder.CREATED_AT, (NOW, 1)),
+    ],
+)
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(CursorOrder.ID, cursor)
+
+    assert error.value.status_code == 400
+
+
+def test_tampered_cursor_is_a_400():
+    cursor = encode_cursor(CursorOrder.CREATED_AT, (NOW, 1))
+
+    with pytest.raises(HTTPException):
+        decode_cursor(CursorOrder.CREATED_AT, cursor[:-4] + "AAAA")
+
+
+def test_pages_dont_skip_or_repeat_rows_with_tied_sort_keys():
+    # created_at ties between 1, 3 and 4, the pages are ordered by (created_at, id)
+    created_at = {5: NOW, 1: NOW + timedelta(1), 3: NOW + timedelta(1)}
+    created_at.update({4: NOW + timedelta(1), 2: NOW + timedelta(2)})
+
+    async def pages(order_by: CursorOrder) -> list[list[int]]:
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            # Role.created_at defaults to now(), which SQLite doesn't parse
+            await connection.execute(
+                text(
+                    "CREATE TABLE cre_role (id INTEGER PRIMARY KEY, name TEXT, "
+                    "description TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"
+                )
+            )
+            await connection.execute(
+                insert(Role.__table__),
+                [
+                    {"id": id, "name": f"role{id}", "created_at": at, "updated_at": at}
+                    for id, at in created_at.items()
+                ],
+            )
+
+        result, cursor = [], None
+        async with AsyncSession(engine) as db:
+            while True:
+                page = await get_all_keyset(db, Role, params(order_by, cursor))
+                result.append([role.id for role in page["items"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+        await engine.dispose()
+        return result
+
+    assert asyncio.run(pages(CursorOrder.CREATED_AT)) == [[5, 1], [3, 4], [2]]
+    assert asyncio.run(pages(CursorOrder.ID)) == [[1, 2], [3, 4], [5]]
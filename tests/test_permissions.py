@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import security
+from app.core.permissions import ScopeRegistry
+
+SCOPES = ["admin", "role:read", "role:create", "permission:read", "permission:link"]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = ScopeRegistry(SCOPES)
+    monkeypatch.setattr(security, "scope_registry", registry)
+    return registry
+
+
+@pytest.mark.parametrize(
+    "scopes", [[], ["admin"], ["role:read", "permission:link"], SCOPES]
+)
+def test_encode_decode_round_trip(registry, scopes):
+    mask = registry.mask(scopes)
+
+    assert registry.decode(registry.encode(mask)) == mask
+    assert sorted(registry.names(mask)) == sorted(scopes)
+
+
+def test_unknown_scopes_are_ignored(registry):
+    assert registry.mask(["unknown", "role:read"]) == registry.mask(["role:read"])
+    assert "unknown" not in registry
+
+
+def test_wildcards_are_expanded(registry):
+    assert sorted(registry.names(registry.mask(["role:*"]))) == [
+        "role:create",
+        "role:read",
+    ]
+    assert len(registry.names(registry.mask(["*"]))) == len(SCOPES)
+    assert registry.has_any(registry.mask(["permission:*"]), ["permission:link"])
+    assert not registry.has_any(registry.mask(["role:*"]), ["admin"])
+
+
+def test_malformed_bitset_raises(registry):
+    with pytest.raises(ValueError):
+        registry.decode("@@@")
+
+
+def test_version_changes_with_the_scopes():
+    registry = ScopeRegistry(SCOPES)
+    version = registry.version
+
+    assert ScopeRegistry(reversed(SCOPES)).version == version
+    registry.compile([*SCOPES, "report:read"])
+    assert registry.version != version
+
+
+def test_token_of_the_current_version_is_decoded(registry):
+    mask = registry.mask(["role:read"])
+    payload = {"scp": registry.encode(mask), "scv": registry.version}
+    user = SimpleNamespace(id=1, username="alice")
+
+    assert asyncio.run(security._get_token_scope_mask(None, payload, user)) == mask
+
+
+def test_stale_token_is_resolved_once_per_user(registry, monkeypatch):
+    queries = []
+
+    async def get_user_scopes(db, user_id):
+        queries.append(user_id)
+        return ["role:read"]
+
+    async def refresh(db, force=False):
+        pass
+
+    monkeypatch.setattr(security, "get_user_scopes", get_user_scopes)
+    monkeypatch.setattr(registry, "refresh", refresh)
+    stale = ScopeRegistry(SCOPES[:2])
+    payload = {"scp": stale.encode(stale.mask(["admin"])), "scv": stale.version}
+    user = SimpleNamespace(id=1, username="alice")
+
+    for _ in range(3):
+        mask = asyncio.run(security._get_token_scope_mask(None, payload, user))
+        # Resolved from the database, not read with the other version's bits
+        assert registry.names(mask) == ["role:read"]
+
+    assert queries == [1]
+
+
+def test_scopes_list_token(registry):
+    payload = {"scopes": ["permission:read"]}
+    user = SimpleNamespace(id=1, username="alice")
+
+    mask = asyncio.run(security._get_token_scope_mask(None, payload, user))
+
+    assert registry.names(mask) == ["permission:read"]
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+from app.modules.core.models import Profile, User
+from app.services import cache
+from app.services.cache import TTLCache
+from app.services.principal_cache import PrincipalCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def make_user(user_id: int, username: str) -> User:
+    now = datetime.utcnow()
+    return User(
+        id=user_id,
+        username=username,
+        email=f"{username}@example.com",
+        password="x",
+        is_active=True,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def test_entries_expire_after_their_ttl(clock):
+    ttl_cache = TTLCache("test", maxsize=10, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=60)
+
+    clock.now += 31
+    assert ttl_cache.get("a") is None
+    assert "a" not in ttl_cache
+    assert ttl_cache.get("b") == 2
+    assert (ttl_cache.hits, ttl_cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    ttl_cache = TTLCache("test", maxsize=2, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+
+    assert "b" not in ttl_cache
+    assert ttl_cache.get("a") == 1 and ttl_cache.get("c") == 3
+    assert ttl_cache.evictions == 1
+
+
+def test_disabled_cache_stores_nothing():
+    ttl_cache = TTLCache("test", maxsize=0, ttl=30)
+    ttl_cache.set("a", 1)
+
+    assert len(ttl_cache) == 0
+
+
+def test_invalidate_by_user_id_and_entry(clock):
+    principals = PrincipalCache(maxsize=10, ttl=30)
+    principals.set_principal(make_user(1, "alice"))
+    principals.set_principal(make_user(2, "bobby"))
+
+    principals.invalidate(1)
+    principals.invalidate_entry(Profile(user_id=2))
+    principals.invalidate(3)
+
+    assert principals.get_principal("alice") is None
+    assert principals.get_principal("bobby") is None
+    assert principals._index == {}
+
+
+def test_invalidate_model_ids_only_for_users(clock):
+    principals = PrincipalCache(maxsize=10, ttl=30)
+    principals.set_principal(make_user(1, "alice"))
+
+    principals.invalidate_model_ids(Profile, [1])
+    assert principals.get_principal("alice") is not None
+
+    principals.invalidate_model_ids(User, [1])
+    assert principals.get_principal("alice") is None
+
+
+def test_index_of_evicted_entries_is_rebuilt(clock):
+    principals = PrincipalCache(maxsize=2, ttl=30)
+    for user_id in range(1, 7):
+        principals.set_principal(make_user(user_id, f"user{user_id}"))
+
+    # Rebuilt from the cached entries (4 and 5) once it held 5 users, then 6 was added
+    assert principals._index == {4: "user4", 5: "user5", 6: "user6"}
+
+
+def test_invalidations_reach_the_other_instances():
+    async def run():
+        server = fakeredis.FakeServer()
+        first, second = PrincipalCache(10, 30), PrincipalCache(10, 30)
+        await first.start(fakeredis.aioredis.FakeRedis(server=server))
+        await second.start(fakeredis.aioredis.FakeRedis(server=server))
+        await asyncio.sleep(0.1)
+
+        for principals in (first, second):
+            principals.set_principal(make_user(1, "alice"))
+            principals.set_principal(make_user(2, "bobby"))
+        first.invalidate(1)
+
+        for _ in range(50):
+            if second.get_principal("alice") is None:
+                break
+            await asyncio.sleep(0.05)
+
+        assert first.get_principal("alice") is None
+        assert second.get_principal("alice") is None
+        assert second.get_principal("bobby") is not None
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(run())
+
+
+def test_own_messages_are_ignored():
+    principals = PrincipalCache(10, 30)
+    principals._origin = "me"
+    principals.set_principal(make_user(1, "alice"))
+
+    principals._apply(b"me 1")
+    assert principals.get_principal("alice") is not None
+
+    principals._apply(b"other 1")
+    assert principals.get_principal("alice") is None
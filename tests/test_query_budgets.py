@@ -0,0 +1,103 @@
+"""
+Query budgets declared by the hot routes, checked on the app backed by SQLite.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import main
+from app.core.config import settings
+from app.core.security import get_current_active_user
+from app.db import query_stats
+from app.db.deps import get_db
+from app.db.query_stats import QueryBudgetExceeded, query_budgets
+from app.modules.core import routes
+from app.modules.core.models import Permission, Role, role_permission
+
+ROLE_PERMISSIONS = f"{settings.API_V1_STR}/core/roles/{{role_id}}/permissions"
+NOW = datetime(2026, 10, 18)
+
+# The timestamps of the models default to now(), which SQLite doesn't parse
+TABLES = (
+    "CREATE TABLE cre_role (id INTEGER PRIMARY KEY, name TEXT, description TEXT, "
+    "created_at TIMESTAMP, updated_at TIMESTAMP)",
+    "CREATE TABLE cre_permission (id INTEGER PRIMARY KEY, scope TEXT, "
+    "description TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)",
+    "CREATE TABLE cre_role_permission (cre_role_id INTEGER, cre_permission_id INTEGER)",
+)
+
+
+async def create_tables(engine) -> None:
+    async with engine.begin() as connection:
+        for table in TABLES:
+            await connection.execute(text(table))
+        timestamps = {"created_at": NOW, "updated_at": NOW}
+        await connection.execute(
+            insert(Role.__table__), [{"id": 1, "name": "admins", **timestamps}]
+        )
+        await connection.execute(
+            insert(Permission.__table__),
+            [{"id": id, "scope": f"scope{id}", **timestamps} for id in (1, 2, 3)],
+        )
+        await connection.execute(
+            insert(role_permission),
+            [{"cre_role_id": 1, "cre_permission_id": id} for id in (1, 2, 3)],
+        )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    asyncio.run(create_tables(engine))
+    query_stats.instrument_engine(engine)
+    monkeypatch.setattr(query_budgets, "enforce", True)
+
+    async def get_sqlite_db():
+        async with AsyncSession(engine) as db:
+            yield db
+
+    main.app.dependency_overrides[get_db] = get_sqlite_db
+    main.app.dependency_overrides[get_current_active_user] = lambda: None
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def test_hot_routes_declare_a_budget():
+    budgets = query_budgets.budgets
+
+    assert budgets[("GET", ROLE_PERMISSIONS)] == 3
+    assert ("GET", f"{settings.API_V1_STR}/admin/users") in budgets
+    assert ("GET", f"{settings.API_V1_STR}/admin/users/cursor") in budgets
+
+
+def test_role_permissions_within_budget(client):
+    response = client.get(f"{settings.API_V1_STR}/core/roles/1/permissions")
+
+    assert response.status_code == 200
+    assert len(response.json()["permissions"]) == 3
+    assert 'desc="2 statements' in response.headers["Server-Timing"]
+
+
+def test_role_permissions_n_plus_one_trips_the_budget(client, monkeypatch):
+    get_specific_by_id = routes.get_specific_by_id
+
+    async def load_permissions_one_by_one(db, model, id, profile):
+        role = await get_specific_by_id(db, model, id, profile)
+        for permission in role.permissions:
+            await db.execute(select(Permission).where(Permission.id == permission.id))
+        return role
+
+    monkeypatch.setattr(routes, "get_specific_by_id", load_permissions_one_by_one)
+
+    with pytest.raises(QueryBudgetExceeded, match="executed 5 statements, budget is 3"):
+        client.get(f"{settings.API_V1_STR}/core/roles/1/permissions")
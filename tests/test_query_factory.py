@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.core.query_factory import (
+    bulk_create,
+    bulk_create_response,
+    bulk_delete,
+    bulk_ids_response,
+    bulk_update,
+)
+from app.modules.core.models import Role, User, role_permission, user_role
+
+
+class FakeResult(list):
+    def scalars(self) -> "FakeResult":
+        return self
+
+    def all(self) -> list:
+        return list(self)
+
+
+class FakeSession:
+    """
+    Records the statements compiled for PostgreSQL and returns the given results.
+    """
+
+    def __init__(self, *results, error: Exception | None = None) -> None:
+        self.results = list(results)
+        self.error = error
+        self.statements = []
+        self.params = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, stmt, params=None) -> FakeResult:
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        self.statements.append(str(compiled))
+        self.params.append(params if params is not None else compiled.params)
+        if self.error is not None:
+            raise self.error
+        return FakeResult(self.results.pop(0) if self.results else [])
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+def test_bulk_create_skips_the_conflicting_rows():
+    created = Role(id=1, name="admin")
+    db = FakeSession([created])
+    rows = [{"name": "admin"}, {"name": "existing"}, {"name": "admin"}]
+
+    entries = asyncio.run(bulk_create(db, Role, rows, unique_column="name"))
+
+    assert "ON CONFLICT (name) DO NOTHING" in db.statements[0]
+    assert db.params[0] == rows
+    # Aligned with the rows, the duplicated value only gets the entry once
+    assert entries == [created, None, None]
+    response = bulk_create_response(Role, entries)
+    assert response["msg"] == "1/3 Role created"
+    assert [result["status"] for result in response["results"]] == [True, False, False]
+
+
+def test_bulk_update_returns_the_updated_ids():
+    db = FakeSession([1, 3])
+
+    updated = asyncio.run(bulk_update(db, Role, [1, 2, 3], {"description": "x"}))
+
+    assert "cre_role.id = ANY (%(param_1)s::INTEGER[])" in db.statements[0]
+    assert db.params[0]["param_1"] == [1, 2, 3]
+    assert updated == [1, 3]
+    response = bulk_ids_response(Role, "updated", [1, 2, 3], updated)
+    assert [result["status"] for result in response["results"]] == [True, False, True]
+    assert not response["status"]
+
+
+def test_bulk_operation_violating_a_constraint_is_a_400():
+    db = FakeSession(error=IntegrityError("UPDATE", {}, Exception()))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(bulk_update(db, Role, [1], {"name": "admin"}))
+
+    assert error.value.status_code == 400
+    assert (db.rollbacks, db.commits) == (1, 0)
+
+
+def test_bulk_delete_deletes_the_children_first():
+    db = FakeSession([], [], [1, 2])
+
+    deleted = asyncio.run(bulk_delete(db, User, ids=[1, 2, 5]))
+
+    children, parent = db.statements[:-1], db.statements[-1]
+    assert sorted(statement.split()[2] for statement in children) == [
+        "cre_email_verification",
+        "cre_profile",
+    ]
+    assert all("IN (SELECT cre_user.id" in statement for statement in children)
+    assert parent.startswith("DELETE FROM cre_user")
+    assert deleted == [1, 2]
+    assert db.commits == 1
+
+
+def test_pivot_rows_are_deleted_by_the_database():
+    # bulk_delete doesn't delete them, the foreign keys of the pivot tables cascade
+    for pivot in (user_role, role_permission):
+        assert {fk.ondelete for fk in pivot.foreign_keys} == {"CASCADE"}
+
+
+def test_bulk_delete_needs_ids_or_a_filter():
+    with pytest.raises(ValueError):
+        asyncio.run(bulk_delete(FakeSession(), Role))
+
+    assert asyncio.run(bulk_delete(FakeSession(), Role, ids=[])) == []
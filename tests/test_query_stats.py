@@ -0,0 +1,70 @@
+"""
+Query budgets and Server-Timing of app.db.query_stats, on a small app backed by SQLite.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import query_stats
+from app.db.query_stats import QueryBudgetExceeded, QueryStatsMiddleware, query_budgets
+
+ROUTE = "/items/{count}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Without the budgets declared by the routes of the app
+    monkeypatch.setattr(query_budgets, "budgets", {})
+    engine = create_async_engine("sqlite+aiosqlite://")
+    query_stats.instrument_engine(engine)
+
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, warn_statements=10)
+
+    @app.get(ROUTE)
+    async def read_items(count: int):
+        async with engine.connect() as connection:
+            for _ in range(count):
+                await connection.execute(text("SELECT 1"))
+        return {"count": count}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_server_timing_reports_statements(client):
+    response = client.get("/items/3")
+
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert 'desc="3 statements, ' in timing
+
+
+def test_within_budget(client):
+    query_budgets.declare("get", ROUTE, 3)
+
+    assert client.get("/items/3").status_code == 200
+
+
+def test_over_budget_raises(client):
+    query_budgets.declare("GET", ROUTE, 2)
+
+    with pytest.raises(QueryBudgetExceeded, match="executed 3 statements, budget is 2"):
+        client.get("/items/3")
+
+
+def test_over_budget_is_logged_when_not_enforced(client, monkeypatch):
+    monkeypatch.setattr(query_budgets, "enforce", False)
+    query_budgets.declare("GET", ROUTE, 2)
+
+    assert client.get("/items/3").status_code == 200
+
+
+def test_budget_of_another_route_is_ignored(client):
+    query_budgets.declare("POST", ROUTE, 0)
+    query_budgets.declare("GET", "/other", 0)
+
+    assert client.get("/items/3").status_code == 200
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app.db import session
+from app.db.session import RoutingSession, _prepare_warm_statements, engine
+from app.modules.admin import (  # noqa: F401 (registers warm statements)
+    crud as admin_crud,
+)
+from app.modules.core import crud as core_crud  # noqa: F401
+from app.modules.core.models import User
+
+
+class FakeAsyncpgConnection:
+    def __init__(self, fail: bool = False) -> None:
+        self.prepared = []
+        self.fail = fail
+
+    async def prepare(self, sql: str) -> None:
+        if self.fail:
+            raise RuntimeError("connection lost")
+        self.prepared.append(sql)
+
+
+class FakeDBAPIConnection:
+    def __init__(self, connection: FakeAsyncpgConnection) -> None:
+        self.connection = connection
+
+    def run_async(self, fn):
+        return asyncio.run(fn(self.connection))
+
+
+def test_warm_statements_prepared_on_connect(monkeypatch):
+    monkeypatch.setattr(session, "_warm_sql", None)
+    connection = FakeAsyncpgConnection()
+
+    _prepare_warm_statements(engine)(FakeDBAPIConnection(connection), None)
+
+    # The user lookup of check_jwt and the scopes query, compiled for asyncpg
+    assert len(connection.prepared) == len(session._warm_statements) >= 2
+    assert any("FROM cre_user" in sql and "$1" in sql for sql in connection.prepared)
+
+
+def test_warm_statement_errors_dont_fail_the_connection(monkeypatch):
+    monkeypatch.setattr(session, "_warm_sql", None)
+
+    _prepare_warm_statements(engine)(
+        FakeDBAPIConnection(FakeAsyncpgConnection(True)), None
+    )
+
+
+def _routing(monkeypatch, read_only=True):
+    primary, replica = create_engine("sqlite://"), create_engine("sqlite://")
+    monkeypatch.setattr(
+        session.replica_set,
+        "choose",
+        lambda: SimpleNamespace(engine=SimpleNamespace(sync_engine=replica)),
+    )
+    return RoutingSession(bind=primary, info={"read_only": read_only}), primary, replica
+
+
+def test_reads_of_a_read_only_session_go_to_the_replica(monkeypatch):
+    db, primary, replica = _routing(monkeypatch)
+
+    assert db.get_bind(clause=select(User)) is replica
+    assert db.get_bind(clause=text("SELECT 1")) is replica
+    assert db.get_bind(clause=text("  select id from cre_user")) is replica
+    assert db.info["read_only"] is True
+
+
+def test_reads_of_a_primary_session_stay_on_the_primary(monkeypatch):
+    db, primary, replica = _routing(monkeypatch, read_only=False)
+
+    assert db.get_bind(clause=select(User)) is primary
+    assert db.get_bind(clause=text("SELECT 1")) is primary
+
+
+def test_writes_go_to_the_primary_and_pin_the_session(monkeypatch):
+    for write in (
+        insert(User).values(username="antoine"),
+        select(User).with_for_update(),
+        text("UPDATE cre_user SET is_active = false"),
+        text("SELECT id FROM cre_user FOR UPDATE SKIP LOCKED"),
+        text("select id from cre_user for no key update"),
+    ):
+        db, primary, replica = _routing(monkeypatch)
+
+        assert db.get_bind(clause=write) is primary
+        assert db.info["read_only"] is False
+        assert db.info["wrote"] is True
+        # The following reads see the write
+        assert db.get_bind(clause=select(User)) is primary
+
+
+def test_use_primary_reads_bypass_the_replica(monkeypatch):
+    db, primary, replica = _routing(monkeypatch)
+
+    assert db.get_bind(clause=select(User)) is replica
+    assert (
+        db.get_bind(clause=select(User).execution_options(use_primary=True)) is primary
+    )
+    # Not pinned to the primary
+    assert db.info["read_only"] is True
+    assert "wrote" not in db.info
@@ -0,0 +1,47 @@
+"""
+Cold start of the app: the optional subsystems are not loaded by "import main".
+The wall-clock budget of benchmarks/bench_startup.py depends on the machine, it only
+runs with the benchmark marker (pytest -m benchmark).
+"""
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BENCHMARKS = os.path.join(ROOT, "benchmarks")
+sys.path.append(BENCHMARKS)
+
+from bench_startup import CHECK_LAZY, LAZY_MODULES, run_child  # noqa: E402
+
+MAX_SECONDS = 2.5
+
+
+def test_heavy_modules_are_not_imported_with_main():
+    loaded = run_child(CHECK_LAZY).stdout.strip()
+
+    assert loaded == "", f"loaded at import time: {loaded} (lazy: {LAZY_MODULES})"
+
+
+@pytest.mark.benchmark
+def test_cold_start_within_budget():
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(BENCHMARKS, "bench_startup.py"),
+            "--runs",
+            "3",
+            "--max-seconds",
+            str(MAX_SECONDS),
+            "--slowest",
+            "0",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "OK: cold start" in result.stdout
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+from app.services.storage import LocalStorage, RedisStorage
+
+
+def _expires_in(seconds: int) -> float:
+    return datetime.now().timestamp() + seconds
+
+
+def test_local_storage_contains_set_keys():
+    async def run():
+        storage = LocalStorage()
+
+        assert not await storage.contains("token")
+        await storage.set_key("token", _expires_in(60))
+        assert await storage.contains("token")
+        assert not await storage.contains("other")
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_redis_storage_contains_set_keys(pipeline):
+    async def run():
+        client = fakeredis.aioredis.FakeRedis()
+        storage = RedisStorage(client, pipeline=pipeline, flush_interval=0.01)
+
+        assert not await storage.contains("token")
+        await storage.set_key("token", _expires_in(60))
+        # Buffered keys are visible before the flush
+        assert await storage.contains("token")
+        assert not await storage.contains("other")
+
+        await asyncio.sleep(0.05)
+        assert await client.exists("token")
+        assert 0 < await client.ttl("token") <= 60
+        await storage.close()
+
+    asyncio.run(run())
+
+
+def test_pipeline_flushes_when_the_batch_is_full():
+    async def run():
+        client = fakeredis.aioredis.FakeRedis()
+        storage = RedisStorage(client, pipeline=True, batch_size=3, flush_interval=60)
+
+        for i in range(3):
+            await storage.set_key(f"token{i}", _expires_in(60))
+
+        assert storage._pending == {}
+        assert await client.exists("token0", "token1", "token2") == 3
+        await storage.close()
+
+    asyncio.run(run())
+
+
+def test_failed_batch_flush_doesnt_fail_set_key():
+    async def run():
+        server = fakeredis.FakeServer()
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        storage = RedisStorage(client, pipeline=True, batch_size=2, flush_interval=0.01)
+        server.connected = False
+
+        await storage.set_key("token0", _expires_in(60))
+        await storage.set_key("token1", _expires_in(60))
+        # Kept and handed to the background retry
+        assert await storage.contains("token1")
+        assert storage._flush_task is not None
+
+        server.connected = True
+        await asyncio.sleep(0.2)
+
+        assert storage._pending == {}
+        assert await client.exists("token0", "token1") == 2
+        await storage.close()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_retried():
+    async def run():
+        server = fakeredis.FakeServer()
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        storage = RedisStorage(
+            client, pipeline=True, flush_interval=0.01, max_retry_delay=0.05
+        )
+        server.connected = False
+
+        await storage.set_key("token", datetime.now().timestamp() + 60)
+        await asyncio.sleep(0.1)
+        # Still buffered and retried while Redis is down
+        assert await storage.contains("token")
+        assert storage._flush_task is not None
+
+        server.connected = True
+        await asyncio.sleep(0.2)
+
+        assert storage._flush_task is None
+        assert storage._pending == {}
+        assert await client.exists("token")
+        await storage.close()
+
+    asyncio.run(run())
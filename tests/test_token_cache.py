@@ -0,0 +1,92 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.jwt_codec import JWTDecodeError
+from app.core.security import (
+    add_token_to_blacklist,
+    check_jwt,
+    create_jwt_token,
+    decode_jwt_token,
+)
+from app.services import cache
+from app.services.principal_cache import principal_cache
+from app.services.token_cache import TokenCache, token_cache
+from tests.test_principal_cache import Clock, make_user
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    token_cache.clear()
+    principal_cache.clear()
+    yield
+    token_cache.clear()
+    principal_cache.clear()
+
+
+def payload(jti: str, expires_in: float) -> dict:
+    return {"jti": jti, "exp": cache.time.time() + expires_in}
+
+
+def test_payload_is_cached_until_the_token_expires(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    tokens = TokenCache(maxsize=10)
+    tokens.set_payload("token", "access_token", payload("a", 60))
+
+    assert tokens.get_payload("token", "access_token")["jti"] == "a"
+    assert tokens.get_payload("token", "refresh_token") is None
+
+    clock.now += 61
+    assert tokens.get_payload("token", "access_token") is None
+
+
+def test_expired_payload_is_not_cached():
+    tokens = TokenCache(maxsize=10)
+    tokens.set_payload("token", "access_token", payload("a", -1))
+
+    assert len(tokens) == 0
+
+
+def test_invalidate_jti_purges_the_token():
+    tokens = TokenCache(maxsize=10)
+    tokens.set_payload("token", "access_token", payload("a", 60))
+    tokens.set_payload("other", "access_token", payload("b", 60))
+
+    tokens.invalidate_jti("a")
+    tokens.invalidate_jti("unknown")
+
+    assert tokens.get_payload("token", "access_token") is None
+    assert tokens.get_payload("other", "access_token") is not None
+
+
+def test_expired_token_is_not_served_from_the_cache():
+    token = create_jwt_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(JWTDecodeError):
+        decode_jwt_token(token)
+    assert token_cache.get_payload(token, "access_token") is None
+
+
+def test_blacklisted_token_is_rejected_once_cached():
+    async def run():
+        principal_cache.set_principal(make_user(1, "alice"))
+        db = SimpleNamespace(info={})
+        token = create_jwt_token({"sub": "alice"})
+
+        assert (
+            await check_jwt(db=db, token=token, type="access_token")
+        ).username == "alice"
+        assert token_cache.get_payload(token, "access_token") is not None
+
+        await add_token_to_blacklist(token, "access_token")
+
+        assert token_cache.get_payload(token, "access_token") is None
+        with pytest.raises(HTTPException) as error:
+            await check_jwt(db=db, token=token, type="access_token")
+        assert error.value.status_code == 401
+
+    asyncio.run(run())
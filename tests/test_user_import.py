@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from asyncpg.exceptions import StringDataRightTruncationError
+from pydantic import ValidationError
+
+from app.modules.admin.user_import import UserImporter
+from app.modules.users.schema import UserImportRow
+
+
+def make_row(username: str, **fields) -> UserImportRow:
+    return UserImportRow(
+        username=username,
+        email=f"{username}@example.com",
+        password="password123",
+        **fields,
+    )
+
+
+class FakeResult:
+    def all(self) -> list:
+        return []
+
+
+class FakeConnection:
+    async def execute(self, stmt, params=None) -> None:
+        pass
+
+    async def scalar(self, stmt) -> int:
+        return 1
+
+    async def scalars(self, stmt) -> FakeResult:
+        return FakeResult()
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.info = {}
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def connection(self) -> FakeConnection:
+        return FakeConnection()
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+class FakeHasher:
+    def __init__(self) -> None:
+        self.hashed = []
+
+    async def hash(self, passwords: list[str]) -> list[str]:
+        self.hashed.extend(passwords)
+        return [f"hash:{password}" for password in passwords]
+
+
+@pytest.mark.parametrize(
+    "fields", [{"city": "x" * 256}, {"line1": "a\x00b"}, {"roles": ["admin\x00"]}]
+)
+def test_row_rejects_values_postgres_cant_store(fields):
+    with pytest.raises(ValidationError):
+        make_row("alice", **fields)
+
+
+def test_rejected_rows_are_not_hashed(monkeypatch):
+    db, hasher = FakeSession(), FakeHasher()
+    importer = UserImporter(db, hasher=hasher)
+    staged = []
+
+    async def stage(records):
+        staged.append([record[0] for record in records])
+        # alice already exists, only on the first staging
+        return [(1, "alice", "user already exists")] if len(staged) == 1 else []
+
+    monkeypatch.setattr(importer, "_stage", stage)
+    batch = [(1, make_row("alice")), (2, make_row("bobby"))]
+    asyncio.run(importer._load(batch))
+
+    assert staged == [[1, 2], [2]]
+    assert hasher.hashed == ["password123"]
+    assert (db.rollbacks, db.commits) == (1, 1)
+    assert db.info["wrote"] is True
+    assert importer.report.rejected == 1
+    assert importer.report.rejected_rows[0].reason == "user already exists"
+
+
+def test_copy_error_rejects_the_batch(monkeypatch):
+    db = FakeSession()
+    importer = UserImporter(db, hasher=FakeHasher())
+
+    async def stage(records):
+        raise StringDataRightTruncationError("value too long")
+
+    monkeypatch.setattr(importer, "_stage", stage)
+    asyncio.run(importer._load([(1, make_row("alice")), (2, make_row("bobby"))]))
+
+    assert importer.report.rejected == 2
+    assert importer.report.created == 0
+    assert "value too long" in importer.report.rejected_rows[0].reason
+    assert db.commits == 0